@@ -1,5 +1,15 @@
 """Backend module for BlockSnap system."""
-from .blockchain_handler import BlockchainHandler
-from .ipfs_handler import IPFSHandler
+import importlib
 
 __all__ = ['BlockchainHandler', 'IPFSHandler']
+
+# Imported on first access so that importing a submodule does not load web3
+_LAZY = {
+    'BlockchainHandler': '.blockchain_handler',
+    'IPFSHandler': '.ipfs_handler',
+}
+
+def __getattr__(name):
+    if name in _LAZY:
+        return getattr(importlib.import_module(_LAZY[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
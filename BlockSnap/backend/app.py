@@ -1,34 +1,30 @@
 #!/usr/bin/env python3
 
+import time
+_import_started = time.perf_counter()
+
 from flask import Flask, request, jsonify, send_file, Response
 from flask_cors import CORS
-import cv2
-import numpy as np
 import os
-import time
 import logging
 from dotenv import load_dotenv
 from datetime import datetime
 from pathlib import Path
 import platform
+import importlib.util
 import json
 import base64
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
-# Import our custom modules
-try:
-    # Try to import Raspberry Pi specific modules
-    from hardware.camera import BlockSnapCamera
-    IS_RASPBERRY_PI = True
-except (ImportError, RuntimeError):
-    # If import fails, use mock camera
-    from hardware.mock_camera import MockCamera
-    IS_RASPBERRY_PI = False
+# Detect the platform from the Raspberry Pi modules being installed. Nothing is
+# imported here: the hardware package pulls in OpenCV through its mock camera,
+# and the camera itself is only created when first needed.
+IS_RASPBERRY_PI = all(importlib.util.find_spec(name) is not None for name in ('RPi', 'picamera2'))
 
-from backend.ipfs_handler import IPFSHandler
-from backend.blockchain_handler import BlockchainHandler
-from backend.dashcam_manager import DashcamManager
-from backend.video_handler import VideoChunk  # Import VideoChunk from video_handler instead
+from backend.components import registry, ComponentUnavailable
+from backend.merkle import verify_chunk_proof, add_manifest_chunks
+from backend.content_cache import TTLCache
 
 # Load environment variables
 load_dotenv()
@@ -41,31 +37,50 @@ CORS(app)  # Enable CORS for all routes
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize components
-try:
-    # Initialize camera based on platform
+def _camera():
+    """Create the camera for the current platform"""
     if IS_RASPBERRY_PI:
         logger.info("Initializing Raspberry Pi camera")
-        camera = BlockSnapCamera()
-    else:
-        logger.info("Initializing mock camera for testing")
-        camera = MockCamera()
-    
-    ipfs_handler = IPFSHandler()
-    blockchain_handler = BlockchainHandler()
-    dashcam_manager = DashcamManager()  # Initialize dashcam manager
-    logger.info("All components initialized successfully")
-except Exception as e:
-    logger.error(f"Error initializing components: {str(e)}")
-    raise
+        return registry.import_module('hardware.camera').BlockSnapCamera()
+    # The mock camera pulls in OpenCV
+    logger.info("Initializing mock camera for testing")
+    return registry.import_module('hardware.mock_camera').MockCamera()
+
+# IPFS, blockchain, indexer and dashcam are shared lazy singletons (see
+# backend.components): importing this module does no network I/O, and a
+# backend that is down only fails the routes that need it
+registry.register('camera', _camera, cleanup=lambda camera: camera.cleanup())
+
+# /verify runs its IPFS and chain checks side by side and caches the outcome briefly
+verify_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv('VERIFY_WORKERS', 8)),
+    thread_name_prefix='verify'
+)
+verify_cache = TTLCache(
+    ttl=float(os.getenv('VERIFY_CACHE_TTL', 30)),
+    negative_ttl=float(os.getenv('VERIFY_NEGATIVE_TTL', 5))
+)
+app_import_seconds = time.perf_counter() - _import_started
+
+@app.errorhandler(ComponentUnavailable)
+def component_unavailable(e):
+    """A subsystem the route depends on could not be initialized"""
+    return jsonify({'error': str(e)}), 503
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Health check endpoint; reports each subsystem without initializing it"""
+    components = registry.get_status()
+    degraded = any(c['state'] == 'unavailable' for c in components.values())
+    ipfs_handler = registry.peek('ipfs')
     return jsonify({
-        'status': 'healthy',
+        'status': 'degraded' if degraded else 'healthy',
         'timestamp': datetime.now().isoformat(),
-        'platform': 'Raspberry Pi' if IS_RASPBERRY_PI else 'Test Environment'
+        'platform': 'Raspberry Pi' if IS_RASPBERRY_PI else 'Test Environment',
+        'components': components,
+        'startup': dict(registry.get_startup_report(), app_import_seconds=round(app_import_seconds, 4)),
+        'ipfs_cache': ipfs_handler.get_cache_stats() if ipfs_handler else None,
+        'verify_cache': verify_cache.get_stats()
     })
 
 @app.route('/capture', methods=['POST'])
@@ -77,6 +92,8 @@ def capture_photo():
         "image_data": "base64_encoded_image_data"
     }
     """
+    ipfs_handler = registry.get('ipfs')
+    blockchain_handler = registry.get('blockchain')
     try:
         # Validate request
         data = request.get_json()
@@ -145,12 +162,18 @@ def capture_photo():
 @app.route('/verify/<image_cid>', methods=['GET'])
 def verify_photo(image_cid):
     """Verify a photo's authenticity and ownership"""
+    ipfs_handler = registry.get('ipfs')
+    blockchain_handler = registry.get('blockchain')
     try:
-        # Check if content exists on IPFS
-        ipfs_exists = ipfs_handler.verify_content(image_cid)
+        response = verify_cache.get(image_cid)
+        if response is not None:
+            return jsonify(response)
         
-        # Check blockchain records
-        blockchain_exists, owner = blockchain_handler.verify_photo(image_cid)
+        # Check IPFS and blockchain records concurrently
+        ipfs_check = verify_pool.submit(ipfs_handler.verify_content, image_cid)
+        chain_check = verify_pool.submit(blockchain_handler.verify_photo, image_cid)
+        ipfs_exists = ipfs_check.result()
+        blockchain_exists, owner = chain_check.result()
         
         response = {
             'exists_on_ipfs': ipfs_exists,
@@ -159,24 +182,61 @@ def verify_photo(image_cid):
             'ipfs_url': ipfs_handler.get_ipfs_url(image_cid) if ipfs_exists else None
         }
         
+        # Misses are retried sooner, e.g. for a photo that is still being minted
+        verify_cache.put(image_cid, response, negative=not (ipfs_exists and blockchain_exists))
         return jsonify(response)
         
     except Exception as e:
         logger.error(f"Error in verify endpoint: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/verify/session-chunk', methods=['POST'])
+def verify_session_chunk():
+    """Verify a Merkle inclusion proof for a video chunk"""
+    blockchain_handler = registry.get('blockchain')
+    try:
+        data = request.get_json() or {}
+        missing = [k for k in ('sequence_number', 'video_cid', 'metadata_cid', 'proof') if k not in data]
+        if missing:
+            return jsonify({'error': f"Missing fields: {', '.join(missing)}"}), 400
+        
+        # The proof itself is checked locally; the chain only supplies the committed root
+        committed = None
+        if data.get('session_id') is not None:
+            committed = blockchain_handler.get_session_root(data['session_id'])
+        root = data.get('root') or (committed and committed['root'])
+        if not root:
+            return jsonify({'error': 'No root given and no session_id to look it up'}), 400
+        
+        valid = verify_chunk_proof(data, data['proof'], root)
+        return jsonify({
+            'valid_proof': valid,
+            'root': root,
+            'committed_on_chain': committed is not None and committed['root'].lower() == root.lower(),
+            'committed_chunk_count': committed['chunk_count'] if committed else None
+        })
+        
+    except Exception as e:
+        logger.error(f"Error in verify session chunk endpoint: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/token/<int:token_id>', methods=['GET'])
 def get_token_info(token_id):
     """Get information about a specific token"""
+    ipfs_handler = registry.get('ipfs')
+    blockchain_handler = registry.get('blockchain')
     try:
-        metadata_uri = blockchain_handler.get_token_uri(token_id)
-        image_cid = blockchain_handler.get_image_cid(token_id)
+        # Owner, URI and CID in a single round trip
+        token = blockchain_handler.get_tokens([token_id])[0]
+        if token is None:
+            return jsonify({'error': 'Token not found'}), 404
         
         response = {
             'token_id': token_id,
-            'metadata_uri': metadata_uri,
-            'image_cid': image_cid,
-            'image_url': ipfs_handler.get_ipfs_url(image_cid)
+            'owner': token['owner'],
+            'metadata_uri': token['metadata_uri'],
+            'image_cid': token['image_cid'],
+            'image_url': ipfs_handler.get_ipfs_url(token['image_cid'])
         }
         
         return jsonify(response)
@@ -188,60 +248,29 @@ def get_token_info(token_id):
 @app.route('/nfts/<wallet_address>', methods=['GET'])
 def get_nfts_by_wallet(wallet_address):
     """Get all NFTs owned by a wallet address"""
+    ipfs_handler = registry.get('ipfs')
+    nft_indexer = registry.get('indexer')
     try:
-        # Get the event signature for PhotoMinted
-        event_signature_hash = blockchain_handler.w3.keccak(text="PhotoMinted(uint256,address,string,string)").hex()
-        
-        # Get logs for the PhotoMinted event
-        logs = blockchain_handler.w3.eth.get_logs({
-            'address': blockchain_handler.contract.address,
-            'topics': [event_signature_hash],
-            'fromBlock': 0,
-            'toBlock': 'latest'
-        })
-        
-        app.logger.info(f"Found {len(logs)} total PhotoMinted events")
+        tokens = nft_indexer.get_tokens_by_owner(wallet_address)
         
         nfts = []
-        # Check each token from logs
-        for log in logs:
-            try:
-                # Decode the log data
-                decoded_log = blockchain_handler.contract.events.PhotoMinted().process_log(log)
-                token_id = decoded_log['args']['tokenId']
-                
-                # Check if this wallet owns the token
-                owner = blockchain_handler.contract.functions.ownerOf(token_id).call()
-                if owner.lower() == wallet_address.lower():
-                    # Get token details
-                    metadata_uri = blockchain_handler.get_token_uri(token_id)
-                    image_cid = blockchain_handler.get_image_cid(token_id)
-                    
-                    # Get transaction hash from the event log
-                    transaction_hash = decoded_log.transactionHash.hex()
-                    
-                    # Get metadata from IPFS if available
-                    metadata = ipfs_handler.get_json(metadata_uri) or {
-                        'name': f'BlockSnap #{token_id}',
-                        'description': 'A photo captured using BlockSnap'
-                    }
-                    
-                    nft = {
-                        'tokenId': token_id,
-                        'name': metadata.get('name', f'BlockSnap #{token_id}'),
-                        'description': metadata.get('description', 'A photo captured using BlockSnap'),
-                        'image': ipfs_handler.get_ipfs_url(image_cid),
-                        'image_cid': image_cid,
-                        'metadata_uri': metadata_uri,
-                        'transaction_hash': transaction_hash
-                    }
-                    nfts.append(nft)
-                    app.logger.info(f"Found NFT {token_id} owned by {wallet_address}")
-            except Exception as e:
-                app.logger.error(f"Error processing log: {str(e)}")
-                continue
+        for token in tokens:
+            token_id = token['token_id']
+            
+            # Metadata is served from the IPFS content cache after the first load
+            metadata = ipfs_handler.get_json(token['metadata_uri']) if token['metadata_uri'] else {}
+            
+            nfts.append({
+                'tokenId': token_id,
+                'name': metadata.get('name', f'BlockSnap #{token_id}'),
+                'description': metadata.get('description', 'A photo captured using BlockSnap'),
+                'image': ipfs_handler.get_ipfs_url(token['image_cid']),
+                'image_cid': token['image_cid'],
+                'metadata_uri': token['metadata_uri'],
+                'transaction_hash': token['mint_tx']
+            })
         
-        return jsonify({'nfts': nfts})
+        return jsonify({'nfts': nfts, 'indexed_block': nft_indexer.indexed_block})
         
     except Exception as e:
         app.logger.error(f"Error in get NFTs endpoint: {str(e)}")
@@ -250,9 +279,25 @@ def get_nfts_by_wallet(wallet_address):
 @app.route('/video-sessions/<wallet_address>', methods=['GET'])
 def get_video_sessions(wallet_address):
     """Get all video sessions for a wallet"""
+    ipfs_handler = registry.get('ipfs')
+    blockchain_handler = registry.get('blockchain')
     try:
         sessions = blockchain_handler.get_video_sessions(wallet_address)
         
+        # Merkle-mode sessions list their chunks in the manifest committed with their root
+        for session in sessions:
+            if session.get('manifest_cid') and not session['chunks']:
+                try:
+                    add_manifest_chunks(session, ipfs_handler.get_json(session['manifest_cid']))
+                except Exception as e:
+                    app.logger.warning(f"Could not load chunks of session {session['session_id']}: {str(e)}")
+        
+        # Probe every chunk of every session at once; slow ones are reported as pending
+        availability = ipfs_handler.check_availability(
+            [chunk.get('video_cid', '') for session in sessions for chunk in session.get('chunks', [])],
+            deadline=float(os.getenv('AVAILABILITY_DEADLINE', 10))
+        )
+        
         # Enhance session data with IPFS content
         for session in sessions:
             session_id = session.get('session_id')
@@ -261,18 +306,22 @@ def get_video_sessions(wallet_address):
                 for chunk in session.get('chunks', []):
                     try:
                         # Check if video is available in IPFS
-                        is_available = ipfs_handler.verify_content(chunk['video_cid'])
+                        is_available = availability.get(chunk['video_cid'])
+                        if is_available is None:
+                            status = 'pending'
+                        else:
+                            status = 'ready' if is_available else 'unavailable'
                         chunk_data = {
                             'video_cid': chunk['video_cid'],
                             'sequence_number': chunk['sequence_number'],
                             'timestamp': chunk['timestamp'],
                             'transaction_hash': chunk.get('transaction_hash', ''),
-                            'status': 'ready' if is_available else 'unavailable'
+                            'status': status
                         }
                         if is_available:
                             chunk_data['video_url'] = ipfs_handler.get_ipfs_url(chunk['video_cid'])
                         chunks.append(chunk_data)
-                        app.logger.info(f"Chunk {chunk['video_cid']} status: {'available' if is_available else 'unavailable'}")
+                        app.logger.info(f"Chunk {chunk['video_cid']} status: {status}")
                     except Exception as e:
                         app.logger.error(f"Error processing chunk: {str(e)}")
                         chunks.append({
@@ -299,10 +348,14 @@ def get_video_sessions(wallet_address):
 @app.route('/video-sessions/<session_id>/status', methods=['GET'])
 def get_session_status(session_id):
     """Get status of a specific video session"""
+    blockchain_handler = registry.get('blockchain')
+    # Only a running dashcam can hold the session; don't start one to find out
+    dashcam_manager = registry.peek('dashcam')
     try:
-        status = dashcam_manager.get_status()
-        if status.get('session_id') == int(session_id):
-            return jsonify(status)
+        if dashcam_manager is not None:
+            status = dashcam_manager.get_status()
+            if status.get('session_id') == int(session_id):
+                return jsonify(status)
         
         # Session not active, get from blockchain
         session = blockchain_handler.get_video_session(session_id)
@@ -315,9 +368,24 @@ def get_session_status(session_id):
         app.logger.error(f"Error getting session status: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/video-sessions/<int:session_id>/proof/<int:sequence_number>', methods=['GET'])
+def get_chunk_proof(session_id, sequence_number):
+    """Get the Merkle inclusion proof of a chunk recorded in Merkle mode"""
+    dashcam_manager = registry.get('dashcam')
+    try:
+        proof = dashcam_manager.get_chunk_proof(session_id, sequence_number)
+        if proof is None:
+            return jsonify({'error': 'Proof not found'}), 404
+        return jsonify(proof)
+        
+    except Exception as e:
+        app.logger.error(f"Error getting chunk proof: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/dashcam/start', methods=['POST'])
 def start_recording():
     """Start dashcam recording"""
+    dashcam_manager = registry.get('dashcam')
     try:
         if dashcam_manager.is_recording:
             return jsonify({'error': 'Recording already in progress'}), 400
@@ -341,6 +409,7 @@ def start_recording():
 @app.route('/dashcam/stop', methods=['POST'])
 def stop_recording():
     """Stop dashcam recording"""
+    dashcam_manager = registry.get('dashcam')
     try:
         if not dashcam_manager.is_recording:
             return jsonify({'error': 'No recording in progress'}), 400
@@ -352,7 +421,8 @@ def stop_recording():
             'status': 'stopped',
             'session_id': session_id,
             'error_count': dashcam_manager.error_count,
-            'last_error': dashcam_manager.last_error
+            'last_error': dashcam_manager.last_error,
+            'proof_manifest_cid': dashcam_manager.proof_manifest_cid
         })
         
     except Exception as e:
@@ -362,6 +432,7 @@ def stop_recording():
 @app.route('/dashcam/status', methods=['GET'])
 def get_recording_status():
     """Get current recording status"""
+    dashcam_manager = registry.get('dashcam')
     try:
         status = dashcam_manager.get_status()
         return jsonify(status)
@@ -373,7 +444,10 @@ def get_recording_status():
 @app.route('/api/dashcam/preview', methods=['GET'])
 def get_preview_stream():
     """Get video preview stream"""
+    dashcam_manager = registry.get('dashcam')
     try:
+        import cv2
+        
         def generate_frames():
             while dashcam_manager.is_recording:
                 frame = dashcam_manager.recorder.get_preview_frame()
@@ -397,6 +471,8 @@ def get_preview_stream():
 @app.route('/api/dashcam/latest-chunk', methods=['GET'])
 def get_latest_chunk():
     """Get latest recorded chunk URL"""
+    ipfs_handler = registry.get('ipfs')
+    dashcam_manager = registry.get('dashcam')
     try:
         if not dashcam_manager.is_recording:
             return jsonify({
@@ -427,6 +503,7 @@ def get_latest_chunk():
 @app.route('/dashcam/chunk', methods=['POST'])
 def upload_chunk():
     """Handle video chunk upload"""
+    dashcam_manager = registry.get('dashcam')
     try:
         if 'video' not in request.files:
             return jsonify({'error': 'No video file provided'}), 400
@@ -438,21 +515,32 @@ def upload_chunk():
         if not session_id:
             return jsonify({'error': 'No session ID provided'}), 400
             
+        # Spool the upload to disk; the chunk is streamed from there instead of held in memory
+        sequence_number = dashcam_manager.current_chunk
+        fd, chunk_path = tempfile.mkstemp(
+            prefix=f"upload_{session_id}_{sequence_number}_",
+            suffix='.webm',
+            dir=str(dashcam_manager.recorder.temp_dir)
+        )
+        os.close(fd)
+        video_file.save(chunk_path)
+        
         # Create chunk metadata
         metadata = {
             'timestamp': timestamp,
             'session_id': session_id,
             'content_type': video_file.content_type,
-            'size': len(video_file.read())
+            'size': os.path.getsize(chunk_path)
         }
-        video_file.seek(0)  # Reset file pointer after reading
         
         # Create chunk object
+        from backend.video_handler import VideoChunk
         chunk = VideoChunk(
             start_time=float(timestamp)/1000 if timestamp else time.time(),
-            data=video_file.read(),
-            sequence_number=dashcam_manager.current_chunk,
-            metadata=metadata
+            path=chunk_path,
+            sequence_number=sequence_number,
+            metadata=metadata,
+            temporary=True
         )
         
         # Add to upload queue
@@ -470,8 +558,8 @@ def upload_chunk():
 def cleanup():
     """Cleanup resources on shutdown"""
     try:
-        camera.cleanup()
-        ipfs_handler.cleanup()
+        registry.close()
+        verify_pool.shutdown(wait=False)
         logger.info("Cleanup completed successfully")
     except Exception as e:
         logger.error(f"Error during cleanup: {str(e)}")
@@ -481,8 +569,13 @@ if __name__ == "__main__":
         # Create required directories
         Path("captures").mkdir(exist_ok=True)
         
+        # Build the backends in the background; with the reloader only the serving process does
+        debug = not IS_RASPBERRY_PI
+        if os.getenv('WARM_UP', 'true').lower() == 'true' and (not debug or os.getenv('WERKZEUG_RUN_MAIN') == 'true'):
+            registry.warm_up(['ipfs', 'blockchain', 'indexer', 'dashcam'])
+        
         # Start the Flask app
         port = int(os.getenv('PORT', 5000))
-        app.run(host='0.0.0.0', port=port, debug=not IS_RASPBERRY_PI)
+        app.run(host='0.0.0.0', port=port, debug=debug)
     finally:
         cleanup() 
\ No newline at end of file
@@ -0,0 +1,544 @@
+#!/usr/bin/env python3
+
+import asyncio
+import base64
+import importlib.util
+import logging
+import os
+import platform
+import tempfile
+import time
+from datetime import datetime
+from typing import Optional
+
+from aiohttp import web
+from dotenv import load_dotenv
+
+from backend.async_blockchain_handler import AsyncBlockchainHandler
+from backend.async_ipfs_handler import AsyncIPFSHandler
+from backend.components import registry
+from backend.content_cache import TTLCache
+from backend.dashcam_manager import DashcamManager
+from backend.event_indexer import NFTIndexer
+from backend.merkle import verify_chunk_proof, add_manifest_chunks, manifest_chunks
+from backend.video_handler import VideoChunk
+
+# Same platform detection as backend.app, without importing the hardware package
+IS_RASPBERRY_PI = all(importlib.util.find_spec(name) is not None for name in ('RPi', 'picamera2'))
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Components, created on startup inside the event loop
+IPFS = web.AppKey('ipfs', AsyncIPFSHandler)
+CHAIN = web.AppKey('chain', AsyncBlockchainHandler)
+DASHCAM = web.AppKey('dashcam', DashcamManager)
+INDEXER = web.AppKey('indexer', NFTIndexer)
+VERIFY_CACHE = web.AppKey('verify_cache', TTLCache)
+
+routes = web.RouteTableDef()
+
+
+def error(message: str, status: int = 500) -> web.Response:
+    return web.json_response({'error': message}, status=status)
+
+
+@web.middleware
+async def cors_middleware(request: web.Request, handler):
+    """Allow every origin, like flask_cors in backend.app"""
+    if request.method == 'OPTIONS':
+        response = web.Response()
+    else:
+        response = await handler(request)
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    response.headers['Access-Control-Allow-Headers'] = '*'
+    response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
+    return response
+
+
+@routes.get('/health')
+async def health_check(request: web.Request) -> web.Response:
+    """Health check endpoint"""
+    return web.json_response({
+        'status': 'healthy',
+        'timestamp': datetime.now().isoformat(),
+        'platform': 'Raspberry Pi' if IS_RASPBERRY_PI else 'Test Environment',
+        'ipfs_cache': request.app[IPFS].get_cache_stats(),
+        'verify_cache': request.app[VERIFY_CACHE].get_stats()
+    })
+
+
+@routes.post('/capture')
+async def capture_photo(request: web.Request) -> web.Response:
+    """Store a base64 photo on IPFS and mint it"""
+    try:
+        data = await request.json()
+        if not data or 'wallet_address' not in data or 'image_data' not in data:
+            return error('wallet_address and image_data are required', 400)
+
+        image_data = data['image_data']
+        if image_data.startswith('data:image'):
+            image_data = image_data.split(',')[1]
+
+        metadata = {
+            'timestamp': datetime.now().isoformat(),
+            'platform': platform.system(),
+            'source': 'web_capture'
+        }
+        ipfs = request.app[IPFS]
+        file_cid, metadata_cid = await ipfs.upload_photo(base64.b64decode(image_data), metadata)
+        metadata_uri = ipfs.get_ipfs_url(metadata_cid)
+
+        # Writes go through the synchronous handler that owns the signer's nonce
+        tx_hash, token_id = await asyncio.to_thread(
+            request.app[DASHCAM].blockchain_handler.mint_photo_nft,
+            data['wallet_address'], file_cid, metadata_uri
+        )
+
+        return web.json_response({
+            'status': 'success',
+            'data': {
+                'file_cid': file_cid,
+                'metadata_cid': metadata_cid,
+                'token_id': token_id,
+                'transaction_hash': tx_hash,
+                'metadata_uri': metadata_uri,
+                'image_url': ipfs.get_ipfs_url(file_cid)
+            }
+        })
+
+    except Exception as e:
+        logger.error(f"Error in capture endpoint: {str(e)}")
+        return error(str(e))
+
+
+@routes.get('/verify/{image_cid}')
+async def verify_photo(request: web.Request) -> web.Response:
+    """Verify a photo's authenticity and ownership"""
+    image_cid = request.match_info['image_cid']
+    try:
+        cache = request.app[VERIFY_CACHE]
+        response = cache.get(image_cid)
+        if response is not None:
+            return web.json_response(response)
+
+        ipfs = request.app[IPFS]
+        ipfs_exists, (blockchain_exists, owner) = await asyncio.gather(
+            ipfs.verify_content(image_cid),
+            request.app[CHAIN].verify_photo(image_cid)
+        )
+
+        response = {
+            'exists_on_ipfs': ipfs_exists,
+            'exists_on_blockchain': blockchain_exists,
+            'owner': owner if blockchain_exists else None,
+            'ipfs_url': ipfs.get_ipfs_url(image_cid) if ipfs_exists else None
+        }
+        cache.put(image_cid, response, negative=not (ipfs_exists and blockchain_exists))
+        return web.json_response(response)
+
+    except Exception as e:
+        logger.error(f"Error in verify endpoint: {str(e)}")
+        return error(str(e))
+
+
+@routes.post('/verify/session-chunk')
+async def verify_session_chunk(request: web.Request) -> web.Response:
+    """Verify a Merkle inclusion proof for a video chunk"""
+    try:
+        data = await request.json() or {}
+        missing = [k for k in ('sequence_number', 'video_cid', 'metadata_cid', 'proof') if k not in data]
+        if missing:
+            return error(f"Missing fields: {', '.join(missing)}", 400)
+
+        committed = None
+        if data.get('session_id') is not None:
+            committed = await request.app[CHAIN].get_session_root(data['session_id'])
+        root = data.get('root') or (committed and committed['root'])
+        if not root:
+            return error('No root given and no session_id to look it up', 400)
+
+        return web.json_response({
+            'valid_proof': verify_chunk_proof(data, data['proof'], root),
+            'root': root,
+            'committed_on_chain': committed is not None and committed['root'].lower() == root.lower(),
+            'committed_chunk_count': committed['chunk_count'] if committed else None
+        })
+
+    except Exception as e:
+        logger.error(f"Error in verify session chunk endpoint: {str(e)}")
+        return error(str(e))
+
+
+@routes.get(r'/token/{token_id:\d+}')
+async def get_token_info(request: web.Request) -> web.Response:
+    """Get information about a specific token"""
+    token_id = int(request.match_info['token_id'])
+    try:
+        token = (await request.app[CHAIN].get_tokens([token_id]))[0]
+        if token is None:
+            return error('Token not found', 404)
+
+        return web.json_response({
+            'token_id': token_id,
+            'owner': token['owner'],
+            'metadata_uri': token['metadata_uri'],
+            'image_cid': token['image_cid'],
+            'image_url': request.app[IPFS].get_ipfs_url(token['image_cid'])
+        })
+
+    except Exception as e:
+        logger.error(f"Error in token info endpoint: {str(e)}")
+        return error(str(e))
+
+
+@routes.get('/nfts/{wallet_address}')
+async def get_nfts_by_wallet(request: web.Request) -> web.Response:
+    """Get all NFTs owned by a wallet address"""
+    try:
+        indexer = request.app[INDEXER]
+        ipfs = request.app[IPFS]
+        tokens = await asyncio.to_thread(indexer.get_tokens_by_owner, request.match_info['wallet_address'])
+
+        # All metadata documents are fetched at once
+        metadata_list = await asyncio.gather(*(
+            ipfs.get_json(token['metadata_uri']) if token['metadata_uri'] else asyncio.sleep(0, {})
+            for token in tokens
+        ))
+
+        nfts = []
+        for token, metadata in zip(tokens, metadata_list):
+            token_id = token['token_id']
+            nfts.append({
+                'tokenId': token_id,
+                'name': metadata.get('name', f'BlockSnap #{token_id}'),
+                'description': metadata.get('description', 'A photo captured using BlockSnap'),
+                'image': ipfs.get_ipfs_url(token['image_cid']),
+                'image_cid': token['image_cid'],
+                'metadata_uri': token['metadata_uri'],
+                'transaction_hash': token['mint_tx']
+            })
+
+        return web.json_response({'nfts': nfts, 'indexed_block': indexer.indexed_block})
+
+    except Exception as e:
+        logger.error(f"Error in get NFTs endpoint: {str(e)}")
+        return error(str(e))
+
+
+@routes.get('/video-sessions/{wallet_address}')
+async def get_video_sessions(request: web.Request) -> web.Response:
+    """Get all video sessions for a wallet"""
+    try:
+        ipfs = request.app[IPFS]
+        sessions = await request.app[CHAIN].get_video_sessions(request.match_info['wallet_address'])
+
+        # Merkle-mode sessions list their chunks in the manifest committed with their root
+        merkle_sessions = [session for session in sessions if session.get('manifest_cid') and not session['chunks']]
+        manifests = await asyncio.gather(*(ipfs.get_json(session['manifest_cid']) for session in merkle_sessions))
+        for session, manifest in zip(merkle_sessions, manifests):
+            try:
+                add_manifest_chunks(session, manifest)
+            except ValueError as e:
+                logger.warning(f"Could not load chunks of session {session['session_id']}: {str(e)}")
+
+        # Probe every chunk of every session at once; slow ones are reported as pending
+        availability = await ipfs.check_availability(
+            [chunk.get('video_cid', '') for session in sessions for chunk in session.get('chunks', [])],
+            deadline=float(os.getenv('AVAILABILITY_DEADLINE', 10))
+        )
+
+        for session in sessions:
+            chunks = []
+            for chunk in session.get('chunks', []):
+                is_available = availability.get(chunk['video_cid'])
+                if is_available is None:
+                    status = 'pending'
+                else:
+                    status = 'ready' if is_available else 'unavailable'
+                chunk_data = {
+                    'video_cid': chunk['video_cid'],
+                    'sequence_number': chunk['sequence_number'],
+                    'timestamp': chunk['timestamp'],
+                    'transaction_hash': chunk.get('transaction_hash', ''),
+                    'status': status
+                }
+                if is_available:
+                    chunk_data['video_url'] = ipfs.get_ipfs_url(chunk['video_cid'])
+                chunks.append(chunk_data)
+            session['chunks'] = sorted(chunks, key=lambda x: x['sequence_number'])
+
+        return web.json_response({'sessions': sessions})
+
+    except Exception as e:
+        logger.error(f"Error getting video sessions: {str(e)}")
+        return error(str(e))
+
+
+@routes.get(r'/video-sessions/{session_id:\d+}/status')
+async def get_session_status(request: web.Request) -> web.Response:
+    """Get status of a specific video session"""
+    session_id = int(request.match_info['session_id'])
+    try:
+        status = await asyncio.to_thread(request.app[DASHCAM].get_status)
+        if status.get('session_id') == session_id:
+            return web.json_response(status)
+
+        # Session not active, get from blockchain
+        session = await request.app[CHAIN].get_video_session(session_id)
+        if not session:
+            return error('Session not found', 404)
+        return web.json_response(session)
+
+    except Exception as e:
+        logger.error(f"Error getting session status: {str(e)}")
+        return error(str(e))
+
+
+@routes.get(r'/video-sessions/{session_id:\d+}/proof/{sequence_number:\d+}')
+async def get_chunk_proof(request: web.Request) -> web.Response:
+    """Get the Merkle inclusion proof of a chunk recorded in Merkle mode"""
+    session_id = int(request.match_info['session_id'])
+    sequence_number = int(request.match_info['sequence_number'])
+    try:
+        dashcam = request.app[DASHCAM]
+        if dashcam.session_tree is not None and dashcam.tree_session_id == session_id:
+            proof = dashcam.get_chunk_proof(session_id, sequence_number)
+        else:
+            proof = await committed_chunk_proof(request.app, session_id, sequence_number)
+        if proof is None:
+            return error('Proof not found', 404)
+        return web.json_response(proof)
+
+    except Exception as e:
+        logger.error(f"Error getting chunk proof: {str(e)}")
+        return error(str(e))
+
+
+async def committed_chunk_proof(app: web.Application, session_id: int, sequence_number: int) -> Optional[dict]:
+    """Proof of a chunk from the manifest committed on-chain with the session's root"""
+    chain = app[CHAIN]
+    if not chain.supports_session_roots:
+        return None
+    committed = await chain.get_session_root(session_id)
+    if not committed['manifest_cid']:
+        return None
+    manifest = await app[IPFS].get_json(committed['manifest_cid'])
+    for chunk in manifest_chunks(manifest, committed['root']):
+        if chunk['sequence_number'] == sequence_number:
+            return dict(chunk, session_id=session_id, committed_chunk_count=committed['chunk_count'])
+    return None
+
+
+@routes.post('/dashcam/start')
+async def start_recording(request: web.Request) -> web.Response:
+    """Start dashcam recording"""
+    dashcam = request.app[DASHCAM]
+    try:
+        if dashcam.is_recording:
+            return error('Recording already in progress', 400)
+
+        if not await asyncio.to_thread(dashcam.start_recording):
+            return web.json_response({
+                'error': 'Failed to start recording',
+                'details': dashcam.last_error
+            }, status=500)
+
+        return web.json_response({'status': 'started', 'session_id': dashcam.session_id})
+
+    except Exception as e:
+        logger.error(f"Error starting recording: {str(e)}")
+        return error(str(e))
+
+
+@routes.post('/dashcam/stop')
+async def stop_recording(request: web.Request) -> web.Response:
+    """Stop dashcam recording"""
+    dashcam = request.app[DASHCAM]
+    try:
+        if not dashcam.is_recording:
+            return error('No recording in progress', 400)
+
+        session_id = dashcam.session_id
+        await asyncio.to_thread(dashcam.stop_recording)
+
+        return web.json_response({
+            'status': 'stopped',
+            'session_id': session_id,
+            'error_count': dashcam.error_count,
+            'last_error': dashcam.last_error,
+            'proof_manifest_cid': dashcam.proof_manifest_cid
+        })
+
+    except Exception as e:
+        logger.error(f"Error stopping recording: {str(e)}")
+        return error(str(e))
+
+
+@routes.get('/dashcam/status')
+async def get_recording_status(request: web.Request) -> web.Response:
+    """Get current recording status"""
+    try:
+        return web.json_response(await asyncio.to_thread(request.app[DASHCAM].get_status))
+    except Exception as e:
+        logger.error(f"Error getting status: {str(e)}")
+        return error(str(e))
+
+
+def encode_preview_frame(recorder) -> Optional[bytes]:
+    """Latest preview frame as JPEG; blocking, so run it off the event loop"""
+    import cv2
+
+    frame = recorder.get_preview_frame()
+    if frame is None:
+        return None
+    ret, buffer = cv2.imencode('.jpg', frame)
+    return buffer.tobytes() if ret else None
+
+
+@routes.get('/api/dashcam/preview')
+async def get_preview_stream(request: web.Request) -> web.StreamResponse:
+    """Get video preview stream"""
+    dashcam = request.app[DASHCAM]
+    response = web.StreamResponse(headers={'Content-Type': 'multipart/x-mixed-replace; boundary=frame'})
+    await response.prepare(request)
+    while dashcam.is_recording:
+        jpeg = await asyncio.to_thread(encode_preview_frame, dashcam.recorder)
+        if jpeg is not None:
+            await response.write(
+                b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n'
+            )
+        await asyncio.sleep(1/30)  # 30 FPS
+    return response
+
+
+@routes.get('/api/dashcam/latest-chunk')
+async def get_latest_chunk(request: web.Request) -> web.Response:
+    """Get latest recorded chunk URL"""
+    dashcam = request.app[DASHCAM]
+    ipfs = request.app[IPFS]
+    try:
+        if not dashcam.is_recording:
+            return web.json_response({'status': 'error', 'message': 'Not recording'}, status=400)
+
+        latest = dashcam.get_latest_chunk()
+        if latest:
+            return web.json_response({
+                'status': 'success',
+                'data': {
+                    'video_url': f"{ipfs.ipfs_gateway}/ipfs/{latest['video_cid']}",
+                    'metadata_url': f"{ipfs.ipfs_gateway}/ipfs/{latest['metadata_cid']}",
+                    'sequence_number': latest['sequence_number']
+                }
+            })
+        return web.json_response({'status': 'error', 'message': 'No chunks available'}, status=404)
+    except Exception as e:
+        return web.json_response({'status': 'error', 'message': str(e)}, status=500)
+
+
+@routes.post('/dashcam/chunk')
+async def upload_chunk(request: web.Request) -> web.Response:
+    """Handle video chunk upload"""
+    dashcam = request.app[DASHCAM]
+    chunk_path = None
+    try:
+        fields = {}
+        content_type = None
+        sequence_number = dashcam.current_chunk
+
+        # Spool the video part to disk as it arrives
+        reader = await request.multipart()
+        async for part in reader:
+            if part.name == 'video':
+                fd, chunk_path = tempfile.mkstemp(
+                    prefix=f"upload_{sequence_number}_",
+                    suffix='.webm',
+                    dir=str(dashcam.recorder.temp_dir)
+                )
+                content_type = part.headers.get('Content-Type')
+                with os.fdopen(fd, 'wb') as f:
+                    while True:
+                        block = await part.read_chunk()
+                        if not block:
+                            break
+                        f.write(block)
+            else:
+                fields[part.name] = await part.text()
+
+        if chunk_path is None:
+            return error('No video file provided', 400)
+        session_id = fields.get('session_id')
+        timestamp = fields.get('timestamp')
+        if not session_id:
+            os.unlink(chunk_path)
+            return error('No session ID provided', 400)
+
+        chunk = VideoChunk(
+            start_time=float(timestamp)/1000 if timestamp else time.time(),
+            path=chunk_path,
+            sequence_number=sequence_number,
+            metadata={
+                'timestamp': timestamp,
+                'session_id': session_id,
+                'content_type': content_type,
+                'size': os.path.getsize(chunk_path)
+            },
+            temporary=True
+        )
+        # Waits for room when the upload queue applies backpressure
+        await asyncio.to_thread(dashcam.add_chunk, chunk)
+
+        return web.json_response({'status': 'success', 'chunk_number': chunk.sequence_number})
+
+    except Exception as e:
+        logger.error(f"Error handling chunk upload: {str(e)}")
+        return error(str(e))
+
+
+async def on_startup(app: web.Application) -> None:
+    """Create the components; the synchronous ones are built on a worker thread"""
+    dashcam = await asyncio.to_thread(registry.get, 'dashcam')
+    indexer = await asyncio.to_thread(registry.get, 'indexer')
+
+    # Share the content cache with the dashcam's IPFS handler
+    ipfs = AsyncIPFSHandler(content_cache=dashcam.ipfs.content_cache)
+    await ipfs.start()
+    chain = AsyncBlockchainHandler(token_index=indexer)
+    await chain.connect()
+
+    app[DASHCAM] = dashcam
+    app[INDEXER] = indexer
+    app[IPFS] = ipfs
+    app[CHAIN] = chain
+    app[VERIFY_CACHE] = TTLCache(
+        ttl=float(os.getenv('VERIFY_CACHE_TTL', 30)),
+        negative_ttl=float(os.getenv('VERIFY_NEGATIVE_TTL', 5))
+    )
+    logger.info("All components initialized successfully")
+
+
+async def on_cleanup(app: web.Application) -> None:
+    """Cleanup resources on shutdown"""
+    try:
+        await app[IPFS].close()
+        await asyncio.to_thread(registry.close)
+        logger.info("Cleanup completed successfully")
+    except Exception as e:
+        logger.error(f"Error during cleanup: {str(e)}")
+
+
+def create_app() -> web.Application:
+    """Build the asyncio variant of the BlockSnap API"""
+    app = web.Application(middlewares=[cors_middleware], client_max_size=256 * 1024 * 1024)
+    app.add_routes(routes)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+if __name__ == "__main__":
+    web.run_app(create_app(), port=int(os.getenv('PORT', 5000)))
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+
+import asyncio
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from web3 import AsyncWeb3
+from web3.providers import AsyncHTTPProvider
+
+from .blockchain_handler import (
+    load_contract_abi, code_has_function, collect_video_sessions,
+    SESSION_STARTED_TOPIC, CHUNK_ADDED_TOPIC, SESSION_ENDED_TOPIC, SESSION_ROOT_TOPIC
+)
+from .log_scanner import AsyncLogScanner
+
+
+class AsyncBlockchainHandler:
+    """
+    asyncio counterpart of BlockchainHandler for contract reads.
+
+    Transactions stay with BlockchainHandler, whose pipeline owns the
+    signer's nonce; an async app hands writes to it on a worker thread.
+    Call connect() inside the event loop before use.
+    """
+
+    def __init__(self, token_index=None):
+        """
+        Args:
+            token_index: Optional NFTIndexer answering CID lookups on
+                contracts without getTokenIdByCID
+        """
+        self.logger = logging.getLogger(__name__)
+
+        load_dotenv()
+        self.rpc_url = os.getenv('ETH_RPC_URL', 'https://rpc.buildbear.io/impossible-omegared-15eaf7dd')
+        self.contract_address = os.getenv('CONTRACT_ADDRESS')
+        if not all([self.rpc_url, self.contract_address]):
+            raise ValueError("Missing required environment variables")
+
+        self.w3 = AsyncWeb3(AsyncHTTPProvider(self.rpc_url))
+        self.contract_abi = load_contract_abi()
+        self.contract = self.w3.eth.contract(
+            address=self.w3.to_checksum_address(self.contract_address),
+            abi=self.contract_abi
+        )
+        self.token_index = token_index
+
+        # Found from the deployed code in connect() when CONTRACT_DEPLOY_BLOCK is unset
+        deploy_block = os.getenv('CONTRACT_DEPLOY_BLOCK')
+        self.deploy_block: Optional[int] = int(deploy_block) if deploy_block else None
+        self.log_scanner = AsyncLogScanner(self.w3, max_window=int(os.getenv('LOG_SCAN_WINDOW', 5000)))
+
+        # Bounds the eth_calls a single request can have in flight
+        self._call_limit = asyncio.Semaphore(int(os.getenv('RPC_ASYNC_CONCURRENCY', 32)))
+
+        self.supports_cid_lookup = False
+        self.supports_session_roots = False
+
+    async def connect(self) -> None:
+        """Check the connection and probe the deployed contract's capabilities"""
+        if not await self.w3.is_connected():
+            raise ConnectionError("Failed to connect to Ethereum network")
+        try:
+            code = await self.w3.eth.get_code(self.contract.address)
+            self.supports_cid_lookup = code_has_function(self.contract_abi, code, 'getTokenIdByCID')
+            self.supports_session_roots = code_has_function(self.contract_abi, code, 'commitSessionRoot')
+        except Exception as e:
+            self.logger.warning(f"Could not check deployed code: {str(e)}")
+        if self.deploy_block is None:
+            try:
+                self.deploy_block = await self._find_deploy_block()
+                self.logger.info(f"Contract deployed at block {self.deploy_block}")
+            except Exception as e:
+                self.logger.warning(
+                    f"Could not find the contract deployment block, scanning from genesis; "
+                    f"set CONTRACT_DEPLOY_BLOCK to avoid this: {str(e)}"
+                )
+                self.deploy_block = 0
+
+    async def _find_deploy_block(self) -> int:
+        """First block at which the contract has code, see find_deploy_block()"""
+        address = self.contract.address
+        low, high = 0, await self.w3.eth.block_number
+        if not await self.w3.eth.get_code(address, block_identifier=high):
+            raise ValueError(f"No contract code at {address}")
+        while low < high:
+            middle = (low + high) // 2
+            if await self.w3.eth.get_code(address, block_identifier=middle):
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    async def _call(self, contract_function, allow_failure: bool = False):
+        async with self._call_limit:
+            try:
+                return await contract_function.call()
+            except Exception:
+                if allow_failure:
+                    return None
+                raise
+
+    async def verify_photo(self, image_cid: str) -> Tuple[bool, Optional[str]]:
+        """
+        Verify if a photo exists and get its owner
+        Returns: Tuple(exists, owner_address)
+        """
+        try:
+            if not self.supports_cid_lookup and self.token_index is not None:
+                token = await asyncio.to_thread(self.token_index.get_token_by_cid, image_cid)
+                if token is not None:
+                    return True, self.w3.to_checksum_address(token['owner'])
+                # A miss is only final once the index has caught up with the head
+                indexed_block = await asyncio.to_thread(lambda: self.token_index.indexed_block)
+                if indexed_block >= await self.w3.eth.block_number:
+                    return False, None
+
+            exists, owner = await self._call(self.contract.functions.verifyPhoto(image_cid))
+            return exists, owner if exists else None
+        except Exception as e:
+            self.logger.error(f"Error verifying photo: {str(e)}")
+            raise
+
+    async def get_tokens(self, token_ids: List[int]) -> List[Optional[Dict]]:
+        """
+        Get owner, metadata URI and image CID for several tokens concurrently
+        Returns: One dict per token, or None for tokens that do not exist
+        """
+        functions = self.contract.functions
+        results = await asyncio.gather(*(
+            self._call(fn, allow_failure=True)
+            for token_id in token_ids
+            for fn in (functions.ownerOf(token_id), functions.tokenURI(token_id), functions.getImageCID(token_id))
+        ))
+
+        tokens = []
+        for i, token_id in enumerate(token_ids):
+            owner, metadata_uri, image_cid = results[3 * i:3 * i + 3]
+            if owner is None:
+                tokens.append(None)
+                continue
+            tokens.append({
+                'token_id': token_id,
+                'owner': owner,
+                'metadata_uri': metadata_uri,
+                'image_cid': image_cid
+            })
+        return tokens
+
+    async def get_session_root(self, session_id: int) -> Dict:
+        """
+        Get the latest committed Merkle root of a session
+        Returns: Dict with root (hex), chunk_count and manifest_cid
+        """
+        try:
+            root, chunk_count, manifest_cid = await self._call(
+                self.contract.functions.getSessionRoot(int(session_id))
+            )
+            return {'root': self.w3.to_hex(root), 'chunk_count': chunk_count, 'manifest_cid': manifest_cid}
+        except Exception as e:
+            self.logger.error(f"Error getting session root: {str(e)}")
+            raise
+
+    async def get_video_session(self, session_id: int) -> Optional[Dict]:
+        """Get the on-chain state of a session, or None if it was never started"""
+        try:
+            session_id = int(session_id)
+            calls = [
+                self._call(self.contract.functions.isSessionActive(session_id)),
+                self._call(self.contract.functions.getSessionChunks(session_id))
+            ]
+            if self.supports_session_roots:
+                calls.append(self.get_session_root(session_id))
+            is_active, chunks, *root = await asyncio.gather(*calls)
+
+            session = {
+                'session_id': session_id,
+                'is_active': is_active,
+                'chunk_count': len(chunks)
+            }
+            if root and root[0]['chunk_count']:
+                session['chunk_count'] = root[0]['chunk_count']
+                session['root'] = root[0]['root']
+                session['manifest_cid'] = root[0]['manifest_cid']
+            if not is_active and not session['chunk_count']:
+                return None
+            return session
+        except Exception as e:
+            self.logger.error(f"Failed to get video session: {str(e)}")
+            raise
+
+    async def get_video_sessions(self, wallet_address: str) -> List[Dict]:
+        """Get all video sessions for a wallet address"""
+        try:
+            events = await self.log_scanner.get_logs(
+                {
+                    'address': self.contract.address,
+                    'topics': [[
+                        SESSION_STARTED_TOPIC, CHUNK_ADDED_TOPIC, SESSION_ENDED_TOPIC, SESSION_ROOT_TOPIC
+                    ]]
+                },
+                self.deploy_block
+            )
+            return collect_video_sessions(self.contract, events, wallet_address)
+        except Exception as e:
+            self.logger.error(f"Failed to get video sessions: {str(e)}")
+            raise
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+
+import asyncio
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+from dotenv import load_dotenv
+
+from .content_cache import ContentCache, TTLCache
+from .ipfs_handler import clean_cid, photo_metadata
+
+
+class AsyncIPFSHandler:
+    """
+    asyncio counterpart of IPFSHandler for the read paths of the API and
+    photo uploads.
+
+    Uses one aiohttp session for the node API and the gateways, and the same
+    environment configuration as IPFSHandler. Call start() inside the event
+    loop before use and close() on shutdown.
+    """
+
+    def __init__(self, content_cache: Optional[ContentCache] = None):
+        """
+        Args:
+            content_cache: Cache for content read by cat(); built from the
+                IPFS_CACHE_* settings when omitted
+        """
+        self.logger = logging.getLogger(__name__)
+
+        load_dotenv()
+        self.ipfs_host = os.getenv('IPFS_HOST', 'http://127.0.0.1:5001')
+        self.ipfs_gateway = os.getenv('IPFS_GATEWAY', 'http://127.0.0.1:8080')
+        self.public_gateway = os.getenv('IPFS_PUBLIC_GATEWAY', 'https://ipfs.io')
+        self.use_pinata = os.getenv('USE_PINATA', 'false').lower() == 'true'
+        self.pinata_api_key = os.getenv('PINATA_API_KEY')
+        self.pinata_secret_key = os.getenv('PINATA_SECRET_KEY')
+        self.cid_version = int(os.getenv('IPFS_CID_VERSION', 0))
+        self.raw_leaves = os.getenv('IPFS_RAW_LEAVES')
+        self.chunker = os.getenv('IPFS_CHUNKER', 'size-262144')
+        self.max_connections = int(os.getenv('IPFS_ASYNC_CONNECTIONS', 100))
+
+        self.content_cache = content_cache or ContentCache(
+            cache_dir=os.getenv('IPFS_CACHE_DIR', 'ipfs_cache') or None,
+            memory_limit=int(os.getenv('IPFS_CACHE_MEMORY_MB', 32)) * 1024 * 1024,
+            disk_limit=int(os.getenv('IPFS_CACHE_DISK_MB', 512)) * 1024 * 1024,
+            compress=os.getenv('IPFS_CACHE_COMPRESS', 'true').lower() == 'true'
+        )
+        self.availability_cache = TTLCache(
+            ttl=float(os.getenv('IPFS_AVAILABILITY_TTL', 300)),
+            negative_ttl=float(os.getenv('IPFS_UNAVAILABLE_TTL', 30))
+        )
+        self._availability_limit = asyncio.Semaphore(int(os.getenv('IPFS_AVAILABILITY_WORKERS', 8)))
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self) -> None:
+        """Open the HTTP session and check the connection to the node"""
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_connections)
+        )
+        try:
+            async with self.session.post(f"{self.ipfs_host}/api/v0/version") as response:
+                response.raise_for_status()
+            self.logger.info(f"Connected to IPFS daemon at {self.ipfs_host}")
+        except Exception as e:
+            self.logger.error(f"Failed to connect to IPFS daemon: {str(e)}")
+            raise
+
+    async def close(self) -> None:
+        """Cancel running checks and close the HTTP session"""
+        for task in list(self._inflight.values()):
+            task.cancel()
+        if self.session is not None:
+            await self.session.close()
+
+    def get_ipfs_url(self, cid: str) -> str:
+        """Get public gateway URL for IPFS content"""
+        cid = clean_cid(cid)
+        return f"{self.ipfs_gateway}/ipfs/{cid}" if cid else ""
+
+    async def add_bytes(self, data: bytes, filename: str = 'file') -> str:
+        """Add content to IPFS (local node or Pinata) and return its CID"""
+        try:
+            form = aiohttp.FormData()
+            form.add_field('file', data, filename=filename, content_type='application/octet-stream')
+
+            if self.use_pinata:
+                url = 'https://api.pinata.cloud/pinning/pinFileToIPFS'
+                params = None
+                headers = {
+                    'pinata_api_key': self.pinata_api_key,
+                    'pinata_secret_api_key': self.pinata_secret_key
+                }
+            else:
+                url = f"{self.ipfs_host}/api/v0/add"
+                params = {
+                    'pin': 'true',
+                    'cid-version': str(self.cid_version),
+                    'chunker': self.chunker
+                }
+                if self.raw_leaves is not None:
+                    params['raw-leaves'] = self.raw_leaves.lower()
+                headers = None
+
+            async with self.session.post(url, params=params, data=form, headers=headers) as response:
+                response.raise_for_status()
+                result = await response.json(content_type=None)
+            return result.get('IpfsHash') or result.get('Hash')
+
+        except Exception as e:
+            self.logger.error(f"Error adding {filename} to IPFS: {str(e)}")
+            raise
+
+    async def upload_photo(self, image: bytes, metadata: Dict) -> Tuple[str, str]:
+        """
+        Upload a photo and its NFT metadata
+        Returns: Tuple(file_cid, metadata_cid)
+        """
+        file_cid = await self.add_bytes(image, 'file')
+        self.logger.info(f"File uploaded to IPFS with CID: {file_cid}")
+
+        full_metadata = photo_metadata(file_cid, self.get_ipfs_url(file_cid), metadata)
+        metadata_cid = await self.add_bytes(json.dumps(full_metadata).encode(), 'content.txt')
+        self.logger.info(f"Metadata uploaded to IPFS with CID: {metadata_cid}")
+        return file_cid, metadata_cid
+
+    async def cat(self, cid: str, timeout: float = 5) -> bytes:
+        """Get content by CID (or CID path), served from the content cache when possible"""
+        cid = clean_cid(cid)
+        if not cid:
+            raise ValueError(f"Invalid CID: {cid}")
+
+        data = self.content_cache.get(cid)
+        if data is not None:
+            return data
+
+        client_timeout = aiohttp.ClientTimeout(total=timeout)
+        try:
+            async with self.session.get(f"{self.ipfs_gateway}/ipfs/{cid}", timeout=client_timeout) as response:
+                response.raise_for_status()
+                data = await response.read()
+        except Exception as e:
+            self.logger.warning(f"Failed to get {cid} from gateway: {str(e)}")
+            async with self.session.post(
+                f"{self.ipfs_host}/api/v0/cat", params={'arg': cid}, timeout=client_timeout
+            ) as response:
+                response.raise_for_status()
+                data = await response.read()
+
+        self.content_cache.put(cid, data)
+        return data
+
+    async def get_json(self, cid: str) -> dict:
+        """Get JSON content by CID; empty dict on failure"""
+        try:
+            if not clean_cid(cid):
+                return {}
+            return json.loads(await self.cat(cid))
+        except Exception as e:
+            self.logger.error(f"Error in get_json for {cid}: {str(e)}")
+            return {}
+
+    async def verify_content(self, cid: str, timeout: float = 5) -> bool:
+        """Whether a CID is reachable, racing the local and public gateways"""
+        if not cid:
+            return False
+        if clean_cid(cid) in self.content_cache:
+            return True
+
+        probes = [
+            asyncio.ensure_future(self._probe_gateway(gateway, cid, timeout))
+            for gateway in (self.ipfs_gateway, self.public_gateway)
+        ]
+        try:
+            for probe in asyncio.as_completed(probes, timeout=timeout):
+                if await probe:
+                    return True
+            return False
+        except asyncio.TimeoutError:
+            self.logger.warning(f"IPFS gateways timed out for {cid}")
+            return False
+        finally:
+            # The loser of the race is not needed any more
+            for probe in probes:
+                probe.cancel()
+
+    async def _probe_gateway(self, gateway: str, cid: str, timeout: float) -> bool:
+        """HEAD a CID on one gateway"""
+        try:
+            async with self.session.head(
+                f"{gateway}/ipfs/{cid}",
+                timeout=aiohttp.ClientTimeout(total=timeout),
+                allow_redirects=True
+            ) as response:
+                return response.status == 200
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            self.logger.warning(f"IPFS gateway {gateway} failed for {cid}: {str(e)}")
+            return False
+
+    async def check_availability(self, cids: List[str], deadline: float = 10.0) -> Dict[str, Optional[bool]]:
+        """
+        Check whether many CIDs are available, concurrently
+        Args:
+            cids: Content IDs to check
+            deadline: Seconds to wait for all checks together
+        Returns:
+            Dict of CID to True/False, or None for checks still running at the
+            deadline; those finish in the background and are cached for later calls
+        """
+        results = {}
+        tasks = {}
+        for cid in set(cids):
+            cached = self.availability_cache.get(cid)
+            if cached is not None:
+                results[cid] = cached
+            elif cid:
+                tasks[cid] = self._availability_task(cid)
+            else:
+                results[cid] = False
+
+        if tasks:
+            await asyncio.wait(tasks.values(), timeout=deadline)
+        for cid, task in tasks.items():
+            results[cid] = task.result() if task.done() and not task.cancelled() else None
+        return results
+
+    def _availability_task(self, cid: str) -> asyncio.Task:
+        """Running check for a CID, shared by concurrent callers"""
+        task = self._inflight.get(cid)
+        if task is None:
+            task = asyncio.ensure_future(self._check_availability(cid))
+            self._inflight[cid] = task
+        return task
+
+    async def _check_availability(self, cid: str) -> bool:
+        try:
+            async with self._availability_limit:
+                available = await self.verify_content(cid)
+            self.availability_cache.put(cid, available, negative=not available)
+            return available
+        finally:
+            self._inflight.pop(cid, None)
+
+    def get_cache_stats(self) -> Dict:
+        """Get content and availability cache hit/miss statistics"""
+        return dict(self.content_cache.get_stats(), availability=self.availability_cache.get_stats())
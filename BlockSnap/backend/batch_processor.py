@@ -4,32 +4,84 @@ import logging
 import threading
 import queue
 import time
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from .ipfs_handler import IPFSHandler
-import json
+from .pipeline import StageQueue, BLOCK
 
 class BatchProcessor:
-    def __init__(self, ipfs_handler: IPFSHandler, max_batch_size: int = 5):
-        """Initialize the batch processor"""
+    """
+    Uploads queued chunks to IPFS in batches on a pool of worker threads.
+
+    Each worker takes up to max_batch_size chunks from the input queue and
+    uploads them as one request, so several batches can be in flight at once.
+    Batches are numbered in queue order as they are taken, and results are
+    released to result_queue in that order even when a later batch finishes
+    first; consumers see chunks in the order they were added.
+
+    Idle workers block on the input queue; a worker uploads the first chunk
+    that arrives together with whatever else is already queued, so no time is
+    spent waiting for a batch to fill. stop() queues a close marker behind
+    the remaining chunks, and every result is in result_queue when it returns.
+    """
+
+    def __init__(self,
+                 ipfs_handler: IPFSHandler,
+                 max_batch_size: int = 5,
+                 max_queue_size: int = 100,
+                 queue_policy: str = BLOCK,
+                 num_workers: int = 1,
+                 result_queue: Optional[queue.Queue] = None):
+        """
+        Initialize the batch processor
+        Args:
+            ipfs_handler: Handler used for uploads
+            max_batch_size: Maximum number of chunks processed per batch
+            max_queue_size: Capacity of the upload input queue
+            queue_policy: Backpressure policy when uploads fall behind
+                ('block' or 'drop_oldest')
+            num_workers: Number of batches uploaded concurrently
+            result_queue: Queue receiving the results; a new one when omitted
+        """
         self.logger = logging.getLogger(__name__)
         self.ipfs = ipfs_handler
         self.max_batch_size = max_batch_size
+        self.num_workers = max(1, num_workers)
         
         # Processing queues
-        self.input_queue = queue.Queue()
-        self.result_queue = queue.Queue()
+        self.input_queue = StageQueue('upload', max_queue_size, queue_policy)
+        self.result_queue = result_queue if result_queue is not None else queue.Queue()
         
         # State
         self.is_running = False
-        self.process_thread: Optional[threading.Thread] = None
+        self.workers: List[threading.Thread] = []
         self.processed_count = 0
         self.failed_count = 0
-        self.current_batch: List = []
+        self.in_flight = 0
+        
+        # Batches are taken one at a time and numbered, then delivered by number
+        self._take_lock = threading.Lock()
+        self._next_ticket = 0
+        self._deliver_lock = threading.Lock()
+        self._next_delivery = 0
+        self._completed: Dict[int, List[Dict]] = {}
         
         # Performance tracking
+        self._stats_lock = threading.Lock()
         self.last_process_time = 0
         self.avg_process_time = 0
         self.total_process_time = 0
+        self.worker_stats = [self._new_worker_stats(i) for i in range(self.num_workers)]
+        
+    @staticmethod
+    def _new_worker_stats(worker_id: int) -> Dict:
+        return {
+            'worker': worker_id,
+            'batches': 0,
+            'chunks': 0,
+            'failed': 0,
+            'bytes': 0,
+            'busy_time': 0.0
+        }
         
     def start(self):
         """Start the processor"""
@@ -37,15 +89,21 @@ class BatchProcessor:
             return
             
         self.is_running = True
-        self.process_thread = threading.Thread(target=self._process_loop)
-        self.process_thread.start()
-        self.logger.info("Batch processor started")
+        self.workers = [
+            threading.Thread(target=self._worker_loop, args=(i,), name=f'upload-{i}')
+            for i in range(self.num_workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+        self.logger.info(f"Batch processor started with {self.num_workers} workers")
         
     def stop(self):
-        """Stop the processor"""
+        """Stop the processor once everything queued so far is uploaded"""
         self.is_running = False
-        if self.process_thread:
-            self.process_thread.join()
+        self.input_queue.close()
+        for worker in self.workers:
+            worker.join()
+        self.workers = []
         self._process_remaining()
         self.logger.info("Batch processor stopped")
         
@@ -66,154 +124,224 @@ class BatchProcessor:
         
     def get_stats(self) -> Dict:
         """Get enhanced processor statistics"""
-        stats = {
-            'processed_count': self.processed_count,
-            'failed_count': self.failed_count,
-            'queue_size': self.input_queue.qsize(),
-            'result_queue_size': self.result_queue.qsize(),
-            'current_batch_size': len(self.current_batch),
-            'success_rate': (
-                (self.processed_count - self.failed_count) / self.processed_count * 100
-                if self.processed_count > 0 else 0
-            ),
-            'average_process_time': (
-                self.total_process_time / self.processed_count
-                if self.processed_count > 0 else 0
-            ),
-            'is_running': self.is_running,
-            'avg_process_time': self.avg_process_time,
-            'last_process_time': self.last_process_time
-        }
+        with self._stats_lock:
+            workers = []
+            for worker in self.worker_stats:
+                busy_time = worker['busy_time']
+                workers.append(dict(
+                    worker,
+                    chunks_per_second=worker['chunks'] / busy_time if busy_time else 0,
+                    bytes_per_second=worker['bytes'] / busy_time if busy_time else 0
+                ))
+            stats = {
+                'processed_count': self.processed_count,
+                'failed_count': self.failed_count,
+                'queue_size': self.input_queue.qsize(),
+                'input_queue': self.input_queue.get_stats(),
+                'result_queue_size': self.result_queue.qsize(),
+                'current_batch_size': self.in_flight,
+                'reorder_buffer_size': len(self._completed),
+                'num_workers': self.num_workers,
+                'workers': workers,
+                'success_rate': (
+                    (self.processed_count - self.failed_count) / self.processed_count * 100
+                    if self.processed_count > 0 else 0
+                ),
+                'average_process_time': (
+                    self.total_process_time / self.processed_count
+                    if self.processed_count > 0 else 0
+                ),
+                'is_running': self.is_running,
+                'avg_process_time': self.avg_process_time,
+                'last_process_time': self.last_process_time
+            }
         return stats
         
-    def _process_loop(self) -> None:
-        """Main processing loop"""
-        while self.is_running:
+    def _worker_loop(self, worker_id: int) -> None:
+        """Upload loop of one worker; returns when the close marker is reached"""
+        while True:
             try:
-                # Build batch
-                while len(self.current_batch) < self.max_batch_size:
-                    try:
-                        chunk = self.input_queue.get(timeout=1)
-                        self.current_batch.append(chunk)
-                    except queue.Empty:
-                        break
-                        
-                if not self.current_batch:
-                    time.sleep(0.1)
-                    continue
+                ticket, batch, closed = self._take_batch(block=True)
+                if batch:
+                    self._run_batch(ticket, batch, self.worker_stats[worker_id])
+                if closed:
+                    break
                     
-                # Process batch
-                start_time = time.time()
-                self._process_batch()
-                process_time = time.time() - start_time
+            except Exception as e:
+                self.logger.error(f"Error in upload worker {worker_id}: {str(e)}")
+                with self._stats_lock:
+                    self.failed_count += 1
+                time.sleep(1)
                 
-                # Update statistics
+    def _take_batch(self, block: bool) -> Tuple[Optional[int], List, bool]:
+        """
+        Take up to max_batch_size chunks and number the batch
+        Args:
+            block: Wait for the first chunk and stop at the close marker;
+                otherwise take only what is queued and skip close markers
+        Returns:
+            Tuple(batch number, chunks, whether the close marker was reached)
+        """
+        with self._take_lock:
+            batch = []
+            closed = False
+            while len(batch) < self.max_batch_size:
+                try:
+                    if block and not batch:
+                        item = self.input_queue.get()
+                    else:
+                        item = self.input_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is StageQueue.CLOSED:
+                    if not block:
+                        continue
+                    # Put the marker back for the other workers
+                    self.input_queue.close()
+                    closed = True
+                    break
+                batch.append(item)
+            if not batch:
+                return None, batch, closed
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            return ticket, batch, closed
+            
+    def _run_batch(self, ticket: int, batch: List, worker: Dict) -> None:
+        """Upload a batch and hand its results over in order"""
+        size = self._batch_bytes(batch)
+        results = []
+        start_time = time.time()
+        with self._stats_lock:
+            self.in_flight += len(batch)
+        try:
+            results = self._process_batch(batch)
+        finally:
+            process_time = time.time() - start_time
+            with self._stats_lock:
+                self.in_flight -= len(batch)
                 self.last_process_time = process_time
                 self.total_process_time += process_time
-                self.avg_process_time = self.total_process_time / self.processed_count
-                
-                # Clear batch
-                self.current_batch = []
-                
-            except Exception as e:
-                self.logger.error(f"Error in process loop: {str(e)}")
-                self.failed_count += 1
-                time.sleep(1)
+                if self.processed_count:
+                    self.avg_process_time = self.total_process_time / self.processed_count
+                failed = sum(1 for result in results if not result.get('success'))
+                worker['batches'] += 1
+                worker['chunks'] += len(results) - failed
+                worker['failed'] += failed
+                worker['bytes'] += size if results and not failed else 0
+                worker['busy_time'] += process_time
+            self._deliver(ticket, results)
+            
+    @staticmethod
+    def _batch_bytes(batch: List) -> int:
+        try:
+            return sum(chunk.size for chunk in batch)
+        except (AttributeError, OSError):
+            return 0
+            
+    def _deliver(self, ticket: int, results: List[Dict]) -> None:
+        """Release results to result_queue in the order their batches were taken"""
+        with self._deliver_lock:
+            self._completed[ticket] = results
+            while self._next_delivery in self._completed:
+                for result in self._completed.pop(self._next_delivery):
+                    self.result_queue.put(result)
+                self._next_delivery += 1
                 
-    def _process_batch(self) -> None:
-        """Process a batch of chunks"""
-        for chunk in self.current_batch:
-            try:
-                result = self.process_chunk(chunk)
-                self.result_queue.put(result)
-                self.processed_count += 1
+    def _process_batch(self, batch: List) -> List[Dict]:
+        """
+        Process a batch of chunks
+        Returns: One result per chunk; failures are reported as results too
+        """
+        try:
+            results = self.process_chunks(batch)
+            with self._stats_lock:
+                self.processed_count += len(results)
+            return results
                 
-            except Exception as e:
-                self.logger.error(f"Failed to process chunk {chunk.sequence_number}: {str(e)}")
-                self.failed_count += 1
-                self.result_queue.put({
+        except Exception as e:
+            self.logger.error(f"Failed to process batch: {str(e)}")
+            with self._stats_lock:
+                self.failed_count += len(batch)
+            return [
+                {
                     'success': False,
                     'error': str(e),
                     'sequence_number': chunk.sequence_number
-                })
+                }
+                for chunk in batch
+            ]
+        finally:
+            # Drop spooled upload files; recorder chunks are kept for recovery
+            for chunk in batch:
+                chunk.release()
                 
     def process_chunk(self, chunk) -> Dict:
         """Process a single chunk"""
+        return self.process_chunks([chunk])[0]
+
+    def process_chunks(self, chunks: List) -> List[Dict]:
+        """
+        Upload a batch of chunks and their metadata in a single IPFS request
+        Returns: One result per chunk, in input order
+        """
         try:
             start_time = time.time()
             
-            # Upload video data to IPFS with retry
-            video_cid = None
+            # Upload videos and metadata to IPFS with retry; a retry may find
+            # the content already pinned by the attempt that failed
+            uploads = None
             for attempt in range(3):
                 try:
-                    video_cid = self.ipfs.add_bytes(
-                        chunk.data,
-                        f"chunk_{chunk.sequence_number}.webm"
-                    )
-                    if video_cid:
+                    uploads = self.ipfs.add_video_chunks(chunks, replay=attempt > 0)
+                    if uploads:
                         break
                 except Exception as e:
                     if attempt == 2:
                         raise
                     time.sleep(1)
             
-            if not video_cid:
-                raise ValueError("Failed to upload video to IPFS")
+            if not uploads:
+                raise ValueError("Failed to upload chunks to IPFS")
             
-            # Create and upload metadata
-            metadata = chunk.get_metadata()
-            metadata['video_cid'] = video_cid
-            metadata['process_time'] = time.time() - start_time
+            # Verify IPFS content is accessible through a gateway; the batch directory covers every file in it.
+            # Content just added to the local node is checked there only; Pinata uploads need the public gateway.
+            directory_cid = uploads[0].get('directory_cid')
+            public = self.ipfs.use_pinata
+            if directory_cid:
+                if not self.ipfs.verify_content(directory_cid, use_cache=False, public=public):
+                    raise ValueError(f"Batch content verification failed: {directory_cid}")
+            else:
+                for upload in uploads:
+                    if not self.ipfs.verify_content(upload['video_cid'], use_cache=False, public=public):
+                        raise ValueError(f"Video content verification failed: {upload['video_cid']}")
+                    if not self.ipfs.verify_content(upload['metadata_cid'], use_cache=False, public=public):
+                        raise ValueError(f"Metadata verification failed: {upload['metadata_cid']}")
             
-            metadata_json = json.dumps(metadata)
-            metadata_cid = None
-            
-            # Upload metadata with retry
-            for attempt in range(3):
-                try:
-                    metadata_cid = self.ipfs.add_bytes(
-                        metadata_json.encode(),
-                        f"chunk_{chunk.sequence_number}_metadata.json"
-                    )
-                    if metadata_cid:
-                        break
-                except Exception as e:
-                    if attempt == 2:
-                        raise
-                    time.sleep(1)
-            
-            if not metadata_cid:
-                raise ValueError("Failed to upload metadata to IPFS")
-            
-            # Verify IPFS content is accessible
-            if not self.ipfs.verify_content(video_cid):
-                raise ValueError(f"Video content verification failed: {video_cid}")
-            if not self.ipfs.verify_content(metadata_cid):
-                raise ValueError(f"Metadata verification failed: {metadata_cid}")
-            
-            result = {
-                'video_cid': video_cid,
-                'metadata_cid': metadata_cid,
-                'sequence_number': chunk.sequence_number,
-                'success': True,
-                'process_time': time.time() - start_time
-            }
-            
-            self.logger.info(f"Processed chunk {chunk.sequence_number}: {result}")
-            return result
+            process_time = time.time() - start_time
+            results = []
+            for upload in uploads:
+                result = {
+                    'video_cid': upload['video_cid'],
+                    'metadata_cid': upload['metadata_cid'],
+                    'directory_cid': upload.get('directory_cid'),
+                    'sequence_number': upload['sequence_number'],
+                    'success': True,
+                    'process_time': process_time
+                }
+                self.logger.info(f"Processed chunk {result['sequence_number']}: {result}")
+                results.append(result)
+            return results
             
         except Exception as e:
-            self.logger.error(f"Failed to process chunk {chunk.sequence_number}: {str(e)}")
+            sequence_numbers = [chunk.sequence_number for chunk in chunks]
+            self.logger.error(f"Failed to process chunks {sequence_numbers}: {str(e)}")
             raise
             
     def _process_remaining(self) -> None:
         """Process any remaining chunks in the queue"""
-        while not self.input_queue.empty():
-            try:
-                chunk = self.input_queue.get_nowait()
-                self.current_batch.append(chunk)
-            except queue.Empty:
+        while True:
+            ticket, batch, _ = self._take_batch(block=False)
+            if not batch:
                 break
-                
-        if self.current_batch:
-            self._process_batch()
+            self._run_batch(ticket, batch, self.worker_stats[0])
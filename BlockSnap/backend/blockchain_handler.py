@@ -2,6 +2,7 @@
 
 from web3 import Web3
 from eth_account import Account
+from eth_utils import function_abi_to_4byte_selector
 import json
 import os
 import logging
@@ -10,9 +11,154 @@ from dotenv import load_dotenv
 from pathlib import Path
 from datetime import datetime
 import time
+from concurrent.futures import Future
+from functools import lru_cache
+from .log_scanner import LogScanner
+from .call_batch import CallBatcher
+from .tx_pipeline import get_transaction_pipeline
+from .confirmations import ConfirmationTracker
 
 load_dotenv()
 
+CONTRACT_ABI_PATH = Path(__file__).parent.parent / 'artifacts' / 'smart_contracts' / 'BlockSnapNFT.sol' / 'BlockSnapNFT.json'
+
+# Topics of the video session events
+SESSION_STARTED_TOPIC = Web3.keccak(text="VideoSessionStarted(uint256,address)").hex()
+CHUNK_ADDED_TOPIC = Web3.keccak(text="VideoChunkAdded(uint256,uint256,string)").hex()
+SESSION_ENDED_TOPIC = Web3.keccak(text="VideoSessionEnded(uint256,uint256)").hex()
+SESSION_ROOT_TOPIC = Web3.keccak(text="SessionRootCommitted(uint256,bytes32,uint256,string)").hex()
+
+
+@lru_cache(maxsize=None)
+def load_contract_abi() -> List[Dict]:
+    """Load the BlockSnapNFT ABI from the hardhat artifact (read once per process; do not modify)"""
+    if not CONTRACT_ABI_PATH.exists():
+        raise FileNotFoundError(f"Contract ABI file not found at {CONTRACT_ABI_PATH}")
+    with open(CONTRACT_ABI_PATH) as f:
+        return json.load(f)['abi']
+
+
+def code_has_function(contract_abi: List[Dict], code: bytes, name: str) -> bool:
+    """Whether the ABI declares a function and deployed code dispatches to its selector"""
+    abis = [e for e in contract_abi if e.get('type') == 'function' and e.get('name') == name]
+    return bool(abis) and function_abi_to_4byte_selector(abis[0]) in bytes(code)
+
+
+def collect_video_sessions(contract, events, wallet_address: str) -> List[Dict]:
+    """
+    Fold session start/chunk/end logs into the sessions of one wallet
+    Args:
+        contract: Contract used to decode the logs
+        events: Logs of the session events, in block order
+        wallet_address: Session owner
+    Returns:
+        Sessions with sorted chunks, newest first. Merkle-mode sessions carry
+        their latest root and proof manifest CID instead of chunks
+    """
+    sessions = {}
+    for event in events:
+        try:
+            event_sig = event['topics'][0].hex()
+            
+            if event_sig == SESSION_STARTED_TOPIC:
+                # New session
+                decoded = contract.events.VideoSessionStarted().process_log(event)
+                session_id = decoded['args']['sessionId']
+                owner = decoded['args']['owner']
+                
+                if owner.lower() == wallet_address.lower():
+                    sessions[session_id] = {
+                        'session_id': session_id,
+                        'owner': owner,
+                        'chunks': [],
+                        'start_block': event['blockNumber'],
+                        'transaction_hash': event['transactionHash'].hex(),
+                        'is_active': True
+                    }
+            
+            elif event_sig == CHUNK_ADDED_TOPIC and sessions:
+                # Add chunk to existing session
+                decoded = contract.events.VideoChunkAdded().process_log(event)
+                session_id = decoded['args']['sessionId']
+                
+                if session_id in sessions:
+                    new_chunk = {
+                        'sequence_number': decoded['args']['sequenceNumber'],
+                        'video_cid': decoded['args']['videoCID'],
+                        'timestamp': event['blockNumber'],
+                        'transaction_hash': event['transactionHash'].hex()
+                    }
+                    
+                    # Check if this chunk already exists
+                    chunk_exists = False
+                    for existing_chunk in sessions[session_id]['chunks']:
+                        if (existing_chunk['sequence_number'] == new_chunk['sequence_number'] and 
+                            existing_chunk['video_cid'] == new_chunk['video_cid']):
+                            chunk_exists = True
+                            break
+                    
+                    if not chunk_exists:
+                        sessions[session_id]['chunks'].append(new_chunk)
+            
+            elif event_sig == SESSION_ENDED_TOPIC and sessions:
+                # Mark session as ended
+                decoded = contract.events.VideoSessionEnded().process_log(event)
+                session_id = decoded['args']['sessionId']
+                
+                if session_id in sessions:
+                    sessions[session_id]['is_active'] = False
+                    sessions[session_id]['end_block'] = event['blockNumber']
+            
+            elif event_sig == SESSION_ROOT_TOPIC and sessions:
+                # Each commit supersedes the previous root
+                decoded = contract.events.SessionRootCommitted().process_log(event)
+                session_id = decoded['args']['sessionId']
+                
+                if session_id in sessions:
+                    sessions[session_id].update({
+                        'root': '0x' + decoded['args']['root'].hex(),
+                        'root_chunk_count': decoded['args']['chunkCount'],
+                        'manifest_cid': decoded['args']['manifestCID'],
+                        'root_block': event['blockNumber'],
+                        'root_transaction_hash': event['transactionHash'].hex()
+                    })
+            
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Error processing event: {str(e)}")
+            continue
+    
+    # Sort chunks and prepare final list
+    result = []
+    for session in sessions.values():
+        session['chunks'].sort(key=lambda x: x['sequence_number'])
+        result.append(session)
+    
+    # Sort sessions by start block
+    result.sort(key=lambda x: x['start_block'], reverse=True)
+    return result
+
+
+def find_deploy_block(w3, address: str) -> int:
+    """
+    Find the block a contract was deployed in by binary search over get_code
+    Args:
+        w3: Web3 instance; needs state for historical blocks (an archive node)
+        address: Contract address
+    Returns:
+        The first block at which the address has code
+    """
+    low, high = 0, w3.eth.block_number
+    if not w3.eth.get_code(address, block_identifier=high):
+        raise ValueError(f"No contract code at {address}")
+    while low < high:
+        middle = (low + high) // 2
+        if w3.eth.get_code(address, block_identifier=middle):
+            high = middle
+        else:
+            low = middle + 1
+    return low
+
+
 class BlockchainHandler:
     def __init__(self):
         # Initialize logging
@@ -33,14 +179,8 @@ class BlockchainHandler:
             raise ConnectionError("Failed to connect to Ethereum network")
         
         # Load contract ABI
-        contract_path = Path(__file__).parent.parent / 'artifacts' / 'smart_contracts' / 'BlockSnapNFT.sol' / 'BlockSnapNFT.json'
-        if not contract_path.exists():
-            raise FileNotFoundError(f"Contract ABI file not found at {contract_path}")
-            
-        with open(contract_path) as f:
-            contract_json = json.load(f)
-            self.contract_abi = contract_json['abi']
-            self.logger.info("Successfully loaded contract ABI")
+        self.contract_abi = load_contract_abi()
+        self.logger.info("Successfully loaded contract ABI")
         
         # Initialize contract
         self.contract = self.w3.eth.contract(
@@ -52,11 +192,61 @@ class BlockchainHandler:
         self.account = Account.from_key(self.private_key)
         self.logger.info(f"Initialized with account: {self.account.address}")
         
+        # Locally tracked nonce and asynchronous receipts, shared by every handler using this signer
+        self.tx_pipeline = get_transaction_pipeline(self.w3, self.account)
+        
+        # One new-head watcher shared by everything waiting for confirmations
+        self.confirmations = ConfirmationTracker(self.w3)
+        self.chunk_confirmations = int(os.getenv('CHUNK_CONFIRMATIONS', 1))
+        
+        # Contracts deployed before addVideoChunks register chunks one by one
+        self.supports_batch_chunks = self._has_function('addVideoChunks')
+        self.supports_session_roots = self._has_function('commitSessionRoot')
+        # Older contracts scan every token in verifyPhoto; answer from the local index instead
+        self.supports_cid_lookup = self._has_function('getTokenIdByCID')
+        self.token_index = None
+        
+        # Event queries scan from the contract deployment block in adaptive windows;
+        # found from the deployed code on first use when CONTRACT_DEPLOY_BLOCK is unset
+        deploy_block = os.getenv('CONTRACT_DEPLOY_BLOCK')
+        self._deploy_block: Optional[int] = int(deploy_block) if deploy_block else None
+        self.log_scanner = LogScanner(self.w3, max_window=int(os.getenv('LOG_SCAN_WINDOW', 5000)))
+        
+        # Read-only calls are batched into one round trip where possible
+        self.call_batcher = CallBatcher(
+            self.w3,
+            rpc_url=self.rpc_url,
+            use_multicall=os.getenv('USE_MULTICALL', 'true').lower() == 'true'
+        )
+        
         # Initialize session cache
         self._sessions_cache = {}
         self._last_cache_update = 0
         self._cache_ttl = 300  # 5 minutes
 
+    def _has_function(self, name: str) -> bool:
+        """Whether the ABI declares a function and the deployed code dispatches to it"""
+        try:
+            return code_has_function(self.contract_abi, self.w3.eth.get_code(self.contract.address), name)
+        except Exception as e:
+            self.logger.warning(f"Could not check deployed code for {name}: {str(e)}")
+            return False
+
+    @property
+    def deploy_block(self) -> int:
+        """First block of the contract, where event scans start"""
+        if self._deploy_block is None:
+            try:
+                self._deploy_block = find_deploy_block(self.w3, self.contract.address)
+                self.logger.info(f"Contract deployed at block {self._deploy_block}")
+            except Exception as e:
+                self.logger.warning(
+                    f"Could not find the contract deployment block, scanning from genesis; "
+                    f"set CONTRACT_DEPLOY_BLOCK to avoid this: {str(e)}"
+                )
+                self._deploy_block = 0
+        return self._deploy_block
+
     def mint_photo_nft(self, 
                       to_address: str, 
                       image_cid: str, 
@@ -64,29 +254,24 @@ class BlockchainHandler:
         """
         Mint a new photo NFT
         Returns: Tuple(transaction_hash, token_id)
+        Raises: ValueError if the image CID already has a live token
         """
         try:
-            # Prepare transaction
-            nonce = self.w3.eth.get_transaction_count(self.account.address)
-            
-            # Build transaction
-            tx = self.contract.functions.mintPhoto(
-                self.w3.to_checksum_address(to_address),
-                image_cid,
-                metadata_uri
-            ).build_transaction({
-                'chainId': self.w3.eth.chain_id,
-                'gas': 500000,
-                'gasPrice': self.w3.eth.gas_price,
-                'nonce': nonce,
-            })
-            
-            # Sign and send transaction
-            signed_tx = self.w3.eth.account.sign_transaction(tx, self.private_key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
-            
-            # Wait for transaction receipt
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+            # The contract reverts on a duplicate CID; don't pay for the failed transaction
+            if self.supports_cid_lookup:
+                exists, _ = self.contract.functions.getTokenIdByCID(image_cid).call()
+                if exists:
+                    raise ValueError(f"Photo {image_cid} is already minted")
+            
+            receipt = self.tx_pipeline.send(
+                self.contract.functions.mintPhoto(
+                    self.w3.to_checksum_address(to_address),
+                    image_cid,
+                    metadata_uri
+                ),
+                gas=500000
+            )
+            tx_hash = receipt['transactionHash']
             
             # Get token ID from event logs
             mint_event = self.contract.events.PhotoMinted().process_receipt(receipt)[0]
@@ -105,6 +290,14 @@ class BlockchainHandler:
         Returns: Tuple(exists, owner_address)
         """
         try:
+            if not self.supports_cid_lookup and self.token_index is not None:
+                token = self.token_index.get_token_by_cid(image_cid)
+                if token is not None:
+                    return True, self.w3.to_checksum_address(token['owner'])
+                # A miss is only final once the index has caught up with the head
+                if self.token_index.indexed_block >= self.w3.eth.block_number:
+                    return False, None
+            
             exists, owner = self.contract.functions.verifyPhoto(image_cid).call()
             return exists, owner if exists else None
         except Exception as e:
@@ -127,23 +320,57 @@ class BlockchainHandler:
             self.logger.error(f"Error getting image CID: {str(e)}")
             raise
 
+    def batch_call(self, calls: List, allow_failure: bool = False) -> List:
+        """
+        Execute read-only contract calls in one round trip
+        Args:
+            calls: ContractFunction objects, e.g. self.contract.functions.ownerOf(1)
+            allow_failure: Return None for reverted calls instead of raising
+        Returns:
+            Results in call order
+        """
+        try:
+            return self.call_batcher.call(calls, allow_failure=allow_failure)
+        except Exception as e:
+            self.logger.error(f"Error in batched contract call: {str(e)}")
+            raise
+
+    def get_tokens(self, token_ids: List[int]) -> List[Optional[Dict]]:
+        """
+        Get owner, metadata URI and image CID for several tokens at once
+        Returns: One dict per token, or None for tokens that do not exist
+        """
+        functions = self.contract.functions
+        calls = []
+        for token_id in token_ids:
+            calls += [
+                functions.ownerOf(token_id),
+                functions.tokenURI(token_id),
+                functions.getImageCID(token_id)
+            ]
+        results = self.batch_call(calls, allow_failure=True)
+        
+        tokens = []
+        for i, token_id in enumerate(token_ids):
+            owner, metadata_uri, image_cid = results[3 * i:3 * i + 3]
+            if owner is None:
+                tokens.append(None)
+                continue
+            tokens.append({
+                'token_id': token_id,
+                'owner': owner,
+                'metadata_uri': metadata_uri,
+                'image_cid': image_cid
+            })
+        return tokens
+
     def start_video_session(self) -> int:
         """Start a new video recording session"""
         try:
-            # Prepare transaction
-            tx = self.contract.functions.startVideoSession().build_transaction({
-                'chainId': self.w3.eth.chain_id,
-                'gas': 200000,
-                'gasPrice': self.w3.eth.gas_price,
-                'nonce': self.w3.eth.get_transaction_count(self.account.address),
-            })
-            
-            # Sign and send transaction
-            signed_tx = self.w3.eth.account.sign_transaction(tx, self.private_key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
-            
-            # Wait for receipt
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+            receipt = self.tx_pipeline.send(
+                self.contract.functions.startVideoSession(),
+                gas=200000
+            )
             
             # Get session ID from event
             session_event = self.contract.events.VideoSessionStarted().process_receipt(receipt)[0]
@@ -156,35 +383,74 @@ class BlockchainHandler:
             self.logger.error(f"Error starting video session: {str(e)}")
             raise
 
-    def add_video_chunk(self, session_id: int, chunk_data: Dict) -> None:
-        """Add a video chunk to a session"""
-        try:
-            # Add chunk to contract
-            tx = self.contract.functions.addVideoChunk(
+    def submit_video_chunk(self, session_id: int, chunk_data: Dict) -> Future:
+        """
+        Send an addVideoChunk transaction without waiting for it to be mined
+        Returns: Future resolving to the transaction receipt
+        """
+        return self.tx_pipeline.submit(
+            self.contract.functions.addVideoChunk(
                 session_id,
                 chunk_data['sequence_number'],
                 chunk_data['video_cid'],
                 chunk_data['metadata_cid']
-            ).build_transaction({
-                'from': self.account.address,
-                'nonce': self.w3.eth.get_transaction_count(self.account.address),
-                'gas': 500000,
-                'gasPrice': self.w3.eth.gas_price
-            })
-            
-            # Sign and send transaction
-            signed_tx = self.w3.eth.account.sign_transaction(tx, self.account.key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
-            
-            # Wait for transaction receipt with more confirmations
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=60)
+            ),
+            gas=500000
+        )
+
+    def submit_video_chunks(self, session_id: int, chunks: List[Dict]) -> List[Future]:
+        """
+        Register several chunks without waiting, in one addVideoChunks
+        transaction when the deployed contract supports it
+        Returns: One future per chunk, resolving to the confirmed receipt
+        """
+        self._sessions_cache.pop(str(session_id), None)
+        if self.supports_batch_chunks and len(chunks) > 1:
+            receipt = self.tx_pipeline.submit(
+                self.contract.functions.addVideoChunks(
+                    session_id,
+                    [chunk['sequence_number'] for chunk in chunks],
+                    [chunk['video_cid'] for chunk in chunks],
+                    [chunk['metadata_cid'] for chunk in chunks]
+                ),
+                gas=150000 + 150000 * len(chunks)
+            )
+            confirmed = self._confirmed(receipt)
+            return [confirmed] * len(chunks)
+        return [self._confirmed(self.submit_video_chunk(session_id, chunk)) for chunk in chunks]
+
+    def _confirmed(self, receipt_future: Future) -> Future:
+        """Future resolving once a transaction has chunk_confirmations blocks on top"""
+        confirmed = Future()
+        
+        def on_receipt(done: Future) -> None:
+            if done.exception() is not None:
+                confirmed.set_exception(done.exception())
+                return
+            receipt = done.result()
+            if receipt['status'] != 1:
+                confirmed.set_exception(
+                    Exception(f"Transaction failed: {self.w3.to_hex(receipt['transactionHash'])}")
+                )
+                return
+            self.confirmations.wait_for_block(
+                receipt['blockNumber'] + self.chunk_confirmations
+            ).add_done_callback(lambda _: confirmed.set_result(receipt))
+        
+        receipt_future.add_done_callback(on_receipt)
+        return confirmed
+
+    def add_video_chunk(self, session_id: int, chunk_data: Dict) -> None:
+        """Add a video chunk to a session"""
+        try:
+            receipt = self.submit_video_chunk(session_id, chunk_data).result(timeout=60)
             
             if receipt['status'] == 1:
-                # Wait for a few more blocks to ensure indexing
-                current_block = self.w3.eth.block_number
-                while self.w3.eth.block_number < current_block + 1:
-                    time.sleep(0.1)
-                    
+                # Wait for blocks on top of the chunk so it is indexed by log queries
+                self.confirmations.wait_for_confirmations(
+                    receipt, self.chunk_confirmations, timeout=60
+                )
+                
                 self.logger.info(f"Added chunk {chunk_data['sequence_number']} to session {session_id}")
                 
                 # Clear session cache to force refresh
@@ -197,26 +463,47 @@ class BlockchainHandler:
             self.logger.error(f"Error adding video chunk: {str(e)}")
             raise
 
+    def commit_session_root(self, session_id: int, root: bytes, chunk_count: int,
+                            manifest_cid: str = '') -> Future:
+        """
+        Commit the Merkle root over a session's chunks without waiting
+        Args:
+            session_id: Session the chunks belong to
+            root: Merkle root over the chunks
+            chunk_count: Number of chunks under the root
+            manifest_cid: CID of the published proof manifest for this root, if any
+        Returns:
+            Future resolving to the confirmed receipt
+        """
+        if not self.supports_session_roots:
+            raise ValueError("Deployed contract does not support session roots")
+        return self._confirmed(self.tx_pipeline.submit(
+            self.contract.functions.commitSessionRoot(session_id, root, chunk_count, manifest_cid),
+            gas=150000
+        ))
+
+    def get_session_root(self, session_id: int) -> Dict:
+        """
+        Get the latest committed Merkle root of a session
+        Returns: Dict with root (hex), chunk_count and manifest_cid
+        """
+        try:
+            root, chunk_count, manifest_cid = self.contract.functions.getSessionRoot(int(session_id)).call()
+            return {'root': self.w3.to_hex(root), 'chunk_count': chunk_count, 'manifest_cid': manifest_cid}
+        except Exception as e:
+            self.logger.error(f"Error getting session root: {str(e)}")
+            raise
+
     def end_video_session(self, session_id: int) -> str:
         """End a video recording session"""
         try:
-            # Prepare transaction
-            tx = self.contract.functions.endVideoSession(session_id).build_transaction({
-                'chainId': self.w3.eth.chain_id,
-                'gas': 100000,
-                'gasPrice': self.w3.eth.gas_price,
-                'nonce': self.w3.eth.get_transaction_count(self.account.address),
-            })
-            
-            # Sign and send transaction
-            signed_tx = self.w3.eth.account.sign_transaction(tx, self.private_key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
-            
-            # Wait for receipt
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+            receipt = self.tx_pipeline.send(
+                self.contract.functions.endVideoSession(session_id),
+                gas=100000
+            )
             
             self.logger.info(f"Ended video session {session_id}")
-            return self.w3.to_hex(tx_hash)
+            return self.w3.to_hex(receipt['transactionHash'])
             
         except Exception as e:
             self.logger.error(f"Error ending video session: {str(e)}")
@@ -226,28 +513,29 @@ class BlockchainHandler:
         """Update the sessions cache from blockchain"""
         try:
             sessions = {}
-            # Get recent events only - last 1000 blocks
-            current_block = self.w3.eth.block_number
-            from_block = max(0, current_block - 1000)
-            
-            event_filter = self.contract.events.VideoSessionStarted.create_filter(
-                fromBlock=from_block,
-                toBlock='latest'
-            )
-            events = event_filter.get_all_entries()
-            
-            for event in events:
-                session_id = event.args.sessionId
-                owner = event.args.owner
-                
-                # Get chunks directly from contract call
-                chunk_count = self.contract.functions.getSessionChunkCount(session_id).call()
-                is_active = self.contract.functions.isSessionActive(session_id).call()
-                
-                sessions[session_id] = {
-                    'session_id': session_id,
-                    'owner': owner,
-                    'chunk_count': chunk_count,
+            start_event_sig = self.w3.keccak(text="VideoSessionStarted(uint256,address)").hex()
+            logs = self.scan_logs([start_event_sig])
+            
+            started = [
+                self.contract.events.VideoSessionStarted().process_log(log).args
+                for log in logs
+            ]
+            
+            # Chunk lists and active flags for every session in one round trip
+            calls = []
+            for event in started:
+                calls += [
+                    self.contract.functions.getSessionChunks(event.sessionId),
+                    self.contract.functions.isSessionActive(event.sessionId)
+                ]
+            results = self.batch_call(calls)
+            
+            for i, event in enumerate(started):
+                chunks, is_active = results[2 * i], results[2 * i + 1]
+                sessions[event.sessionId] = {
+                    'session_id': event.sessionId,
+                    'owner': event.owner,
+                    'chunk_count': len(chunks),
                     'is_active': is_active
                 }
             
@@ -263,14 +551,12 @@ class BlockchainHandler:
         """Get chunks for a specific session"""
         try:
             # Get chunk events for specific session
-            chunk_filter = self.contract.events.VideoChunkAdded.create_filter(
-                fromBlock=max(0, self.w3.eth.block_number - 1000),
-                argument_filters={'sessionId': session_id}
-            )
-            events = chunk_filter.get_all_entries()
+            chunk_event_sig = self.w3.keccak(text="VideoChunkAdded(uint256,uint256,string)").hex()
+            session_topic = '0x' + format(int(session_id), '064x')
             
             chunks = []
-            for event in events:
+            for log in self.scan_logs([chunk_event_sig, session_topic]):
+                event = self.contract.events.VideoChunkAdded().process_log(log)
                 chunks.append({
                     'sequence_number': event.args.sequenceNumber,
                     'video_cid': event.args.videoCID,
@@ -283,6 +569,22 @@ class BlockchainHandler:
             self.logger.error(f"Failed to get session chunks: {str(e)}")
             return []
 
+    def scan_logs(self, topics: List, from_block: Optional[int] = None, to_block='latest'):
+        """
+        Stream contract logs matching topics over a block range
+        Args:
+            topics: get_logs topic filter
+            from_block: First block; defaults to the contract deployment block
+            to_block: Last block (inclusive) or 'latest'
+        Returns:
+            Generator of logs in block order
+        """
+        return self.log_scanner.scan(
+            {'address': self.contract.address, 'topics': topics},
+            self.deploy_block if from_block is None else from_block,
+            to_block
+        )
+
     def is_session_active(self, session_id: int) -> bool:
         """Check if a session is active"""
         try:
@@ -294,96 +596,38 @@ class BlockchainHandler:
     def get_video_sessions(self, wallet_address):
         """Get all video sessions for a wallet address"""
         try:
-            # Get event signatures
-            start_event_sig = self.w3.keccak(text="VideoSessionStarted(uint256,address)").hex()
-            chunk_event_sig = self.w3.keccak(text="VideoChunkAdded(uint256,uint256,string)").hex()
-            end_event_sig = self.w3.keccak(text="VideoSessionEnded(uint256,uint256)").hex()
-            
-            # Format wallet address for topic filtering
-            wallet_topic = '0x' + wallet_address[2:].lower().zfill(64)
-            
-            # Get all relevant events in a single query
-            from_block = max(0, self.w3.eth.block_number - 1000)
-            events = self.w3.eth.get_logs({
-                'address': self.contract.address,
-                'topics': [[start_event_sig, chunk_event_sig, end_event_sig]],
-                'fromBlock': from_block,
-                'toBlock': 'latest'
-            })
-            
-            # Process events into sessions
-            sessions = {}
-            for event in events:
-                try:
-                    event_sig = event['topics'][0].hex()
-                    
-                    if event_sig == start_event_sig:
-                        # New session
-                        decoded = self.contract.events.VideoSessionStarted().process_log(event)
-                        session_id = decoded['args']['sessionId']
-                        owner = decoded['args']['owner']
-                        
-                        if owner.lower() == wallet_address.lower():
-                            sessions[session_id] = {
-                                'session_id': session_id,
-                                'owner': owner,
-                                'chunks': [],
-                                'start_block': event['blockNumber'],
-                                'transaction_hash': event['transactionHash'].hex(),
-                                'is_active': True
-                            }
-                    
-                    elif event_sig == chunk_event_sig and sessions:
-                        # Add chunk to existing session
-                        decoded = self.contract.events.VideoChunkAdded().process_log(event)
-                        session_id = decoded['args']['sessionId']
-                        
-                        if session_id in sessions:
-                            new_chunk = {
-                                'sequence_number': decoded['args']['sequenceNumber'],
-                                'video_cid': decoded['args']['videoCID'],
-                                'timestamp': event['blockNumber'],
-                                'transaction_hash': event['transactionHash'].hex()
-                            }
-                            
-                            # Check if this chunk already exists
-                            chunk_exists = False
-                            for existing_chunk in sessions[session_id]['chunks']:
-                                if (existing_chunk['sequence_number'] == new_chunk['sequence_number'] and 
-                                    existing_chunk['video_cid'] == new_chunk['video_cid']):
-                                    chunk_exists = True
-                                    break
-                            
-                            if not chunk_exists:
-                                sessions[session_id]['chunks'].append(new_chunk)
-                    
-                    elif event_sig == end_event_sig and sessions:
-                        # Mark session as ended
-                        decoded = self.contract.events.VideoSessionEnded().process_log(event)
-                        session_id = decoded['args']['sessionId']
-                        
-                        if session_id in sessions:
-                            sessions[session_id]['is_active'] = False
-                            sessions[session_id]['end_block'] = event['blockNumber']
-                    
-                except Exception as e:
-                    self.logger.warning(f"Error processing event: {str(e)}")
-                    continue
-            
-            # Sort chunks and prepare final list
-            result = []
-            for session in sessions.values():
-                session['chunks'].sort(key=lambda x: x['sequence_number'])
-                result.append(session)
-            
-            # Sort sessions by start block
-            result.sort(key=lambda x: x['start_block'], reverse=True)
-            return result
+            # Stream all relevant events since deployment, in block order
+            events = self.scan_logs([[
+                SESSION_STARTED_TOPIC, CHUNK_ADDED_TOPIC, SESSION_ENDED_TOPIC, SESSION_ROOT_TOPIC
+            ]])
+            return collect_video_sessions(self.contract, events, wallet_address)
             
         except Exception as e:
             self.logger.error(f"Failed to get video sessions: {str(e)}")
             raise
 
+    def receipt_has_chunk(self, receipt, session_id: int, chunk_data: Dict) -> bool:
+        """
+        Check a registration receipt for the chunk's VideoChunkAdded event,
+        without scanning the chain's logs
+        Args:
+            receipt: Receipt of the addVideoChunk(s) transaction
+            session_id: Session the chunk was added to
+            chunk_data: Chunk with its video_cid and sequence_number
+        Returns:
+            Whether the transaction logged the chunk
+        """
+        for log in receipt['logs']:
+            if (log['address'].lower() != self.contract.address.lower()
+                    or not log['topics'] or log['topics'][0].hex() != CHUNK_ADDED_TOPIC):
+                continue
+            args = self.contract.events.VideoChunkAdded().process_log(log)['args']
+            if (args['sessionId'] == session_id
+                    and args['sequenceNumber'] == chunk_data['sequence_number']
+                    and args['videoCID'] == chunk_data['video_cid']):
+                return True
+        return False
+
     def verify_session_chunk(self, session_id, chunk_data):
         """Verify a chunk was properly added to a session"""
         try:
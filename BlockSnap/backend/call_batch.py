@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+
+import logging
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from eth_utils import to_checksum_address
+from eth_utils.abi import collapse_if_tuple
+
+from .http_session import SessionPool, get_session_pool, RPC
+
+# Multicall3 is deployed at the same address on most EVM chains
+MULTICALL3_ADDRESS = '0xcA11bde05977b3631167028862bE2a173976CA11'
+MULTICALL3_ABI = [{
+    'name': 'aggregate3',
+    'type': 'function',
+    'stateMutability': 'payable',
+    'inputs': [{
+        'name': 'calls',
+        'type': 'tuple[]',
+        'components': [
+            {'name': 'target', 'type': 'address'},
+            {'name': 'allowFailure', 'type': 'bool'},
+            {'name': 'callData', 'type': 'bytes'}
+        ]
+    }],
+    'outputs': [{
+        'name': 'returnData',
+        'type': 'tuple[]',
+        'components': [
+            {'name': 'success', 'type': 'bool'},
+            {'name': 'returnData', 'type': 'bytes'}
+        ]
+    }]
+}]
+
+
+class CallBatcher:
+    """
+    Executes many read-only contract calls in one round trip.
+
+    Uses a Multicall3 aggregate when the chain has the contract deployed,
+    otherwise a JSON-RPC batch of eth_call requests. Providers that reject
+    batches fall back to sequential calls. Results come back in call order,
+    decoded the same way ContractFunction.call() decodes them.
+    """
+
+    def __init__(self,
+                 w3,
+                 rpc_url: Optional[str] = None,
+                 session_pool: Optional[SessionPool] = None,
+                 max_batch_size: int = 100,
+                 use_multicall: bool = True):
+        """
+        Args:
+            w3: Web3 instance
+            rpc_url: HTTP endpoint for JSON-RPC batches; defaults to the provider's
+            session_pool: Pooled HTTP sessions for JSON-RPC batches
+            max_batch_size: Calls per Multicall3 aggregate or JSON-RPC batch
+            use_multicall: Try Multicall3 before JSON-RPC batches
+        """
+        self.logger = logging.getLogger(__name__)
+        self.w3 = w3
+        self.rpc_url = rpc_url or getattr(w3.provider, 'endpoint_uri', None)
+        self.http = session_pool or get_session_pool()
+        self.max_batch_size = max_batch_size
+
+        # Capabilities are probed on first use
+        self._multicall_available: Optional[bool] = None if use_multicall else False
+        self._rpc_batch_supported = self.rpc_url is not None
+        self._multicall = w3.eth.contract(address=MULTICALL3_ADDRESS, abi=MULTICALL3_ABI)
+        self._contracts: Dict[str, Any] = {}
+        self._request_id = 0
+
+    def call(self,
+             calls: List,
+             block_identifier: Union[str, int] = 'latest',
+             allow_failure: bool = False) -> List[Any]:
+        """
+        Execute contract calls in as few round trips as possible
+        Args:
+            calls: ContractFunction objects, e.g. contract.functions.ownerOf(1)
+            block_identifier: Block to execute the calls against
+            allow_failure: Return None for reverted calls instead of raising
+        Returns:
+            Decoded results in call order
+        """
+        results = []
+        for i in range(0, len(calls), self.max_batch_size):
+            batch = calls[i:i + self.max_batch_size]
+            encoded = [(fn.address, self._encode(fn)) for fn in batch]
+            raw = self._execute(encoded, block_identifier)
+            for fn, (success, data) in zip(batch, raw):
+                if not success:
+                    if allow_failure:
+                        results.append(None)
+                        continue
+                    raise ValueError(f"Call to {fn.fn_name} failed: {data}")
+                results.append(self._decode(fn, data))
+        return results
+
+    def _execute(self, encoded: List[Tuple[str, str]], block_identifier) -> List[Tuple[bool, Any]]:
+        if self._has_multicall():
+            try:
+                return self._call_multicall(encoded, block_identifier)
+            except Exception as e:
+                self.logger.warning(f"Multicall3 aggregate failed, using JSON-RPC batch: {str(e)}")
+        if self._rpc_batch_supported:
+            try:
+                return self._call_rpc_batch(encoded, block_identifier)
+            except Exception as e:
+                self.logger.warning(f"JSON-RPC batch failed, calling sequentially: {str(e)}")
+                self._rpc_batch_supported = False
+        return self._call_sequential(encoded, block_identifier)
+
+    def _has_multicall(self) -> bool:
+        if self._multicall_available is None:
+            try:
+                self._multicall_available = len(self.w3.eth.get_code(MULTICALL3_ADDRESS)) > 0
+            except Exception as e:
+                self.logger.warning(f"Could not probe for Multicall3: {str(e)}")
+                self._multicall_available = False
+            self.logger.info(f"Multicall3 available: {self._multicall_available}")
+        return self._multicall_available
+
+    def _call_multicall(self, encoded, block_identifier) -> List[Tuple[bool, Any]]:
+        aggregate = self._multicall.functions.aggregate3(
+            [(target, True, data) for target, data in encoded]
+        )
+        return [
+            (success, data if success else f"reverted ({bytes(data).hex()})")
+            for success, data in aggregate.call(block_identifier=block_identifier)
+        ]
+
+    def _call_rpc_batch(self, encoded, block_identifier) -> List[Tuple[bool, Any]]:
+        block = block_identifier if isinstance(block_identifier, str) else hex(block_identifier)
+        first_id = self._request_id
+        self._request_id += len(encoded)
+        payload = [
+            {
+                'jsonrpc': '2.0',
+                'id': first_id + i,
+                'method': 'eth_call',
+                'params': [{'to': target, 'data': data}, block]
+            }
+            for i, (target, data) in enumerate(encoded)
+        ]
+        response = self.http.post(RPC, self.rpc_url, json=payload)
+        response.raise_for_status()
+        replies = response.json()
+        if not isinstance(replies, list):
+            raise ValueError(f"Provider does not support batch requests: {replies}")
+
+        # Replies may arrive in any order
+        by_id = {reply.get('id'): reply for reply in replies}
+        results = []
+        for i in range(len(encoded)):
+            reply = by_id.get(first_id + i, {'error': 'missing reply'})
+            if 'error' in reply:
+                results.append((False, reply['error']))
+            else:
+                results.append((True, bytes.fromhex(reply['result'][2:])))
+        return results
+
+    def _call_sequential(self, encoded, block_identifier) -> List[Tuple[bool, Any]]:
+        results = []
+        for target, data in encoded:
+            try:
+                results.append((True, self.w3.eth.call({'to': target, 'data': data}, block_identifier)))
+            except Exception as e:
+                results.append((False, str(e)))
+        return results
+
+    def _encode(self, fn) -> str:
+        """Encode a ContractFunction's call data"""
+        contract = self._contracts.get(fn.address)
+        if contract is None:
+            contract = self.w3.eth.contract(address=fn.address, abi=fn.contract_abi)
+            self._contracts[fn.address] = contract
+        return contract.encodeABI(fn_name=fn.fn_name, args=fn.args, kwargs=fn.kwargs)
+
+    def _decode(self, fn, data: bytes) -> Any:
+        """Decode return data like ContractFunction.call()"""
+        outputs = fn.abi.get('outputs', [])
+        decoded = self.w3.codec.decode([collapse_if_tuple(o) for o in outputs], bytes(data))
+        normalized = [_normalize(o, value) for o, value in zip(outputs, decoded)]
+        return normalized[0] if len(normalized) == 1 else normalized
+
+
+def _normalize(abi: Dict, value: Any) -> Any:
+    """Checksum addresses and turn arrays into lists, as web3 does for call results"""
+    abi_type = abi['type']
+    if abi_type.endswith(']'):
+        element = dict(abi, type=abi_type[:abi_type.rindex('[')])
+        return [_normalize(element, item) for item in value]
+    if abi_type == 'tuple':
+        return tuple(_normalize(c, item) for c, item in zip(abi['components'], value))
+    if abi_type == 'address':
+        return to_checksum_address(value)
+    return value
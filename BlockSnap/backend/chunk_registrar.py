@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+
+class ChunkRegistrar:
+    """
+    Accumulates on-chain chunk registrations and sends them in batches.
+
+    Chunks are grouped per session and flushed when a session has
+    max_batch_size chunks waiting or its oldest chunk has waited max_delay
+    seconds. Each add() returns a future that resolves to the receipt of the
+    transaction that registered the chunk, once it is confirmed.
+    """
+
+    def __init__(self,
+                 blockchain_handler,
+                 max_batch_size: int = 10,
+                 max_delay: float = 5.0):
+        """
+        Args:
+            blockchain_handler: Handler providing submit_video_chunks()
+            max_batch_size: Chunks per registration transaction
+            max_delay: Seconds a chunk may wait for its batch to fill
+        """
+        self.logger = logging.getLogger(__name__)
+        self.blockchain = blockchain_handler
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+
+        # session id -> (time the oldest chunk arrived, [(chunk data, future)])
+        self._pending: Dict[int, Tuple[float, List[Tuple[Dict, Future]]]] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+        # State
+        self.is_running = False
+        self.flush_thread: Optional[threading.Thread] = None
+        self.batches_sent = 0
+        self.chunks_sent = 0
+
+    def start(self) -> None:
+        """Start the background flush thread"""
+        if self.is_running:
+            return
+        self.is_running = True
+        self.flush_thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self.flush_thread.start()
+
+    def stop(self) -> None:
+        """Flush everything still waiting and stop the flush thread"""
+        self.is_running = False
+        self._wakeup.set()
+        if self.flush_thread:
+            self.flush_thread.join()
+        self.flush()
+
+    def add(self, session_id: int, chunk_data: Dict) -> Future:
+        """
+        Queue a chunk for registration
+        Args:
+            session_id: Session the chunk belongs to
+            chunk_data: Dict with sequence_number, video_cid and metadata_cid
+        Returns:
+            Future resolving to the confirmed transaction receipt
+        """
+        future = Future()
+        with self._lock:
+            _, entries = self._pending.setdefault(session_id, (time.monotonic(), []))
+            entries.append((chunk_data, future))
+            full = len(entries) >= self.max_batch_size
+        if full:
+            self._wakeup.set()
+        return future
+
+    def flush(self, session_id: Optional[int] = None) -> None:
+        """Send the waiting chunks of one session, or of all sessions, now"""
+        with self._lock:
+            if session_id is None:
+                batches = list(self._pending.items())
+                self._pending.clear()
+            elif session_id in self._pending:
+                batches = [(session_id, self._pending.pop(session_id))]
+            else:
+                batches = []
+        for sid, (_, entries) in batches:
+            self._send(sid, entries)
+
+    def _flush_loop(self) -> None:
+        while self.is_running:
+            now = time.monotonic()
+            due = []
+            next_deadline = self.max_delay
+            with self._lock:
+                for session_id, (started, entries) in self._pending.items():
+                    remaining = started + self.max_delay - now
+                    if len(entries) >= self.max_batch_size or remaining <= 0:
+                        due.append(session_id)
+                    else:
+                        next_deadline = min(next_deadline, remaining)
+            for session_id in due:
+                self.flush(session_id)
+            self._wakeup.wait(next_deadline)
+            self._wakeup.clear()
+
+    def _send(self, session_id: int, entries: List[Tuple[Dict, Future]]) -> None:
+        for i in range(0, len(entries), self.max_batch_size):
+            batch = entries[i:i + self.max_batch_size]
+            try:
+                receipts = self.blockchain.submit_video_chunks(
+                    session_id, [chunk_data for chunk_data, _ in batch]
+                )
+            except Exception as e:
+                self.logger.error(f"Error registering {len(batch)} chunks for session {session_id}: {str(e)}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), receipt in zip(batch, receipts):
+                receipt.add_done_callback(lambda done, future=future: self._resolve(future, done))
+            with self._lock:
+                self.batches_sent += 1
+                self.chunks_sent += len(batch)
+            self.logger.info(f"Submitted {len(batch)} chunk registrations for session {session_id}")
+
+    @staticmethod
+    def _resolve(future: Future, done: Future) -> None:
+        if done.exception() is not None:
+            future.set_exception(done.exception())
+        else:
+            future.set_result(done.result())
+
+    def get_stats(self) -> Dict:
+        """Get batching statistics"""
+        with self._lock:
+            return {
+                'waiting': sum(len(entries) for _, entries in self._pending.values()),
+                'batches_sent': self.batches_sent,
+                'chunks_sent': self.chunks_sent,
+                'average_batch_size': self.chunks_sent / self.batches_sent if self.batches_sent else 0
+            }
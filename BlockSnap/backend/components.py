@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+
+import importlib
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+
+class ComponentUnavailable(RuntimeError):
+    """Raised when a component could not be initialized"""
+
+
+class LazyComponent:
+    """
+    Process-wide instance of a component, built on first use.
+
+    Construction runs once under a lock, so concurrent first requests share
+    one instance. A failed construction is remembered and reported as
+    ComponentUnavailable until retry_interval has passed, so a backend that is
+    down costs one attempt per interval rather than one per request.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], object],
+                 cleanup: Optional[Callable[[object], None]] = None,
+                 retry_interval: Optional[float] = None):
+        """
+        Args:
+            name: Name used in logs and status reports
+            factory: Builds the instance; may get() other components
+            cleanup: Called with the instance on close()
+            retry_interval: Seconds before a failed construction is retried;
+                None reads COMPONENT_RETRY_INTERVAL (default 30) on first use,
+                after the app has loaded its .env
+        """
+        self.logger = logging.getLogger(__name__)
+        self.name = name
+        self.factory = factory
+        self.cleanup = cleanup
+        self.retry_interval = retry_interval
+
+        self._lock = threading.Lock()
+        self._instance = None
+        self._error: Optional[str] = None
+        self._failed_at: Optional[float] = None
+        self.init_seconds: Optional[float] = None
+        self.attempts = 0
+
+    def get(self):
+        """Get the instance, building it if needed"""
+        instance = self._instance
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            if self._instance is not None:
+                return self._instance
+            if self.retry_interval is None:
+                self.retry_interval = float(os.getenv('COMPONENT_RETRY_INTERVAL', 30))
+            if self._failed_at is not None and time.monotonic() - self._failed_at < self.retry_interval:
+                raise ComponentUnavailable(f"{self.name} unavailable: {self._error}")
+
+            self.attempts += 1
+            started = time.perf_counter()
+            try:
+                instance = self.factory()
+            except Exception as e:
+                self.init_seconds = time.perf_counter() - started
+                self._error = str(e)
+                self._failed_at = time.monotonic()
+                self.logger.error(f"Error initializing {self.name}: {str(e)}")
+                raise ComponentUnavailable(f"{self.name} unavailable: {str(e)}") from e
+
+            self.init_seconds = time.perf_counter() - started
+            self._error = None
+            self._failed_at = None
+            self._instance = instance
+            self.logger.info(f"Initialized {self.name} in {self.init_seconds:.3f}s")
+            return instance
+
+    def peek(self):
+        """Get the instance if it was already built, without building it"""
+        return self._instance
+
+    def provide(self, instance) -> None:
+        """Use an instance built elsewhere instead of calling the factory"""
+        with self._lock:
+            self._instance = instance
+            self._error = None
+            self._failed_at = None
+
+    def get_status(self) -> Dict:
+        """State (not_started, ready or unavailable), timing and last error"""
+        if self._instance is not None:
+            state = 'ready'
+        elif self._failed_at is not None:
+            state = 'unavailable'
+        else:
+            state = 'not_started'
+        return {
+            'state': state,
+            'init_seconds': self.init_seconds,
+            'attempts': self.attempts,
+            'error': self._error
+        }
+
+    def close(self) -> None:
+        """Clean up and forget the instance; the next get() builds a new one"""
+        with self._lock:
+            instance, self._instance = self._instance, None
+        if instance is not None and self.cleanup is not None:
+            self.cleanup(instance)
+
+
+class ComponentRegistry:
+    """Named lazy components plus the time spent importing their modules"""
+
+    def __init__(self, retry_interval: Optional[float] = None):
+        self.logger = logging.getLogger(__name__)
+        self.retry_interval = retry_interval
+        self.components: Dict[str, LazyComponent] = {}
+        self.import_seconds: Dict[str, float] = {}
+
+    def register(self, name: str, factory: Callable[[], object],
+                 cleanup: Optional[Callable[[object], None]] = None) -> LazyComponent:
+        component = LazyComponent(name, factory, cleanup, self.retry_interval)
+        self.components[name] = component
+        return component
+
+    def get(self, name: str):
+        """Get a component, building it on first use; raises ComponentUnavailable"""
+        return self.components[name].get()
+
+    def peek(self, name: str):
+        """Get a component only if it was already built"""
+        return self.components[name].peek()
+
+    def provide(self, name: str, instance) -> None:
+        """Inject an instance for a component, e.g. a handler the caller already has"""
+        self.components[name].provide(instance)
+
+    def import_module(self, name: str):
+        """Import a module, recording how long the first import took"""
+        if name not in sys.modules:
+            started = time.perf_counter()
+            module = importlib.import_module(name)
+            self.import_seconds[name] = time.perf_counter() - started
+            return module
+        return importlib.import_module(name)
+
+    def get_status(self) -> Dict[str, Dict]:
+        """Status of every component, see LazyComponent.get_status()"""
+        return {name: component.get_status() for name, component in self.components.items()}
+
+    def get_startup_report(self) -> Dict:
+        """Where startup time went: module imports and component construction"""
+        return {
+            'imports': {name: round(seconds, 4) for name, seconds in self.import_seconds.items()},
+            'components': {
+                name: round(component.init_seconds, 4)
+                for name, component in self.components.items()
+                if component.init_seconds is not None
+            }
+        }
+
+    def warm_up(self, names: Optional[Iterable[str]] = None) -> threading.Thread:
+        """Build components on a background thread so the first requests do not wait"""
+        names = list(names) if names is not None else list(self.components)
+
+        def build():
+            for name in names:
+                try:
+                    self.get(name)
+                except ComponentUnavailable:
+                    pass  # Already logged; reported through get_status()
+            self.logger.info(f"Startup report: {self.get_startup_report()}")
+
+        thread = threading.Thread(target=build, name='warm-up', daemon=True)
+        thread.start()
+        return thread
+
+    def close(self) -> None:
+        """Clean up built components in reverse registration order"""
+        for name, component in reversed(list(self.components.items())):
+            try:
+                component.close()
+            except Exception as e:
+                self.logger.error(f"Error closing {name}: {str(e)}")
+
+
+registry = ComponentRegistry()
+
+
+def _ipfs_handler():
+    return registry.import_module('backend.ipfs_handler').IPFSHandler()
+
+
+def _blockchain_handler():
+    return registry.import_module('backend.blockchain_handler').BlockchainHandler()
+
+
+def _nft_indexer():
+    blockchain_handler = registry.get('blockchain')
+    # Nothing to index before the contract was deployed
+    start_block = os.getenv('NFT_INDEX_START_BLOCK')
+    indexer = registry.import_module('backend.event_indexer').NFTIndexer(
+        blockchain_handler,
+        db_path=os.getenv('NFT_INDEX_DB', 'nft_index.db'),
+        start_block=int(start_block) if start_block else blockchain_handler.deploy_block,
+        confirmations=int(os.getenv('NFT_INDEX_CONFIRMATIONS', 2))
+    )
+    indexer.start()
+    # Answers CID lookups on contracts without getTokenIdByCID
+    blockchain_handler.token_index = indexer
+    return indexer
+
+
+def _dashcam_manager():
+    return registry.import_module('backend.dashcam_manager').DashcamManager(
+        ipfs=registry.get('ipfs'),
+        blockchain_handler=registry.get('blockchain')
+    )
+
+
+def _close_dashcam_manager(dashcam_manager) -> None:
+    if dashcam_manager.is_recording:
+        dashcam_manager.stop_recording()
+
+
+registry.register('ipfs', _ipfs_handler, cleanup=lambda handler: handler.cleanup())
+registry.register('blockchain', _blockchain_handler)
+registry.register('indexer', _nft_indexer, cleanup=lambda indexer: indexer.close())
+registry.register('dashcam', _dashcam_manager, cleanup=_close_dashcam_manager)
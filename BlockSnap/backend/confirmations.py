@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+import heapq
+import itertools
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+
+class ConfirmationTracker:
+    """
+    Notifies waiters when the chain reaches a block height.
+
+    A single watcher thread follows new heads through one block filter
+    (falling back to polling eth_blockNumber when the node has no filter
+    support) and resolves every waiter whose target block has been reached.
+    The watcher only runs while someone is waiting.
+    """
+
+    def __init__(self, w3, poll_interval: float = 1.0):
+        """
+        Args:
+            w3: Web3 instance
+            poll_interval: Seconds between checks for new heads
+        """
+        self.logger = logging.getLogger(__name__)
+        self.w3 = w3
+        self.poll_interval = poll_interval
+
+        # (target block, tie breaker, future)
+        self._waiters: List[Tuple[int, int, Future]] = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self.watch_thread: Optional[threading.Thread] = None
+        self.head: Optional[int] = None
+        self._filter = None
+
+    def wait_for_block(self, block_number: int) -> Future:
+        """Future resolving to the head block number once it is >= block_number"""
+        future = Future()
+        with self._lock:
+            if self.head is not None and self.head >= block_number:
+                future.set_result(self.head)
+                return future
+            heapq.heappush(self._waiters, (block_number, next(self._counter), future))
+            if self.watch_thread is None:
+                self._stop_event.clear()
+                self.watch_thread = threading.Thread(target=self._watch_loop, daemon=True)
+                self.watch_thread.start()
+        return future
+
+    def wait_for_confirmations(self, receipt, confirmations: int = 1, timeout: Optional[float] = None) -> int:
+        """
+        Block until a mined transaction has the given number of blocks on top of it
+        Returns: Head block number at that point
+        """
+        return self.wait_for_block(receipt['blockNumber'] + confirmations).result(timeout=timeout)
+
+    def _watch_loop(self) -> None:
+        while not self._stop_event.is_set():
+            with self._lock:
+                if not self._waiters:
+                    # Idle; the next waiter starts a new watcher
+                    self.watch_thread = None
+                    self._filter = None
+                    return
+            try:
+                self._update_head()
+            except Exception as e:
+                self.logger.warning(f"Error following new heads: {str(e)}")
+                # Nodes drop idle filters; install a new one on the next pass
+                self._filter = None
+            self._stop_event.wait(self.poll_interval)
+
+    def _update_head(self) -> None:
+        if self._filter is None:
+            try:
+                self._filter = self.w3.eth.filter('latest')
+            except Exception:
+                self._filter = False
+            head = self.w3.eth.block_number
+        elif self._filter is False:
+            head = self.w3.eth.block_number
+        else:
+            # Only ask for the height when the filter reports new blocks
+            if not self._filter.get_new_entries():
+                return
+            head = self.w3.eth.block_number
+        self._advance(head)
+
+    def _advance(self, head: int) -> None:
+        ready = []
+        with self._lock:
+            if self.head is not None and head <= self.head:
+                return
+            self.head = head
+            while self._waiters and self._waiters[0][0] <= head:
+                ready.append(heapq.heappop(self._waiters)[2])
+        for future in ready:
+            if not future.done():
+                future.set_result(head)
+
+    def get_stats(self) -> Dict:
+        """Get the last seen head and the number of waiters"""
+        with self._lock:
+            return {'head': self.head, 'waiters': len(self._waiters)}
+
+    def stop(self) -> None:
+        """Stop the watcher; unresolved waiters stay pending"""
+        self._stop_event.set()
+        thread = self.watch_thread
+        if thread:
+            thread.join()
+        with self._lock:
+            self.watch_thread = None
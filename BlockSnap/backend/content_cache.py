@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, Iterable, List, Optional
+from urllib.parse import quote
+
+# Suffix of cache files holding zlib-compressed content
+COMPRESSED_SUFFIX = '.z'
+
+
+class ContentCache:
+    """
+    Two-level LRU cache for immutable IPFS content, keyed by CID.
+
+    Content behind a CID never changes, so entries never need revalidation;
+    they only leave the cache when a size limit is reached. Recently used
+    entries are kept in memory, and every entry is also written to disk so
+    the cache survives restarts. Disk entries are zlib-compressed when that
+    makes them smaller. The lock only guards the indexes; files are read,
+    compressed and written without holding it.
+    """
+
+    def __init__(self,
+                 cache_dir: Optional[str] = None,
+                 memory_limit: int = 32 * 1024 * 1024,
+                 disk_limit: int = 512 * 1024 * 1024,
+                 compress: bool = True,
+                 max_entry_size: int = 8 * 1024 * 1024):
+        """
+        Args:
+            cache_dir: Directory for on-disk entries; None keeps the cache in memory only
+            memory_limit: Maximum bytes held in memory
+            disk_limit: Maximum bytes stored on disk
+            compress: Compress disk entries with zlib
+            max_entry_size: Larger content is not cached
+        """
+        self.logger = logging.getLogger(__name__)
+        self.memory_limit = memory_limit
+        self.disk_limit = disk_limit
+        self.compress = compress
+        self.max_entry_size = max_entry_size
+        self._lock = threading.Lock()
+
+        self._memory: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._memory_size = 0
+        # key -> stored file size, least recently used first
+        self._disk: 'OrderedDict[str, int]' = OrderedDict()
+        self._disk_size = 0
+        # Files being written by put(), so concurrent puts write each once
+        self._writing = set()
+
+        self.stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'evictions': 0
+        }
+
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir is not None:
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                self._scan_disk()
+            except OSError as e:
+                self.logger.warning(f"Disk cache disabled: {str(e)}")
+                self.cache_dir = None
+
+    def _scan_disk(self) -> None:
+        """Rebuild the disk index, oldest access first"""
+        entries = []
+        for path in self.cache_dir.iterdir():
+            if path.is_file() and not path.name.startswith('.'):
+                stat = path.stat()
+                entries.append((stat.st_mtime, path.name, stat.st_size))
+        for _, name, size in sorted(entries):
+            self._disk[name] = size
+            self._disk_size += size
+        self._unlink(self._evict_disk())
+
+    @staticmethod
+    def _file_key(key: str) -> str:
+        # Keys may be CID paths such as <cid>/metadata.json; percent-encoding
+        # keeps distinct keys distinct, and leaves plain CIDs unchanged
+        return quote(key, safe='')
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Get cached content, or None on a miss"""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return data
+            name = self._file_key(key)
+            on_disk = self.cache_dir is not None and name in self._disk
+
+        data = self._read_disk(name) if on_disk else None
+        with self._lock:
+            if data is None:
+                self.stats['misses'] += 1
+                if on_disk:
+                    self._forget_disk(name)
+            else:
+                if name in self._disk:
+                    self._disk.move_to_end(name)
+                self.stats['disk_hits'] += 1
+                self._put_memory(key, data)
+        if data is None and on_disk:
+            self._unlink([name])
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Cache content"""
+        data = bytes(data)
+        if len(data) > self.max_entry_size:
+            return
+        name = self._file_key(key)
+        with self._lock:
+            self._put_memory(key, data)
+            if self.cache_dir is None or name in self._disk or name in self._writing:
+                return
+            self._writing.add(name)
+
+        size = None
+        try:
+            size = self._write_disk(name, data)
+        finally:
+            with self._lock:
+                self._writing.discard(name)
+                evicted = []
+                if size is not None:
+                    self._disk[name] = size
+                    self._disk_size += size
+                    evicted = self._evict_disk()
+        self._unlink(evicted)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._memory or self._file_key(key) in self._disk
+
+    def _put_memory(self, key: str, data: bytes) -> None:
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        self._memory[key] = data
+        self._memory_size += len(data)
+        while self._memory_size > self.memory_limit and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+            self.stats['evictions'] += 1
+
+    def _read_disk(self, name: str) -> Optional[bytes]:
+        """Read a disk entry without the lock; None if it is unreadable or gone"""
+        path = self.cache_dir / name
+        try:
+            data = path.read_bytes()
+            if data.startswith(b'\0'):
+                data = data[1:]
+            else:
+                data = zlib.decompress(data[1:])
+            # Record the access so LRU order survives a restart
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            # Evicted by another thread since the index was checked
+            self.logger.debug(f"Cache entry {name} is gone")
+            return None
+        except (OSError, zlib.error) as e:
+            self.logger.warning(f"Dropping unreadable cache entry {name}: {str(e)}")
+            return None
+
+    def _write_disk(self, name: str, data: bytes) -> Optional[int]:
+        """Write a disk entry without the lock; returns the stored size, or None on failure"""
+        # One header byte: 0 for plain content, 1 for zlib-compressed
+        stored = b'\0' + data
+        if self.compress:
+            compressed = zlib.compress(data, 6)
+            if len(compressed) < len(data):
+                stored = b'\1' + compressed
+
+        path = self.cache_dir / name
+        tmp_path = self.cache_dir / f".{name}.tmp"
+        try:
+            tmp_path.write_bytes(stored)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self.logger.warning(f"Failed to write cache entry {name}: {str(e)}")
+            return None
+        return len(stored)
+
+    def _evict_disk(self) -> List[str]:
+        """Drop least recently used disk entries over the limit; returns the names to unlink"""
+        evicted = []
+        while self._disk_size > self.disk_limit and self._disk:
+            name = next(iter(self._disk))
+            self._forget_disk(name)
+            evicted.append(name)
+            self.stats['evictions'] += 1
+        return evicted
+
+    def _forget_disk(self, name: str) -> None:
+        self._disk_size -= self._disk.pop(name, 0)
+
+    def _unlink(self, names: Iterable[str]) -> None:
+        for name in names:
+            try:
+                (self.cache_dir / name).unlink()
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        """Remove all entries from memory and disk"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+            names = list(self._disk)
+            for name in names:
+                self._forget_disk(name)
+        if self.cache_dir is not None:
+            self._unlink(names)
+
+    def get_stats(self) -> Dict:
+        """Get hit/miss counts and cache occupancy"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats.update({
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_size,
+                'disk_entries': len(self._disk),
+                'disk_bytes': self._disk_size
+            })
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        return stats
+
+
+class TTLCache:
+    """
+    Thread-safe in-memory LRU cache whose entries expire.
+
+    For results that can change, such as whether content is reachable.
+    Negative results can be given a shorter lifetime than positive ones,
+    so a miss is retried sooner than a hit is rechecked.
+    """
+
+    def __init__(self, ttl: float, negative_ttl: Optional[float] = None, max_entries: int = 4096):
+        """
+        Args:
+            ttl: Seconds a result stays valid
+            negative_ttl: Seconds a negative result stays valid; defaults to ttl
+            max_entries: Least recently used entries beyond this are dropped
+        """
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # key -> (expiry time, value), least recently used first
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a cached value, or default when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.stats['misses'] += 1
+                return default
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any, negative: bool = False) -> None:
+        """Store a value; negative values expire after negative_ttl"""
+        ttl = self.negative_ttl if negative else self.ttl
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        """Get hit/miss counts and occupancy"""
+        with self._lock:
+            stats = dict(self.stats, entries=len(self._entries))
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
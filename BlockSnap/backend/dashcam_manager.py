@@ -1,31 +1,74 @@
 #!/usr/bin/env python3
 
+import json
 import logging
+import os
+import queue
 import threading
+from concurrent.futures import FIRST_COMPLETED, Future, wait
 from typing import Optional, Dict
 from datetime import datetime
 import time
-from .video_handler import DashcamRecorder
+from .video_handler import DashcamRecorder, VideoChunk
 from .ipfs_handler import IPFSHandler
 from .blockchain_handler import BlockchainHandler
 from .batch_processor import BatchProcessor
+from .chunk_registrar import ChunkRegistrar
+from .merkle import SessionMerkleTree, manifest_chunks
 from pathlib import Path
 
 class DashcamManager:
-    def __init__(self):
-        """Initialize the dashcam manager"""
+    # Markers on the upload event queue, next to the batch processor's results
+    _WAKE = object()          # A registration or root commit finished
+    _UPLOADS_DONE = object()  # Every result of the session has been queued
+
+    def __init__(self, ipfs: Optional[IPFSHandler] = None,
+                 blockchain_handler: Optional[BlockchainHandler] = None):
+        """
+        Initialize the dashcam manager
+        Args:
+            ipfs: Shared IPFS handler; a new one is created when omitted
+            blockchain_handler: Shared blockchain handler; a new one is created when omitted
+        """
         self.logger = logging.getLogger(__name__)
         
         # Initialize components
         self.recorder = DashcamRecorder()
-        self.ipfs = IPFSHandler()
-        self.blockchain_handler = BlockchainHandler()
-        self.batch_processor = BatchProcessor(self.ipfs)
+        self.ipfs = ipfs or IPFSHandler()
+        self.blockchain_handler = blockchain_handler or BlockchainHandler()
+        
+        # Upload results and registration completions wake the upload loop
+        self.upload_events = queue.Queue()
+        self.batch_processor = BatchProcessor(
+            self.ipfs,
+            num_workers=int(os.getenv('UPLOAD_WORKERS', 3)),
+            result_queue=self.upload_events
+        )
+        
+        # Chunks are registered on-chain in batches
+        self.chunk_registrar = ChunkRegistrar(
+            self.blockchain_handler,
+            max_batch_size=int(os.getenv('CHUNK_BATCH_SIZE', 10)),
+            max_delay=float(os.getenv('CHUNK_BATCH_DELAY', 5.0))
+        )
+        self.max_registration_attempts = 3
+        self.pending_registrations = []
+        
+        # In 'merkle' mode chunks are only committed as periodic Merkle roots
+        self.session_mode = os.getenv('SESSION_MODE', 'chunks').lower()
+        self.root_interval = int(os.getenv('SESSION_ROOT_INTERVAL', 20))
+        self.active_mode = 'chunks'
+        self.session_tree: Optional[SessionMerkleTree] = None
+        self.tree_session_id: Optional[int] = None
+        self.committed_chunk_count = 0
+        self.pending_roots = []
+        self.proof_manifest_cid: Optional[str] = None
         
         # Session state
         self.session_id: Optional[int] = None
         self.is_recording = False
         self.upload_thread: Optional[threading.Thread] = None
+        self.handoff_thread: Optional[threading.Thread] = None
         self.current_session_chunks = []
         self.session_start_time = None
         self.session_metadata = {}
@@ -43,6 +86,7 @@ class DashcamManager:
             # Reset state
             self.last_error = None
             self.error_count = 0
+            self._clear_upload_events()
             
             # Start blockchain session
             self.session_id = self.blockchain_handler.start_video_session()
@@ -62,8 +106,9 @@ class DashcamManager:
             if not self.recorder.start_recording():
                 raise RuntimeError("Failed to start recording")
             
-            # Start batch processor
+            # Start batch processor and on-chain registration
             self.batch_processor.start()
+            self._start_registration()
             
             # Start upload thread
             self.is_recording = True
@@ -72,6 +117,10 @@ class DashcamManager:
             self.upload_thread = threading.Thread(target=self._upload_loop)
             self.upload_thread.start()
             
+            # Start hand-off from the recorder to the batch processor
+            self.handoff_thread = threading.Thread(target=self._handoff_loop)
+            self.handoff_thread.start()
+            
             self.logger.info(f"Started recording with session ID: {self.session_id}")
             return True
             
@@ -95,19 +144,27 @@ class DashcamManager:
                 datetime.now() - self.session_start_time
             ).total_seconds()
             
-            # Stop recorder first
+            # Stop recorder first; it closes its chunk queue after the last chunk
             self.recorder.stop_recording()
-            
-            # Signal upload thread to stop
             self.is_recording = False
             
-            # Wait for upload thread with timeout
-            if self.upload_thread and self.upload_thread.is_alive():
-                self.upload_thread.join(timeout=10)  # Wait up to 10 seconds
+            # Forward the chunks flushed by the recorder before stopping the processor
+            if self.handoff_thread and self.handoff_thread.is_alive():
+                self.handoff_thread.join()
             
-            # Stop batch processor
+            # Upload what is still queued; all results are delivered when stop() returns
             self.batch_processor.stop()
             
+            # Let the upload loop handle the last results before registration is finalized
+            self._end_upload_loop(timeout=10)
+            
+            # Register the remaining chunks before the session is closed
+            if self.active_mode == 'merkle':
+                self._finalize_tree(timeout=120)
+            else:
+                self.chunk_registrar.stop()
+                self._drain_registrations(timeout=60)
+            
             # End blockchain session with final metadata
             if self.session_id is not None:
                 try:
@@ -138,8 +195,40 @@ class DashcamManager:
             self.logger.error(f"Error adding chunk: {str(e)}")
             raise
 
-    def _verify_chunk_upload(self, chunk_data):
-        """Verify chunk was properly uploaded"""
+    def _handoff_loop(self) -> None:
+        """Forward encoded chunks from the recorder to the batch processor"""
+        while True:
+            try:
+                # None once the recorder has stopped and its last chunk is out
+                chunk = self.recorder.get_next_chunk(block=True)
+                if chunk is None:
+                    break
+                self.add_chunk(chunk)
+            except Exception as e:
+                self.logger.error(f"Error in hand-off loop: {str(e)}")
+                if not self.is_recording:
+                    break
+
+    def _end_handoff(self, timeout: float) -> None:
+        if self.handoff_thread and self.handoff_thread.is_alive():
+            # The loop blocks in get_next_chunk() until the chunk queue is closed
+            if self.recorder.is_recording:
+                self.recorder.stop_recording()
+            else:
+                self.recorder.chunk_queue.close()
+            self.handoff_thread.join(timeout=timeout)
+            if self.handoff_thread.is_alive():
+                self.logger.warning("Hand-off thread did not stop")
+        self.handoff_thread = None
+
+    def _verify_chunk_upload(self, chunk_data, receipt=None):
+        """
+        Verify chunk was properly uploaded
+        Args:
+            chunk_data: Uploaded chunk with its CIDs
+            receipt: Registration receipt; its logs are checked instead of
+                scanning the session's chunk events
+        """
         try:
             # Verify IPFS content exists
             if not self.ipfs.verify_content(chunk_data['video_cid']):
@@ -148,7 +237,11 @@ class DashcamManager:
                 raise ValueError(f"Metadata missing: {chunk_data['metadata_cid']}")
             
             # Verify blockchain record
-            if not self.blockchain_handler.verify_session_chunk(self.session_id, chunk_data):
+            if receipt is not None:
+                registered = self.blockchain_handler.receipt_has_chunk(receipt, self.session_id, chunk_data)
+            else:
+                registered = self.blockchain_handler.verify_session_chunk(self.session_id, chunk_data)
+            if not registered:
                 raise ValueError(f"Chunk not found in blockchain for session {self.session_id}")
             
             return True
@@ -157,56 +250,211 @@ class DashcamManager:
             return False
 
     def _upload_loop(self) -> None:
-        """Main upload loop"""
-        while self.is_recording:
+        """Handle upload results and finished registrations as they arrive"""
+        while True:
+            event = self.upload_events.get()
+            if event is self._UPLOADS_DONE:
+                break
             try:
-                # Get processed results
-                while not self.batch_processor.result_queue.empty():
-                    result = self.batch_processor.result_queue.get()
-                    self.logger.debug(f"Processing result: {result}")
-                    
-                    if result.get('success', False):
-                        # Get the actual result data
-                        chunk_data = result.get('result', {})
-                        if not chunk_data:
-                            chunk_data = result  # Handle case where result is not wrapped
-                        
-                        # Retry logic for blockchain upload
-                        max_retries = 3
-                        for attempt in range(max_retries):
-                            try:
-                                self.blockchain_handler.add_video_chunk(
-                                    self.session_id,
-                                    chunk_data
-                                )
-                                
-                                # Verify upload
-                                if self._verify_chunk_upload(chunk_data):
-                                    self.logger.info(f"Successfully added and verified chunk {chunk_data.get('sequence_number')} to blockchain")
-                                    break
-                                else:
-                                    raise ValueError("Chunk verification failed")
-                                    
-                            except Exception as e:
-                                self.logger.warning(f"Attempt {attempt + 1}/{max_retries} failed: {e}")
-                                if attempt == max_retries - 1:
-                                    self.error_count += 1
-                                    self.last_error = f"Failed to add chunk to blockchain after {max_retries} attempts: {str(e)}"
-                                    self.logger.error(self.last_error)
-                                else:
-                                    time.sleep(1 * (attempt + 1))  # Exponential backoff
-                    else:
-                        self.error_count += 1
-                        self.last_error = result.get('error', 'Unknown error in batch processing')
-                        self.logger.error(f"Error processing chunk: {self.last_error}")
-                
-                time.sleep(0.1)  # Prevent busy waiting
+                if event is not self._WAKE:
+                    self._handle_result(event)
+                self._check_registrations()
+                self._check_roots()
                 
             except Exception as e:
                 self.error_count += 1
                 self.last_error = str(e)
                 self.logger.error(f"Error in upload loop: {str(e)}")
 
+    def _handle_result(self, result: Dict) -> None:
+        """Register an uploaded chunk, or record why its upload failed"""
+        self.logger.debug(f"Processing result: {result}")
+        
+        # The chunk file is no longer needed by the upload path
+        if result.get('sequence_number') is not None:
+            self.recorder.mark_chunk_done(result['sequence_number'])
+        
+        if result.get('success', False):
+            # Get the actual result data
+            chunk_data = result.get('result', {})
+            if not chunk_data:
+                chunk_data = result  # Handle case where result is not wrapped
+            self.current_session_chunks.append(chunk_data)
+            
+            # Queue for batched on-chain registration
+            if self.active_mode == 'merkle':
+                self._add_to_tree(chunk_data)
+            else:
+                self._register_chunk(chunk_data)
+        else:
+            self.error_count += 1
+            self.last_error = result.get('error', 'Unknown error in batch processing')
+            self.logger.error(f"Error processing chunk: {self.last_error}")
+
+    def _notify(self, future: Future) -> Future:
+        """Wake the upload loop when a future completes"""
+        future.add_done_callback(lambda _: self.upload_events.put(self._WAKE))
+        return future
+
+    def _end_upload_loop(self, timeout: float) -> None:
+        if self.upload_thread and self.upload_thread.is_alive():
+            self.upload_events.put(self._UPLOADS_DONE)
+            self.upload_thread.join(timeout=timeout)
+
+    def _clear_upload_events(self) -> None:
+        """Drop events left over from the previous session"""
+        while True:
+            try:
+                self.upload_events.get_nowait()
+            except queue.Empty:
+                return
+
+    def _start_registration(self) -> None:
+        """Pick the registration mode for a new session"""
+        self.pending_registrations = []
+        self.pending_roots = []
+        self.proof_manifest_cid = None
+        self.active_mode = 'chunks'
+        if self.session_mode == 'merkle':
+            if self.blockchain_handler.supports_session_roots:
+                self.active_mode = 'merkle'
+                self.session_tree = SessionMerkleTree()
+                self.tree_session_id = self.session_id
+                self.committed_chunk_count = 0
+                return
+            self.logger.warning("Contract does not support session roots, registering chunks individually")
+        self.chunk_registrar.start()
+
+    def _add_to_tree(self, chunk_data: Dict) -> None:
+        """Add an uploaded chunk to the session tree, committing the root periodically"""
+        self.session_tree.add(chunk_data)
+        self.logger.info(f"Added chunk {chunk_data.get('sequence_number')} to session tree")
+        if len(self.session_tree) - self.committed_chunk_count >= self.root_interval:
+            self._commit_root()
+
+    def _commit_root(self, manifest_cid: str = '') -> None:
+        """Send the current root; each commit supersedes the previous one"""
+        chunk_count = len(self.session_tree)
+        future = self._notify(self.blockchain_handler.commit_session_root(
+            self.session_id, self.session_tree.root, chunk_count, manifest_cid
+        ))
+        self.pending_roots.append((chunk_count, future))
+        self.committed_chunk_count = chunk_count
+
+    def _check_roots(self) -> None:
+        """Log confirmed root commits; a failed one is covered by the next commit"""
+        still_pending = []
+        for chunk_count, future in self.pending_roots:
+            if not future.done():
+                still_pending.append((chunk_count, future))
+            elif future.exception() is not None:
+                self.error_count += 1
+                self.last_error = f"Failed to commit session root over {chunk_count} chunks: {future.exception()}"
+                self.logger.error(self.last_error)
+                if chunk_count == self.committed_chunk_count:
+                    # Nothing newer is on its way; recommit with the next chunk or at stop
+                    self.committed_chunk_count = 0
+            else:
+                self.logger.info(f"Committed session root over {chunk_count} chunks")
+        self.pending_roots = still_pending
+
+    def _finalize_tree(self, timeout: float) -> None:
+        """Publish the proofs of every chunk and commit them with the final root"""
+        if not len(self.session_tree):
+            return
+        
+        # The manifest CID is committed with the root, so the chunks can be
+        # found and verified from the chain alone once this process is gone
+        try:
+            manifest = dict(self.session_tree.get_manifest(), session_id=self.session_id)
+            self.proof_manifest_cid = self.ipfs.add_bytes(
+                json.dumps(manifest).encode(), f"session_{self.session_id}_proofs.json"
+            )
+            self.session_metadata['proof_manifest_cid'] = self.proof_manifest_cid
+            self.logger.info(f"Published proofs for {len(self.session_tree)} chunks: {self.proof_manifest_cid}")
+        except Exception as e:
+            self.error_count += 1
+            self.last_error = f"Failed to publish proof manifest: {str(e)}"
+            self.logger.error(self.last_error)
+        
+        if self.proof_manifest_cid or self.committed_chunk_count < len(self.session_tree):
+            self._commit_root(self.proof_manifest_cid or '')
+        if self.pending_roots:
+            try:
+                self.pending_roots[-1][1].result(timeout=timeout)
+            except Exception as e:
+                self.pending_roots = []
+                raise RuntimeError(f"Failed to commit final session root: {str(e)}")
+            self._check_roots()
+
+    def get_chunk_proof(self, session_id: int, sequence_number: int) -> Optional[Dict]:
+        """
+        Inclusion proof for a chunk of a Merkle-mode session, from the session
+        being recorded or from the manifest committed on-chain for earlier ones
+        """
+        if self.session_tree is not None and self.tree_session_id == session_id:
+            proof = self.session_tree.get_chunk_proof(sequence_number)
+            if proof is not None:
+                proof['session_id'] = session_id
+                proof['committed_chunk_count'] = self.committed_chunk_count
+            return proof
+        
+        if not self.blockchain_handler.supports_session_roots:
+            return None
+        committed = self.blockchain_handler.get_session_root(session_id)
+        if not committed['manifest_cid']:
+            return None
+        manifest = self.ipfs.get_json(committed['manifest_cid'])
+        for chunk in manifest_chunks(manifest, committed['root']):
+            if chunk['sequence_number'] == sequence_number:
+                return dict(chunk, session_id=session_id, committed_chunk_count=committed['chunk_count'])
+        return None
+
+    def _register_chunk(self, chunk_data: Dict, attempt: int = 1) -> None:
+        """Queue a chunk for on-chain registration"""
+        future = self._notify(self.chunk_registrar.add(self.session_id, chunk_data))
+        self.pending_registrations.append((chunk_data, attempt, future))
+
+    def _check_registrations(self) -> None:
+        """Verify confirmed registrations and retry failed ones"""
+        still_pending = []
+        for chunk_data, attempt, future in self.pending_registrations:
+            if not future.done():
+                still_pending.append((chunk_data, attempt, future))
+                continue
+            
+            error = future.exception()
+            if error is None and self._verify_chunk_upload(chunk_data, future.result()):
+                self.logger.info(f"Successfully added and verified chunk {chunk_data.get('sequence_number')} to blockchain")
+                continue
+            
+            error = error or ValueError("Chunk verification failed")
+            self.logger.warning(f"Attempt {attempt}/{self.max_registration_attempts} failed: {error}")
+            if attempt >= self.max_registration_attempts:
+                self.error_count += 1
+                self.last_error = f"Failed to add chunk to blockchain after {attempt} attempts: {str(error)}"
+                self.logger.error(self.last_error)
+            else:
+                future = self._notify(self.chunk_registrar.add(self.session_id, chunk_data))
+                still_pending.append((chunk_data, attempt + 1, future))
+        self.pending_registrations = still_pending
+
+    def _drain_registrations(self, timeout: float) -> None:
+        """Wait for outstanding registrations, flushing retries directly"""
+        deadline = time.monotonic() + timeout
+        while self.pending_registrations:
+            self.chunk_registrar.flush()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            wait([future for _, _, future in self.pending_registrations],
+                 timeout=remaining, return_when=FIRST_COMPLETED)
+            self._check_registrations()
+        if self.pending_registrations:
+            self.error_count += 1
+            self.last_error = f"{len(self.pending_registrations)} chunk registrations still pending at session end"
+            self.logger.error(self.last_error)
+
     def recover_session(self, session_id: int) -> bool:
         """
         Recover a failed session by reprocessing missing chunks
@@ -222,6 +470,12 @@ class DashcamManager:
             existing_chunks = self.blockchain_handler.get_session_chunks(session_id)
             saved_chunks = {c['sequence_number'] for c in existing_chunks}
             
+            # Make sure the chunks already registered stay pinned, in one request
+            try:
+                self.ipfs.pin_many([c['video_cid'] for c in existing_chunks])
+            except Exception as e:
+                self.logger.warning(f"Failed to re-pin chunks for session {session_id}: {e}")
+            
             # Calculate missing chunks
             expected_chunks = set(range(metadata.get('chunk_count', 0)))
             missing_chunks = expected_chunks - saved_chunks
@@ -238,12 +492,9 @@ class DashcamManager:
                 chunk_path = self.recorder.temp_dir / f"chunk_{chunk_num}.mp4"
                 if chunk_path.exists():
                     try:
-                        with open(chunk_path, 'rb') as f:
-                            chunk_data = f.read()
-                        
                         chunk = VideoChunk(
                             start_time=metadata['start_time'] + (chunk_num * self.recorder.chunk_duration),
-                            data=chunk_data,
+                            path=chunk_path,
                             sequence_number=chunk_num,
                             metadata={
                                 'session_id': session_id,
@@ -266,6 +517,12 @@ class DashcamManager:
             self.logger.error(f"Failed to recover session {session_id}: {e}")
             return False
 
+    def get_latest_chunk(self) -> Optional[Dict]:
+        """Get the most recently uploaded chunk of the current session, or None"""
+        if not self.current_session_chunks:
+            return None
+        return self.current_session_chunks[-1]
+
     def get_status(self) -> Dict:
         """Get current status with enhanced error reporting"""
         try:
@@ -280,13 +537,23 @@ class DashcamManager:
                 except Exception as e:
                     self.logger.error(f"Failed to get session status: {e}")
             
+            pipeline = dict(recorder_status.get('pipeline', {}))
+            pipeline['upload'] = processor_stats.get('input_queue')
+            
             return {
                 'is_recording': self.is_recording,
                 'session_id': self.session_id,
+                'pipeline': pipeline,
                 'session_metadata': self.session_metadata,
                 'session_status': session_status,
                 'recorder_status': recorder_status,
                 'processor_stats': processor_stats,
+                'session_mode': self.active_mode,
+                'session_tree_chunks': len(self.session_tree) if self.session_tree is not None else 0,
+                'registration_stats': dict(
+                    self.chunk_registrar.get_stats(),
+                    unconfirmed=len(self.pending_registrations)
+                ),
                 'error_count': self.error_count,
                 'last_error': self.last_error,
                 'current_chunk': self.current_chunk,
@@ -300,7 +567,9 @@ class DashcamManager:
 
     def cleanup(self) -> None:
         """Clean up resources"""
-        self.recorder.cleanup()
         self.is_recording = False
+        self._end_handoff(timeout=10)
+        self.recorder.cleanup()
+        self._end_upload_loop(timeout=10)
         self.session_id = None
         self.session_metadata = {}
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+
+import logging
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+from .log_scanner import LogScanner
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tokens (
+    token_id INTEGER PRIMARY KEY,
+    owner TEXT NOT NULL,
+    image_cid TEXT,
+    metadata_uri TEXT,
+    mint_tx TEXT,
+    mint_block INTEGER
+);
+CREATE INDEX IF NOT EXISTS tokens_owner ON tokens (owner);
+CREATE INDEX IF NOT EXISTS tokens_image ON tokens (image_cid);
+
+CREATE TABLE IF NOT EXISTS events (
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    block_hash TEXT NOT NULL,
+    tx_hash TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    token_id INTEGER NOT NULL,
+    owner TEXT,
+    image_cid TEXT,
+    metadata_uri TEXT,
+    PRIMARY KEY (block_number, log_index)
+);
+CREATE INDEX IF NOT EXISTS events_token ON events (token_id);
+
+CREATE TABLE IF NOT EXISTS checkpoints (
+    block_number INTEGER PRIMARY KEY,
+    block_hash TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Event kinds stored in the events table
+MINT = 'mint'
+TRANSFER = 'transfer'
+
+# Owner recorded for burned tokens
+ZERO_ADDRESS = '0x' + '0' * 40
+
+
+def _hex(value) -> str:
+    return value.hex() if hasattr(value, 'hex') and not isinstance(value, str) else value
+
+
+class NFTIndexer:
+    """
+    Follows PhotoMinted and Transfer events into a local SQLite index.
+
+    Every indexed event is stored with its block hash, and the hash of the
+    last indexed block is kept as a checkpoint. When a checkpoint no longer
+    matches the chain, the indexer rolls back to the newest checkpoint that
+    still matches and re-derives the affected tokens from the surviving
+    events before indexing forward again.
+    """
+
+    def __init__(self,
+                 blockchain_handler,
+                 db_path: str = 'nft_index.db',
+                 start_block: int = 0,
+                 confirmations: int = 2,
+                 window_size: int = 2000,
+                 poll_interval: float = 5.0,
+                 max_checkpoints: int = 128):
+        """
+        Args:
+            blockchain_handler: BlockchainHandler with the contract to follow
+            db_path: SQLite database file
+            start_block: First block to index (the contract deployment block)
+            confirmations: Blocks to stay behind the chain head
+            window_size: Maximum blocks per get_logs request
+            poll_interval: Seconds between polls for new blocks
+            max_checkpoints: Block hashes kept for reorg detection
+        """
+        self.logger = logging.getLogger(__name__)
+        self.blockchain = blockchain_handler
+        self.w3 = blockchain_handler.w3
+        self.contract = blockchain_handler.contract
+        self.start_block = start_block
+        self.confirmations = confirmations
+        self.scanner = LogScanner(self.w3, max_window=window_size)
+        self.poll_interval = poll_interval
+        self.max_checkpoints = max_checkpoints
+
+        self.mint_topic = bytes(self.w3.keccak(text="PhotoMinted(uint256,address,string,string)"))
+        self.transfer_topic = bytes(self.w3.keccak(text="Transfer(address,address,uint256)"))
+
+        # The connection is shared by the indexer thread and request handlers
+        self._db_lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        with self.db:
+            self.db.executescript(SCHEMA)
+
+        # State
+        self.is_running = False
+        self.index_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self.reorg_count = 0
+        self.last_error: Optional[str] = None
+
+    def start(self) -> None:
+        """Start following the chain in the background"""
+        if self.is_running:
+            return
+        self.is_running = True
+        self._stop_event.clear()
+        self.index_thread = threading.Thread(target=self._index_loop, daemon=True)
+        self.index_thread.start()
+        self.logger.info("NFT indexer started")
+
+    def stop(self) -> None:
+        """Stop the background indexer"""
+        self.is_running = False
+        self._stop_event.set()
+        if self.index_thread:
+            self.index_thread.join()
+        self.logger.info("NFT indexer stopped")
+
+    def _index_loop(self) -> None:
+        while self.is_running:
+            try:
+                self.sync()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                self.logger.error(f"Error indexing NFT events: {str(e)}")
+            self._stop_event.wait(self.poll_interval)
+
+    @property
+    def indexed_block(self) -> int:
+        """Last block included in the index, or start_block - 1"""
+        with self._db_lock:
+            row = self.db.execute("SELECT value FROM state WHERE key = 'indexed_block'").fetchone()
+        return int(row['value']) if row else self.start_block - 1
+
+    def sync(self) -> int:
+        """
+        Index new blocks up to the confirmed head
+        Returns:
+            Last indexed block
+        """
+        with self._sync_lock:
+            self._check_reorg()
+            head = self.w3.eth.block_number - self.confirmations
+            windows = self.scanner.scan_windows(
+                {
+                    'address': self.contract.address,
+                    'topics': [[self.mint_topic, self.transfer_topic]]
+                },
+                self.indexed_block + 1,
+                head
+            )
+            for _, to_block, logs in windows:
+                block_hash = _hex(self.w3.eth.get_block(to_block)['hash'])
+                self._store(logs, to_block, block_hash)
+                if self._stop_event.is_set():
+                    break
+            return self.indexed_block
+
+    def _store(self, logs: List, to_block: int, block_hash: str) -> None:
+        """Apply one window of logs and advance the checkpoint atomically"""
+        events = sorted(
+            (self._decode(log) for log in logs if not log.get('removed')),
+            key=lambda event: (event['block_number'], event['log_index'])
+        )
+        with self._db_lock, self.db:
+            for event in events:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO events VALUES "
+                    "(:block_number, :log_index, :block_hash, :tx_hash, :kind, "
+                    ":token_id, :owner, :image_cid, :metadata_uri)",
+                    event
+                )
+                self._apply(event)
+            self.db.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?)", (to_block, block_hash)
+            )
+            self.db.execute(
+                "DELETE FROM checkpoints WHERE block_number NOT IN "
+                "(SELECT block_number FROM checkpoints ORDER BY block_number DESC LIMIT ?)",
+                (self.max_checkpoints,)
+            )
+            self.db.execute(
+                "INSERT OR REPLACE INTO state VALUES ('indexed_block', ?)", (str(to_block),)
+            )
+        if events:
+            self.logger.info(f"Indexed {len(events)} NFT events up to block {to_block}")
+
+    def _decode(self, log) -> Dict:
+        topic = bytes(log['topics'][0])
+        event = {
+            'block_number': log['blockNumber'],
+            'log_index': log['logIndex'],
+            'block_hash': _hex(log['blockHash']),
+            'tx_hash': _hex(log['transactionHash']),
+            'owner': None,
+            'image_cid': None,
+            'metadata_uri': None
+        }
+        if topic == self.mint_topic:
+            args = self.contract.events.PhotoMinted().process_log(log)['args']
+            event.update(kind=MINT, token_id=args['tokenId'], owner=args['owner'].lower(),
+                         image_cid=args['ipfsCID'], metadata_uri=args['metadataURI'])
+        else:
+            args = self.contract.events.Transfer().process_log(log)['args']
+            event.update(kind=TRANSFER, token_id=args['tokenId'], owner=args['to'].lower())
+        return event
+
+    def _apply(self, event: Dict) -> None:
+        """Fold one event into the tokens table"""
+        if event['kind'] == MINT:
+            self.db.execute(
+                "INSERT INTO tokens (token_id, owner, image_cid, metadata_uri, mint_tx, mint_block) "
+                "VALUES (:token_id, :owner, :image_cid, :metadata_uri, :tx_hash, :block_number) "
+                "ON CONFLICT (token_id) DO UPDATE SET image_cid = excluded.image_cid, "
+                "metadata_uri = excluded.metadata_uri, mint_tx = excluded.mint_tx, "
+                "mint_block = excluded.mint_block",
+                event
+            )
+        else:
+            self.db.execute(
+                "INSERT INTO tokens (token_id, owner) VALUES (:token_id, :owner) "
+                "ON CONFLICT (token_id) DO UPDATE SET owner = excluded.owner",
+                event
+            )
+
+    def _check_reorg(self) -> None:
+        """Roll back to the newest checkpoint still on the canonical chain"""
+        with self._db_lock:
+            checkpoints = self.db.execute(
+                "SELECT block_number, block_hash FROM checkpoints ORDER BY block_number DESC"
+            ).fetchall()
+        if not checkpoints:
+            return
+
+        for checkpoint in checkpoints:
+            block = self.w3.eth.get_block(checkpoint['block_number'])
+            if _hex(block['hash']) == checkpoint['block_hash']:
+                if checkpoint is not checkpoints[0]:
+                    self._rollback(checkpoint['block_number'])
+                return
+
+        # Deeper than every checkpoint: start over
+        self._rollback(self.start_block - 1)
+
+    def _rollback(self, block_number: int) -> None:
+        """Discard everything indexed after block_number"""
+        self.reorg_count += 1
+        self.logger.warning(f"Chain reorganization detected, rolling back to block {block_number}")
+        with self._db_lock, self.db:
+            affected = [row['token_id'] for row in self.db.execute(
+                "SELECT DISTINCT token_id FROM events WHERE block_number > ?", (block_number,)
+            )]
+            self.db.execute("DELETE FROM events WHERE block_number > ?", (block_number,))
+            self.db.execute("DELETE FROM checkpoints WHERE block_number > ?", (block_number,))
+            self.db.execute(
+                "INSERT OR REPLACE INTO state VALUES ('indexed_block', ?)", (str(block_number),)
+            )
+
+            # Re-derive the affected tokens from the surviving events
+            for token_id in affected:
+                self.db.execute("DELETE FROM tokens WHERE token_id = ?", (token_id,))
+                for row in self.db.execute(
+                    "SELECT * FROM events WHERE token_id = ? ORDER BY block_number, log_index",
+                    (token_id,)
+                ).fetchall():
+                    self._apply(dict(row))
+
+    def get_tokens_by_owner(self, owner: str) -> List[Dict]:
+        """Tokens currently owned by an address, newest first"""
+        with self._db_lock:
+            rows = self.db.execute(
+                "SELECT * FROM tokens WHERE owner = ? ORDER BY token_id DESC",
+                (owner.lower(),)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_token(self, token_id: int) -> Optional[Dict]:
+        """Indexed details of a token"""
+        with self._db_lock:
+            row = self.db.execute("SELECT * FROM tokens WHERE token_id = ?", (token_id,)).fetchone()
+        return dict(row) if row else None
+
+    def get_token_by_cid(self, image_cid: str) -> Optional[Dict]:
+        """
+        Live token minted for an image CID, as getTokenIdByCID reports it.
+        mintPhoto rejects a CID that already has a live token; on deployments
+        that allowed duplicates, the earliest token not yet burned is returned.
+        """
+        with self._db_lock:
+            row = self.db.execute(
+                "SELECT * FROM tokens WHERE image_cid = ? AND owner != ? ORDER BY token_id LIMIT 1",
+                (image_cid, ZERO_ADDRESS)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def get_status(self) -> Dict:
+        """Get indexer progress"""
+        with self._db_lock:
+            token_count = self.db.execute("SELECT COUNT(*) FROM tokens").fetchone()[0]
+        return {
+            'is_running': self.is_running,
+            'indexed_block': self.indexed_block,
+            'token_count': token_count,
+            'reorg_count': self.reorg_count,
+            'last_error': self.last_error
+        }
+
+    def close(self) -> None:
+        """Stop indexing and close the database"""
+        self.stop()
+        with self._db_lock:
+            self.db.close()
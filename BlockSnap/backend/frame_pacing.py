@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class FramePacer:
+    """
+    Deadline-based frame scheduler.
+
+    Frame deadlines are laid out on a fixed monotonic grid of 1/fps intervals,
+    so time spent capturing and processing a frame is absorbed instead of
+    accumulating as drift. When the caller falls more than one interval behind,
+    the missed deadlines are skipped and counted as dropped frames. Each call
+    to wait() returns the slot number of the deadline it waited for; gaps
+    between consecutive slots are exactly the frames that were dropped.
+    """
+
+    def __init__(self,
+                 fps: float,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        if fps <= 0:
+            raise ValueError("fps must be positive")
+        self.fps = fps
+        self.interval = 1.0 / fps
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Restart the schedule at the next call to wait()"""
+        with self._lock:
+            self._deadline: Optional[float] = None
+            self._slot = -1
+            self._started_at: Optional[float] = None
+            self.frame_count = 0
+            self.dropped_frames = 0
+
+    def wait(self) -> int:
+        """Sleep until the next frame deadline and return its slot number"""
+        now = self._clock()
+        with self._lock:
+            if self._deadline is None:
+                self._deadline = now
+                self._started_at = now
+            else:
+                self._deadline += self.interval
+                # More than a whole interval late: skip the deadlines we missed
+                if now - self._deadline >= self.interval:
+                    missed = int((now - self._deadline) // self.interval)
+                    self._deadline += missed * self.interval
+                    self._slot += missed
+                    self.dropped_frames += missed
+            self._slot += 1
+            self.frame_count += 1
+            slot = self._slot
+            delay = self._deadline - now
+
+        if delay > 0:
+            self._sleep(delay)
+        return slot
+
+    def get_stats(self) -> Dict:
+        """Get pacing statistics since the last reset"""
+        with self._lock:
+            elapsed = (self._clock() - self._started_at) if self._started_at is not None else 0
+            return {
+                'target_fps': self.fps,
+                'frame_count': self.frame_count,
+                'dropped_frames': self.dropped_frames,
+                'effective_fps': self.frame_count / elapsed if elapsed > 0 else 0
+            }
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class FrameTimingStats:
+    """Frame timing measured over one chunk"""
+
+    def __init__(self, target_fps: float):
+        self.target_fps = target_fps
+        self.frame_count = 0
+        self.dropped_frames = 0
+        self._first_time: Optional[float] = None
+        self._last_time: Optional[float] = None
+        self._last_slot: Optional[int] = None
+        self._intervals: List[float] = []
+
+    def add_frame(self, slot: int, captured_at: float) -> None:
+        """
+        Record a frame
+        Args:
+            slot: Pacer slot number of the frame
+            captured_at: Monotonic capture time in seconds
+        """
+        if self._last_slot is not None:
+            self.dropped_frames += max(0, slot - self._last_slot - 1)
+            self._intervals.append(captured_at - self._last_time)
+        else:
+            self._first_time = captured_at
+        self._last_slot = slot
+        self._last_time = captured_at
+        self.frame_count += 1
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds between the first and the last frame"""
+        if self._first_time is None:
+            return 0.0
+        return self._last_time - self._first_time
+
+    def summary(self) -> Dict:
+        """Effective fps, drop count and jitter percentiles for the chunk"""
+        span = self.elapsed
+        effective_fps = (self.frame_count - 1) / span if span > 0 else float(self.target_fps)
+        target_interval = 1.0 / self.target_fps
+        jitter = sorted(abs(i - target_interval) * 1000 for i in self._intervals)
+        return {
+            'effective_fps': round(effective_fps, 3),
+            'target_fps': self.target_fps,
+            'dropped_frames': self.dropped_frames,
+            'duration': round(span + (1.0 / effective_fps if effective_fps > 0 else 0), 3),
+            'jitter_ms': {
+                'p50': round(_percentile(jitter, 50), 3),
+                'p95': round(_percentile(jitter, 95), 3),
+                'p99': round(_percentile(jitter, 99), 3),
+                'max': round(jitter[-1], 3) if jitter else 0.0
+            }
+        }
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+import logging
+import os
+import random
+import threading
+from typing import Dict, Optional
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Host roles with their own connection pools
+API = 'api'                        # Local IPFS (Kubo) RPC API
+GATEWAY = 'gateway'                # Local IPFS gateway
+PINATA = 'pinata'                  # Pinata pinning API
+PUBLIC_GATEWAY = 'public_gateway'  # Public fallback gateway (ipfs.io)
+RPC = 'rpc'                        # Ethereum JSON-RPC endpoint (batched calls)
+
+
+def default_role_config() -> Dict:
+    """
+    Per-role settings, with pool sizes read from the environment
+    Returns:
+        Dict of role: (pool size, (connect timeout, read timeout), retries)
+    """
+    return {
+        API: (int(os.getenv('IPFS_API_POOL_SIZE', 16)), (3.05, 120), 3),
+        GATEWAY: (int(os.getenv('IPFS_GATEWAY_POOL_SIZE', 16)), (3.05, 10), 1),
+        PINATA: (int(os.getenv('PINATA_POOL_SIZE', 8)), (5, 300), 3),
+        PUBLIC_GATEWAY: (int(os.getenv('PUBLIC_GATEWAY_POOL_SIZE', 8)), (5, 10), 0),
+        RPC: (int(os.getenv('RPC_POOL_SIZE', 8)), (3.05, 30), 2),
+    }
+
+
+class JitteredRetry(Retry):
+    """Retry policy with full-jitter exponential backoff"""
+
+    def get_backoff_time(self) -> float:
+        backoff = super().get_backoff_time()
+        return random.uniform(0, backoff) if backoff > 0 else 0
+
+
+class SessionPool:
+    """
+    Keep-alive HTTP sessions, one connection pool per host role.
+
+    Each role gets a requests.Session with its own pool size, default timeout
+    and retry policy. Connection errors are retried with jittered backoff for
+    every method; retries on 502/503/504 only apply to idempotent methods,
+    since streamed upload bodies cannot be replayed.
+    """
+
+    def __init__(self,
+                 role_config: Optional[Dict] = None,
+                 backoff_factor: float = 0.3):
+        self.logger = logging.getLogger(__name__)
+
+        # Pool sizes come from the environment, which .env may still need to populate
+        load_dotenv()
+        self.role_config = default_role_config()
+        self.role_config.update(role_config or {})
+        self.backoff_factor = backoff_factor
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def session(self, role: str) -> requests.Session:
+        """Get (or lazily create) the session for a host role"""
+        session = self._sessions.get(role)
+        if session is not None:
+            return session
+        with self._lock:
+            if role not in self._sessions:
+                self._sessions[role] = self._create_session(role)
+            return self._sessions[role]
+
+    def _create_session(self, role: str) -> requests.Session:
+        if role not in self.role_config:
+            raise ValueError(f"Unknown host role: {role}")
+        pool_size, _, retries = self.role_config[role]
+
+        retry = JitteredRetry(
+            total=retries,
+            connect=retries,
+            read=0,
+            status=retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=(502, 503, 504),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=retry,
+            pool_block=False
+        )
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        self.logger.debug(f"Created HTTP session for {role} (pool size {pool_size})")
+        return session
+
+    def request(self, role: str, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request through the role's session, applying its default timeout"""
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.role_config[role][1]
+        return self.session(role).request(method, url, **kwargs)
+
+    def get(self, role: str, url: str, **kwargs) -> requests.Response:
+        return self.request(role, 'GET', url, **kwargs)
+
+    def post(self, role: str, url: str, **kwargs) -> requests.Response:
+        return self.request(role, 'POST', url, **kwargs)
+
+    def head(self, role: str, url: str, **kwargs) -> requests.Response:
+        return self.request(role, 'HEAD', url, **kwargs)
+
+    def close(self) -> None:
+        """Close all pooled connections"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+_default_pool: Optional[SessionPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def get_session_pool() -> SessionPool:
+    """Process-wide session pool shared by all handlers"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = SessionPool()
+        return _default_pool
@@ -4,17 +4,68 @@ import os
 import logging
 import requests
 import json
-from typing import Dict, Tuple, Optional, List
+from typing import Dict, Tuple, Optional, List, Union, BinaryIO, Callable
 from datetime import datetime
 from dotenv import load_dotenv
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait, TimeoutError as FutureTimeoutError
+from contextlib import ExitStack
+import threading
 import time
+from .multipart import MultipartStream
+from .http_session import SessionPool, get_session_pool, API, GATEWAY, PINATA, PUBLIC_GATEWAY
+from .unixfs import UnixFSImporter, CIDIndex, cid_to_string, parse_chunker
+from .content_cache import ContentCache, TTLCache
+
+
+def clean_cid(cid: str) -> str:
+    """Strip ipfs:// and gateway URL prefixes, query strings and trailing slashes from a CID"""
+    if not cid:
+        return ""
+    
+    # Remove any protocol prefix
+    if cid.startswith('ipfs://'):
+        cid = cid[7:]
+    elif cid.startswith(('http://', 'https://')):
+        parts = cid.split('/ipfs/')
+        if len(parts) > 1:
+            cid = parts[-1]
+            
+    # Clean any query params or trailing chars
+    return cid.split('?')[0].rstrip('/')
+
+
+def photo_metadata(file_cid: str, image_url: str, metadata: Dict) -> Dict:
+    """NFT metadata for a captured photo"""
+    return {
+        'name': f'BlockSnap #{datetime.now().strftime("%Y%m%d%H%M%S")}',
+        'description': 'A photo captured and authenticated using BlockSnap',
+        'image': f'ipfs://{file_cid}',
+        'image_url': image_url,
+        'attributes': [
+            {
+                'trait_type': 'Platform',
+                'value': metadata.get('platform', 'Unknown')
+            },
+            {
+                'trait_type': 'Source',
+                'value': metadata.get('source', 'Unknown')
+            },
+            {
+                'trait_type': 'Timestamp',
+                'value': metadata.get('timestamp', datetime.now().isoformat())
+            }
+        ]
+    }
+
 
 class IPFSHandler:
-    def __init__(self):
+    def __init__(self, session_pool: Optional[SessionPool] = None):
         # Initialize logging
         self.logger = logging.getLogger(__name__)
         
+        # Pooled keep-alive sessions, shared process-wide by default
+        self.http = session_pool or get_session_pool()
+        
         # Load environment variables
         load_dotenv()
         self.ipfs_host = os.getenv('IPFS_HOST', 'http://127.0.0.1:5001')
@@ -23,9 +74,63 @@ class IPFSHandler:
         self.pinata_api_key = os.getenv('PINATA_API_KEY')
         self.pinata_secret_key = os.getenv('PINATA_SECRET_KEY')
         
+        # Options for /api/v0/add; the node pins on add, so no separate pin request is needed
+        self.cid_version = int(os.getenv('IPFS_CID_VERSION', 0))
+        self.raw_leaves = os.getenv('IPFS_RAW_LEAVES')  # Unset: node default for the CID version
+        self.chunker = os.getenv('IPFS_CHUNKER', 'size-262144')
+        
+        # Local CID computation, so known content is not uploaded twice
+        self.skip_known = os.getenv('IPFS_SKIP_KNOWN', 'true').lower() == 'true'
+        self.cid_index = CIDIndex(os.getenv('IPFS_CID_INDEX'))
+        try:
+            raw_leaves = None if self.raw_leaves is None else self.raw_leaves.lower() == 'true'
+            self.importer = UnixFSImporter(self.cid_version, raw_leaves, parse_chunker(self.chunker))
+        except ValueError as e:
+            self.logger.warning(f"Local CID computation disabled: {str(e)}")
+            self.importer = None
+        
+        # Content is immutable per CID, so reads are cached without expiry
+        self.content_cache = ContentCache(
+            cache_dir=os.getenv('IPFS_CACHE_DIR', 'ipfs_cache') or None,
+            memory_limit=int(os.getenv('IPFS_CACHE_MEMORY_MB', 32)) * 1024 * 1024,
+            disk_limit=int(os.getenv('IPFS_CACHE_DISK_MB', 512)) * 1024 * 1024,
+            compress=os.getenv('IPFS_CACHE_COMPRESS', 'true').lower() == 'true'
+        )
+        
+        # Gateways are probed concurrently by verify_content()
+        self.public_gateway = os.getenv('IPFS_PUBLIC_GATEWAY', 'https://ipfs.io')
+        self._probe_pool = ThreadPoolExecutor(
+            max_workers=int(os.getenv('IPFS_PROBE_WORKERS', 16)),
+            thread_name_prefix='ipfs-probe'
+        )
+        
+        # Availability of many CIDs is checked on a bounded pool; results are
+        # cached, misses for a shorter time since content may still be propagating
+        self._availability_pool = ThreadPoolExecutor(
+            max_workers=int(os.getenv('IPFS_AVAILABILITY_WORKERS', 8)),
+            thread_name_prefix='ipfs-availability'
+        )
+        self.availability_cache = TTLCache(
+            ttl=float(os.getenv('IPFS_AVAILABILITY_TTL', 300)),
+            negative_ttl=float(os.getenv('IPFS_UNAVAILABLE_TTL', 30))
+        )
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        
+        # Upload throughput statistics
+        self._stats_lock = threading.Lock()
+        self.upload_stats = {
+            'uploads': 0,
+            'bytes_sent': 0,
+            'upload_time': 0.0,
+            'last_throughput': 0.0,
+            'skipped_uploads': 0,
+            'bytes_skipped': 0
+        }
+        
         try:
             # Test connection to IPFS daemon
-            response = requests.post(f"{self.ipfs_host}/api/v0/version")
+            response = self.http.post(API, f"{self.ipfs_host}/api/v0/version")
             response.raise_for_status()
             self.logger.info(f"Connected to IPFS daemon at {self.ipfs_host}")
         except Exception as e:
@@ -33,58 +138,13 @@ class IPFSHandler:
             raise
 
     def add_file(self, file_path: str) -> str:
-        """Add a file to IPFS and return its CID"""
+        """Add a file (or a string of content) to IPFS and return its CID"""
         try:
-            if self.use_pinata:
-                # Use Pinata for file upload
-                if isinstance(file_path, str) and not os.path.isfile(file_path):
-                    files = {
-                        'file': ('content.txt', file_path.encode())
-                    }
-                else:
-                    files = {
-                        'file': ('file', open(file_path, 'rb'))
-                    }
-
-                headers = {
-                    'pinata_api_key': self.pinata_api_key,
-                    'pinata_secret_api_key': self.pinata_secret_key
-                }
-
-                response = requests.post(
-                    'https://api.pinata.cloud/pinning/pinFileToIPFS',
-                    files=files,
-                    headers=headers
-                )
-                response.raise_for_status()
-                
-                result = response.json()
-                cid = result['IpfsHash']
+            if isinstance(file_path, str) and not os.path.isfile(file_path):
+                cid = self.add_stream(file_path.encode(), 'content.txt')
             else:
-                # Use local IPFS node
-                if isinstance(file_path, str) and not os.path.isfile(file_path):
-                    files = {
-                        'file': ('content.txt', file_path.encode())
-                    }
-                else:
-                    files = {
-                        'file': ('file', open(file_path, 'rb'))
-                    }
-                
-                response = requests.post(
-                    f"{self.ipfs_host}/api/v0/add",
-                    files=files
-                )
-                response.raise_for_status()
-                
-                result = response.json()
-                cid = result['Hash']
-                
-                # Pin the file locally
-                self.pin_file(cid)
-            
-            if isinstance(file_path, str) and os.path.isfile(file_path):
-                files['file'][1].close()
+                with open(file_path, 'rb') as f:
+                    cid = self.add_stream(f, 'file')
             
             self.logger.info(f"Added file to IPFS with CID: {cid}")
             return cid
@@ -92,10 +152,188 @@ class IPFSHandler:
             self.logger.error(f"Error adding file to IPFS: {str(e)}")
             raise
 
+    def add_stream(self,
+                   source: Union[bytes, memoryview, BinaryIO],
+                   filename: str = 'file',
+                   progress: Optional[Callable[[int, Optional[int]], None]] = None,
+                   chunked: Optional[bool] = None,
+                   pin: bool = True,
+                   replay: bool = False) -> str:
+        """
+        Stream content to IPFS (local node or Pinata) and return its CID
+        Args:
+            source: Bytes, memoryview or an open binary file
+            filename: Name of the uploaded file part
+            progress: Optional callback, called as progress(bytes_sent, total_bytes)
+            chunked: Use chunked transfer encoding. Defaults to chunked for the
+                local node and Content-Length for Pinata; unsized sources are
+                always sent chunked
+            pin: Pin on the local node as part of the add request
+                (Pinata always pins uploads)
+            replay: The content may have been uploaded before (a retry or a
+                recovery), so ask the node whether it is already pinned
+        Returns:
+            CID of the uploaded content
+        """
+        node = self._file_node(source) if pin else None
+        if node is not None:
+            expected_cid = cid_to_string(node.cid)
+            if self.skip_known and self._is_known([expected_cid], replay):
+                self.logger.info(f"Content already on IPFS, skipping upload: {expected_cid}")
+                self._record_skip(node.filesize)
+                return expected_cid
+        
+        body = MultipartStream([('file', filename, source)], progress=progress)
+        
+        if self.use_pinata:
+            url = 'https://api.pinata.cloud/pinning/pinFileToIPFS'
+            params = None
+            headers = {
+                'pinata_api_key': self.pinata_api_key,
+                'pinata_secret_api_key': self.pinata_secret_key
+            }
+        else:
+            url = f"{self.ipfs_host}/api/v0/add"
+            params = self._add_params(pin)
+            headers = {}
+        headers['Content-Type'] = body.content_type
+        
+        if chunked is None:
+            chunked = not self.use_pinata
+        if body.length is None:
+            chunked = True
+        
+        response = self.http.post(
+            PINATA if self.use_pinata else API,
+            url,
+            params=params,
+            data=iter(body) if chunked else body,
+            headers=headers
+        )
+        response.raise_for_status()
+        self._record_upload(body)
+        
+        result = response.json()
+        cid = result.get('IpfsHash') or result.get('Hash')
+        
+        if node is not None:
+            self._check_cid(filename, expected_cid, cid)
+            self.cid_index.set(cid, CIDIndex.PINNED)
+        
+        return cid
+
+    def _add_params(self, pin: bool = True) -> Dict:
+        """Query parameters for /api/v0/add"""
+        params = {
+            'pin': 'true' if pin else 'false',
+            'cid-version': self.cid_version,
+            'chunker': self.chunker
+        }
+        if self.raw_leaves is not None:
+            params['raw-leaves'] = self.raw_leaves.lower()
+        return params
+
+    def compute_cid(self, source: Union[bytes, memoryview, BinaryIO]) -> Optional[str]:
+        """
+        Compute the CID the local node would return for some content, without
+        uploading it. File sources are read and rewound to their position.
+        Returns None when the CID cannot be computed locally (non-fixed-size
+        chunker, or a source that cannot be rewound)
+        """
+        node = self._file_node(source)
+        return cid_to_string(node.cid) if node is not None else None
+
+    def verify_cid(self, source: Union[bytes, memoryview, BinaryIO], cid: str) -> bool:
+        """Check that content matches a CID without a network call"""
+        return self.compute_cid(source) == self._clean_cid(cid)
+
+    def _file_node(self, source):
+        """DAG root node for a source, or None if it cannot be computed here"""
+        # Pinata picks its own import settings, so only local node CIDs are predictable
+        if self.importer is None or self.use_pinata:
+            return None
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return self.importer.file_node(source)
+        try:
+            position = source.tell()
+            node = self.importer.file_node(source)
+            source.seek(position)
+            return node
+        except (AttributeError, OSError, ValueError) as e:
+            self.logger.debug(f"Cannot compute CID for unseekable source: {str(e)}")
+            return None
+
+    def _check_cid(self, name: str, expected: str, actual: str) -> None:
+        """Warn when the node returned a different CID than the local computation"""
+        if actual != expected:
+            self.logger.warning(
+                f"CID mismatch for {name}: computed {expected}, node returned {actual}"
+            )
+
+    def _is_known(self, cids: List[str], replay: bool) -> bool:
+        """
+        Whether all CIDs are already pinned. First uploads only consult the
+        local CID index; the node is asked only when replaying an upload
+        """
+        if all(self.cid_index.get(cid) == CIDIndex.PINNED for cid in cids):
+            return True
+        return replay and all(self.has_content(cid) for cid in cids)
+
+    def has_content(self, cid: str) -> bool:
+        """
+        Check whether content is pinned on the local node, consulting the
+        local CID index before asking the node
+        """
+        if self.cid_index.get(cid) == CIDIndex.PINNED:
+            return True
+        if self.use_pinata:
+            return False
+        try:
+            response = self.http.post(
+                API,
+                f"{self.ipfs_host}/api/v0/pin/ls",
+                params={'arg': cid, 'type': 'recursive'}
+            )
+            # Uploads are pinned recursively; listing only those pins avoids
+            # walking every pinned DAG for indirect pins. The node answers 500
+            # when the CID is not pinned
+            if response.status_code != 200 or cid not in response.json().get('Keys', {}):
+                return False
+            self.cid_index.set(cid, CIDIndex.PINNED)
+            return True
+        except Exception as e:
+            self.logger.warning(f"Failed to check pin status of {cid}: {str(e)}")
+            return False
+
+    def _record_skip(self, size: int) -> None:
+        """Count an upload avoided because the content was already present"""
+        with self._stats_lock:
+            self.upload_stats['skipped_uploads'] += 1
+            self.upload_stats['bytes_skipped'] += size
+
+    def _record_upload(self, body: MultipartStream) -> None:
+        """Update upload throughput statistics"""
+        with self._stats_lock:
+            self.upload_stats['uploads'] += 1
+            self.upload_stats['bytes_sent'] += body.bytes_sent
+            self.upload_stats['upload_time'] += body.elapsed
+            self.upload_stats['last_throughput'] = body.throughput
+
+    def get_upload_stats(self) -> Dict:
+        """Get upload throughput statistics (bytes and bytes per second)"""
+        with self._stats_lock:
+            stats = dict(self.upload_stats)
+        stats['average_throughput'] = (
+            stats['bytes_sent'] / stats['upload_time']
+            if stats['upload_time'] > 0 else 0
+        )
+        return stats
+
     def pin_file(self, cid: str) -> None:
         """Pin a file on IPFS"""
         try:
-            response = requests.post(
+            response = self.http.post(
+                API,
                 f"{self.ipfs_host}/api/v0/pin/add",
                 params={'arg': cid}
             )
@@ -105,69 +343,214 @@ class IPFSHandler:
             self.logger.error(f"Error pinning file: {str(e)}")
             raise
 
-    def add_binary_data(self, data: bytes, filename: str = None) -> str:
-        """Add binary data to IPFS and return its CID"""
+    def pin_many(self, cids: List[str]) -> List[str]:
+        """
+        Pin several CIDs at once, e.g. when recovering content added elsewhere
+        Args:
+            cids: CIDs to pin recursively
+        Returns:
+            CIDs reported as pinned
+        """
+        cids = [self._clean_cid(cid) for cid in cids if cid]
+        if not cids:
+            return []
         try:
             if self.use_pinata:
-                headers = {
-                    'pinata_api_key': self.pinata_api_key,
-                    'pinata_secret_api_key': self.pinata_secret_key
-                }
-                files = {'file': (filename or 'chunk.mp4', data)}
-                response = requests.post(
-                    'https://api.pinata.cloud/pinning/pinFileToIPFS',
-                    files=files,
-                    headers=headers
-                )
-            else:
-                files = {'file': (filename or 'chunk.mp4', data)}
-                response = requests.post(
-                    f"{self.ipfs_host}/api/v0/add",
-                    files=files
-                )
+                # Pinata has no bulk endpoint
+                for cid in cids:
+                    self._pin_to_pinata(cid)
+                return cids
             
+            # A single pin/add request takes any number of arguments
+            response = self.http.post(
+                API,
+                f"{self.ipfs_host}/api/v0/pin/add",
+                params=[('arg', cid) for cid in cids]
+            )
             response.raise_for_status()
-            result = response.json()
-            cid = result.get('IpfsHash') or result.get('Hash')
-            
-            if not self.use_pinata:
-                self.pin_file(cid)
-            
-            return cid
+            pinned = response.json().get('Pins', [])
+            self.logger.info(f"Pinned {len(pinned)} CIDs")
+            return pinned
+        except Exception as e:
+            self.logger.error(f"Error pinning CIDs: {str(e)}")
+            raise
+
+    def add_binary_data(self, data: Union[bytes, memoryview, BinaryIO], filename: str = None) -> str:
+        """Add binary data (bytes, memoryview or an open binary file) to IPFS and return its CID"""
+        try:
+            return self.add_stream(data, filename or 'chunk.mp4')
         except Exception as e:
             self.logger.error(f"Error adding binary data to IPFS: {str(e)}")
             raise
 
+    def add_files(self,
+                  files: List[Tuple[str, Union[bytes, memoryview, BinaryIO]]],
+                  wrap_with_directory: bool = True,
+                  progress: Optional[Callable[[int, Optional[int]], None]] = None,
+                  replay: bool = False,
+                  nodes: Optional[Dict] = None) -> Dict:
+        """
+        Add several files to the local node in one multipart request
+        Args:
+            files: (filename, source) pairs; filenames must be unique
+            wrap_with_directory: Also create a directory node holding all files
+            progress: Optional callback, called as progress(bytes_sent, total_bytes)
+            replay: Ask the node whether the files are already pinned (see add_stream)
+            nodes: DAG nodes already computed for some files, by filename, so
+                that their content is not hashed again
+        Returns:
+            Dict with per-file CIDs under 'files' and the 'directory_cid'
+            (None when not wrapped)
+        """
+        if self.use_pinata:
+            # Pinata only returns the root CID of a multi-file upload, so
+            # upload files one by one to keep per-file CIDs
+            return {
+                'files': {name: self.add_stream(source, name, replay=replay) for name, source in files},
+                'directory_cid': None
+            }
+        
+        known_nodes = nodes or {}
+        nodes = {
+            name: known_nodes[name] if name in known_nodes else self._file_node(source)
+            for name, source in files
+        }
+        if all(node is not None for node in nodes.values()):
+            expected = {name: cid_to_string(node.cid) for name, node in nodes.items()}
+            directory_cid = None
+            if wrap_with_directory:
+                directory_cid = cid_to_string(
+                    self.importer.directory_node(list(nodes.items())).cid
+                )
+            # A pinned directory implies its files are pinned too
+            known = [directory_cid] if wrap_with_directory else list(expected.values())
+            if self.skip_known and self._is_known(known, replay):
+                self.logger.info(f"Content already on IPFS, skipping upload of {len(files)} files")
+                self._record_skip(sum(node.filesize for node in nodes.values()))
+                return {'files': expected, 'directory_cid': directory_cid}
+        else:
+            expected = None
+        
+        body = MultipartStream(
+            [('file', name, source) for name, source in files],
+            progress=progress
+        )
+        params = self._add_params()
+        params['wrap-with-directory'] = 'true' if wrap_with_directory else 'false'
+        
+        response = self.http.post(
+            API,
+            f"{self.ipfs_host}/api/v0/add",
+            params=params,
+            data=iter(body),
+            headers={'Content-Type': body.content_type}
+        )
+        response.raise_for_status()
+        self._record_upload(body)
+        
+        # The node streams one JSON object per added entry; the wrapping
+        # directory is reported last with an empty name
+        file_cids = {}
+        directory_cid = None
+        for line in response.text.splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if entry.get('Name'):
+                file_cids[entry['Name']] = entry['Hash']
+            elif wrap_with_directory:
+                directory_cid = entry['Hash']
+        
+        missing = [name for name, _ in files if name not in file_cids]
+        if missing:
+            raise ValueError(f"IPFS add response is missing files: {missing}")
+        
+        if expected is not None:
+            for name, cid in file_cids.items():
+                self._check_cid(name, expected[name], cid)
+        for cid in [directory_cid, *file_cids.values()]:
+            if cid:
+                self.cid_index.set(cid, CIDIndex.PINNED)
+        
+        return {'files': file_cids, 'directory_cid': directory_cid}
+
     def add_video_chunk(self, chunk) -> Dict:
         """
         Add a video chunk to IPFS
         Returns: Dict with CID and metadata
         """
+        return self.add_video_chunks([chunk])[0]
+
+    def add_video_chunks(self, chunks: List, replay: bool = False) -> List[Dict]:
+        """
+        Add video chunks and their metadata to IPFS in a single request
+        Args:
+            chunks: List of VideoChunk objects
+            replay: The chunks may have been uploaded before (see add_stream);
+                implied for chunks re-queued by session recovery
+        Returns:
+            One dict per chunk with its video and metadata CIDs and the CID of
+            the directory holding the whole batch
+        """
         try:
-            # Upload video data
-            cid = self.add_binary_data(
-                chunk.data,
-                f"chunk_{chunk.sequence_number}.mp4"
-            )
+            with ExitStack() as stack:
+                files = []
+                names = []
+                nodes = {}
+                uploaded = {}
+                for chunk in chunks:
+                    video_name = self._chunk_filename(chunk)
+                    metadata_name = f"chunk_{chunk.sequence_number}_metadata.json"
+                    metadata = chunk.get_metadata()
+                    replay = replay or bool(metadata.get('recovery'))
+                    
+                    video = stack.enter_context(chunk.open())
+                    node = self._file_node(video)
+                    if node is None:
+                        # The CID cannot be predicted (Pinata, or a chunker other
+                        # than size-N), so upload the video first to learn it
+                        video_cid = self.add_stream(video, video_name, replay=replay)
+                        uploaded[video_name] = video_cid
+                    else:
+                        # The video also sits next to the metadata in the batch
+                        # directory; add_files reuses its node instead of hashing it again
+                        video_cid = cid_to_string(node.cid)
+                        metadata['video_path'] = video_name
+                        files.append((video_name, video))
+                        nodes[video_name] = node
+                    metadata['ipfs_cid'] = video_cid
+                    
+                    files.append((metadata_name, json.dumps(metadata).encode()))
+                    names.append((video_name, metadata_name))
+                
+                upload = self.add_files(files, replay=replay, nodes=nodes)
             
-            # Create and upload metadata
-            metadata = chunk.get_metadata()
-            metadata['ipfs_cid'] = cid
-            metadata_cid = self.add_binary_data(
-                json.dumps(metadata).encode(),
-                f"chunk_{chunk.sequence_number}_meta.json"
-            )
+            # A directory that is missing some videos does not cover the batch
+            directory_cid = None if uploaded else upload['directory_cid']
+            file_cids = dict(upload['files'], **uploaded)
+            results = []
+            for chunk, (video_name, metadata_name) in zip(chunks, names):
+                results.append({
+                    'video_cid': file_cids[video_name],
+                    'metadata_cid': file_cids[metadata_name],
+                    'directory_cid': directory_cid,
+                    'sequence_number': chunk.sequence_number,
+                    'timestamp': chunk.timestamp.isoformat()
+                })
             
-            return {
-                'video_cid': cid,
-                'metadata_cid': metadata_cid,
-                'sequence_number': chunk.sequence_number,
-                'timestamp': chunk.timestamp.isoformat()
-            }
+            self.logger.info(f"Added {len(chunks)} video chunks to IPFS (directory {directory_cid})")
+            return results
         except Exception as e:
-            self.logger.error(f"Error processing video chunk: {str(e)}")
+            self.logger.error(f"Error processing video chunks: {str(e)}")
             raise
 
+    def _chunk_filename(self, chunk) -> str:
+        """Filename for a chunk's video inside a batch directory"""
+        suffix = '.mp4'
+        if getattr(chunk, 'path', None) is not None and chunk.path.suffix:
+            suffix = chunk.path.suffix
+        return f"chunk_{chunk.sequence_number}{suffix}"
+
     def batch_upload_chunks(self, chunks: List, batch_size: int = 5) -> List:
         """
         Efficiently upload multiple chunks in batches
@@ -222,7 +605,7 @@ class IPFSHandler:
     def get_chunk_status(self, cid: str) -> bool:
         """Check if a chunk is available on IPFS"""
         try:
-            response = requests.head(f"{self.ipfs_gateway}/ipfs/{cid}")
+            response = self.http.head(GATEWAY, f"{self.ipfs_gateway}/ipfs/{cid}")
             return response.status_code == 200
         except Exception:
             return False
@@ -238,36 +621,12 @@ class IPFSHandler:
             self.logger.info(f"File uploaded to IPFS with CID: {file_cid}")
             
             # Create metadata with proper NFT format
-            full_metadata = {
-                'name': f'BlockSnap #{datetime.now().strftime("%Y%m%d%H%M%S")}',
-                'description': 'A photo captured and authenticated using BlockSnap',
-                'image': f'ipfs://{file_cid}',
-                'image_url': self.get_ipfs_url(file_cid),
-                'attributes': [
-                    {
-                        'trait_type': 'Platform',
-                        'value': metadata.get('platform', 'Unknown')
-                    },
-                    {
-                        'trait_type': 'Source',
-                        'value': metadata.get('source', 'Unknown')
-                    },
-                    {
-                        'trait_type': 'Timestamp',
-                        'value': metadata.get('timestamp', datetime.now().isoformat())
-                    }
-                ]
-            }
+            full_metadata = photo_metadata(file_cid, self.get_ipfs_url(file_cid), metadata)
             
-            # Upload metadata
+            # Upload metadata (pinFileToIPFS and the local add both pin, so no follow-up pin requests)
             metadata_cid = self.add_file(json.dumps(full_metadata))
             self.logger.info(f"Metadata uploaded to IPFS with CID: {metadata_cid}")
             
-            # Pin to Pinata if configured
-            if self.use_pinata:
-                self._pin_to_pinata(file_cid)
-                self._pin_to_pinata(metadata_cid)
-            
             return file_cid, metadata_cid
             
         except Exception as e:
@@ -277,20 +636,7 @@ class IPFSHandler:
     def _clean_cid(self, cid: str) -> str:
         """Clean and normalize IPFS CID"""
         try:
-            if not cid:
-                return ""
-                
-            # Remove any protocol prefix
-            if cid.startswith('ipfs://'):
-                cid = cid[7:]
-            elif cid.startswith(('http://', 'https://')):
-                parts = cid.split('/ipfs/')
-                if len(parts) > 1:
-                    cid = parts[-1]
-                    
-            # Clean any query params or trailing chars
-            cid = cid.split('?')[0].rstrip('/')
-            return cid
+            return clean_cid(cid)
         except Exception as e:
             self.logger.error(f"Error cleaning CID {cid}: {str(e)}")
             return cid
@@ -306,78 +652,147 @@ class IPFSHandler:
             self.logger.error(f"Error generating IPFS URL for {cid}: {str(e)}")
             return f"{self.ipfs_gateway}/ipfs/{cid}"
 
+    def cat(self, cid: str, timeout: int = 5) -> bytes:
+        """
+        Get content from IPFS by CID (or CID path), served from the local
+        content cache when possible
+        """
+        clean_cid = self._clean_cid(cid)
+        if not clean_cid:
+            raise ValueError(f"Invalid CID: {cid}")
+        
+        data = self.content_cache.get(clean_cid)
+        if data is not None:
+            return data
+        
+        # Try gateway first
+        try:
+            gateway_url = f"{self.ipfs_gateway}/ipfs/{clean_cid}"
+            response = self.http.get(GATEWAY, gateway_url, timeout=timeout)
+            response.raise_for_status()
+            data = response.content
+        except Exception as e:
+            self.logger.warning(f"Failed to get {clean_cid} from gateway: {str(e)}")
+            
+            # Fallback to local node
+            api_url = f"{self.ipfs_host}/api/v0/cat"
+            response = self.http.post(API, api_url, params={'arg': clean_cid}, timeout=timeout)
+            response.raise_for_status()
+            data = response.content
+        
+        self.content_cache.put(clean_cid, data)
+        return data
+
     def get_json(self, cid: str) -> dict:
         """Get JSON content from IPFS by CID"""
         try:
-            clean_cid = self._clean_cid(cid)
-            if not clean_cid:
+            if not self._clean_cid(cid):
                 return {}
-                
-            # Try gateway first
-            try:
-                gateway_url = f"{self.ipfs_gateway}/ipfs/{clean_cid}"
-                response = requests.get(gateway_url, timeout=5)
-                response.raise_for_status()
-                return response.json()
-            except Exception as e:
-                self.logger.warning(f"Failed to get JSON from gateway: {str(e)}")
-                
-            # Fallback to local node
-            try:
-                api_url = f"{self.ipfs_host}/api/v0/cat"
-                params = {'arg': clean_cid}
-                response = requests.post(api_url, params=params, timeout=5)
-                response.raise_for_status()
-                return json.loads(response.text)
-            except Exception as e:
-                self.logger.error(f"Failed to get JSON from IPFS: {str(e)}")
-                return {}
-                
+            return json.loads(self.cat(cid))
         except Exception as e:
             self.logger.error(f"Error in get_json for {cid}: {str(e)}")
             return {}
 
-    def verify_content(self, cid: str, timeout: int = 5) -> bool:
+    def get_cache_stats(self) -> Dict:
+        """Get content and availability cache hit/miss statistics"""
+        return dict(self.content_cache.get_stats(), availability=self.availability_cache.get_stats())
+
+    def verify_content(self, cid: str, timeout: int = 5, use_cache: bool = True, public: bool = True) -> bool:
         """
         Verify if content exists in IPFS with timeout
         Args:
             cid: Content ID to verify
             timeout: Timeout in seconds
+            use_cache: Accept content already read through this handler
+                without a request; False always asks the gateways
+            public: Also race the public gateway; False only asks the local
+                gateway, e.g. for content this node has just added
         Returns:
             bool: True if content exists and is accessible
         """
         try:
             if not cid:
                 return False
-                
-            # Try local node first with timeout
-            try:
-                response = requests.head(
-                    f"{self.ipfs_gateway}/ipfs/{cid}",
-                    timeout=timeout,
-                    allow_redirects=True
-                )
-                if response.status_code == 200:
-                    return True
-            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
-                self.logger.warning(f"Local IPFS gateway timeout for {cid}")
-                
-            # Fallback to public gateway with shorter timeout
+            
+            # Content read through this handler was served by a gateway already.
+            # The CID index only records what this handler added, not what is retrievable.
+            if use_cache and self._clean_cid(cid) in self.content_cache:
+                return True
+            
+            if not public:
+                return self._probe_gateway(GATEWAY, self.ipfs_gateway, cid, timeout)
+            
+            # Race the local and public gateways; the first positive answer wins
+            probes = [
+                self._probe_pool.submit(self._probe_gateway, GATEWAY, self.ipfs_gateway, cid, timeout),
+                self._probe_pool.submit(self._probe_gateway, PUBLIC_GATEWAY, self.public_gateway, cid, timeout)
+            ]
             try:
-                response = requests.head(
-                    f"https://ipfs.io/ipfs/{cid}",
-                    timeout=timeout/2,  # Shorter timeout for fallback
-                    allow_redirects=True
-                )
-                return response.status_code == 200
-            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
-                self.logger.warning(f"Public IPFS gateway timeout for {cid}")
-                return False
+                for probe in as_completed(probes, timeout=timeout):
+                    if probe.result():
+                        return True
+            except FutureTimeoutError:
+                self.logger.warning(f"IPFS gateways timed out for {cid}")
+            return False
                 
         except Exception as e:
             self.logger.error(f"Error verifying IPFS content {cid}: {str(e)}")
             return False
 
+    def check_availability(self, cids: List[str], deadline: float = 10.0) -> Dict[str, Optional[bool]]:
+        """
+        Check whether many CIDs are available, concurrently
+        Args:
+            cids: Content IDs to check
+            deadline: Seconds to wait for all checks together
+        Returns:
+            Dict of CID to True/False, or None for checks still running at the
+            deadline; those finish in the background and are cached for later calls
+        """
+        results = {}
+        futures = {}
+        for cid in set(cids):
+            cached = self.availability_cache.get(cid)
+            if cached is not None:
+                results[cid] = cached
+            elif cid:
+                futures[cid] = self._availability_future(cid)
+            else:
+                results[cid] = False
+        
+        if futures:
+            wait(futures.values(), timeout=deadline)
+        for cid, future in futures.items():
+            results[cid] = future.result() if future.done() else None
+        return results
+
+    def _availability_future(self, cid: str) -> Future:
+        """Running check for a CID, shared by concurrent callers"""
+        with self._inflight_lock:
+            future = self._inflight.get(cid)
+            if future is None:
+                future = self._availability_pool.submit(self._check_availability, cid)
+                self._inflight[cid] = future
+            return future
+
+    def _check_availability(self, cid: str) -> bool:
+        try:
+            available = self.verify_content(cid)
+            self.availability_cache.put(cid, available, negative=not available)
+            return available
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(cid, None)
+
+    def _probe_gateway(self, role: str, gateway: str, cid: str, timeout: float) -> bool:
+        """HEAD a CID on one gateway"""
+        try:
+            response = self.http.head(role, f"{gateway}/ipfs/{cid}", timeout=timeout, allow_redirects=True)
+            return response.status_code == 200
+        except requests.exceptions.RequestException as e:
+            self.logger.warning(f"IPFS gateway {gateway} failed for {cid}: {str(e)}")
+            return False
+
     def _pin_to_pinata(self, cid: str) -> None:
         """Pin a file to Pinata"""
         try:
@@ -386,7 +801,8 @@ class IPFSHandler:
                 'pinata_secret_api_key': self.pinata_secret_key
             }
 
-            response = requests.post(
+            response = self.http.post(
+                PINATA,
                 'https://api.pinata.cloud/pinning/pinByHash',
                 json={'hashToPin': cid},
                 headers=headers
@@ -397,47 +813,10 @@ class IPFSHandler:
             self.logger.error(f"Error pinning to Pinata: {str(e)}")
             raise
 
-    def add_bytes(self, data: bytes, filename: str = None) -> str:
-        """Add bytes data to IPFS and return its CID"""
+    def add_bytes(self, data: Union[bytes, memoryview, BinaryIO], filename: str = None) -> str:
+        """Add bytes data (bytes, memoryview or an open binary file) to IPFS and return its CID"""
         try:
-            if self.use_pinata:
-                # Use Pinata for file upload
-                files = {
-                    'file': (filename or 'content.bin', data)
-                }
-                
-                headers = {
-                    'pinata_api_key': self.pinata_api_key,
-                    'pinata_secret_api_key': self.pinata_secret_key
-                }
-                
-                response = requests.post(
-                    'https://api.pinata.cloud/pinning/pinFileToIPFS',
-                    files=files,
-                    headers=headers
-                )
-                response.raise_for_status()
-                
-                result = response.json()
-                cid = result['IpfsHash']
-            else:
-                # Use local IPFS node
-                files = {
-                    'file': (filename or 'content.bin', data)
-                }
-                
-                response = requests.post(
-                    f"{self.ipfs_host}/api/v0/add",
-                    files=files
-                )
-                response.raise_for_status()
-                
-                result = response.json()
-                cid = result['Hash']
-                
-                # Pin the file locally
-                self.pin_file(cid)
-            
+            cid = self.add_stream(data, filename or 'content.bin')
             self.logger.info(f"Added bytes to IPFS with CID: {cid}")
             return cid
             
@@ -445,6 +824,13 @@ class IPFSHandler:
             self.logger.error(f"Error adding bytes to IPFS: {str(e)}")
             raise
 
+    def cleanup(self) -> None:
+        """Stop background checks"""
+        self._availability_pool.shutdown(wait=False)
+        self._probe_pool.shutdown(wait=False)
+        # The session pool is left open: it was injected by the caller or is
+        # the process-wide pool other handlers share
+
 if __name__ == "__main__":
     # Example usage
     handler = IPFSHandler()
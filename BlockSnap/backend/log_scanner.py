@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Tuple
+
+# Error fragments RPC providers use when a get_logs request is too large
+TOO_MANY_RESULTS = (
+    'too many',
+    'more than',
+    'limit exceeded',
+    'response size exceeded',
+    'block range',
+    'range is too large',
+    'query timeout',
+    '-32005'
+)
+
+
+def is_too_many_results(error: Exception) -> bool:
+    """Whether a get_logs error means the block range should be split"""
+    message = str(error).lower()
+    return any(fragment in message for fragment in TOO_MANY_RESULTS)
+
+
+class LogScanner:
+    """
+    get_logs over arbitrary block ranges.
+
+    Ranges are split into windows that are fetched concurrently and yielded
+    in block order. A window rejected for returning too many results is
+    halved and retried, and later windows start at the reduced size; after a
+    run of successful windows the size grows again, up to max_window.
+    """
+
+    def __init__(self,
+                 w3,
+                 max_window: int = 5000,
+                 min_window: int = 1,
+                 max_workers: int = 4,
+                 grow_after: int = 4):
+        """
+        Args:
+            w3: Web3 instance
+            max_window: Largest number of blocks per request
+            min_window: Smallest window before giving up on splitting
+            max_workers: Concurrent get_logs requests
+            grow_after: Successful windows before the window size is doubled
+        """
+        self.logger = logging.getLogger(__name__)
+        self.w3 = w3
+        self.max_window = max_window
+        self.min_window = min_window
+        self.max_workers = max_workers
+        self.grow_after = grow_after
+
+        self.window = max_window
+        self._successes = 0
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'requests': 0,
+            'splits': 0,
+            'logs': 0
+        }
+
+    def scan_windows(self,
+                     params: Dict,
+                     from_block: int,
+                     to_block) -> Iterator[Tuple[int, int, List]]:
+        """
+        Fetch logs window by window
+        Args:
+            params: get_logs filter without fromBlock/toBlock (address, topics)
+            from_block: First block
+            to_block: Last block (inclusive), or 'latest'
+        Yields:
+            (window start, window end, logs) in block order
+        """
+        if to_block == 'latest':
+            to_block = self.w3.eth.block_number
+        if from_block > to_block:
+            return
+
+        pending = deque()
+        next_block = from_block
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            try:
+                while pending or next_block <= to_block:
+                    # Keep every worker busy with the next windows in order
+                    while next_block <= to_block and len(pending) < self.max_workers:
+                        end = min(to_block, next_block + self.window - 1)
+                        pending.append((next_block, end,
+                                        executor.submit(self._fetch, params, next_block, end)))
+                        next_block = end + 1
+
+                    start, end, future = pending.popleft()
+                    yield start, end, future.result()
+            finally:
+                for _, _, future in pending:
+                    future.cancel()
+
+    def scan(self, params: Dict, from_block: int, to_block='latest') -> Iterator:
+        """Yield the logs of a block range one by one, in block order"""
+        for _, _, logs in self.scan_windows(params, from_block, to_block):
+            yield from logs
+
+    def get_logs(self, params: Dict, from_block: int, to_block='latest') -> List:
+        """Fetch all logs of a block range"""
+        return list(self.scan(params, from_block, to_block))
+
+    def _fetch(self, params: Dict, start: int, end: int) -> List:
+        """Fetch one window, halving it while the provider rejects it"""
+        request = dict(params, fromBlock=start, toBlock=end)
+        try:
+            with self._lock:
+                self.stats['requests'] += 1
+            logs = self.w3.eth.get_logs(request)
+        except Exception as e:
+            size = end - start + 1
+            if not is_too_many_results(e) or size <= self.min_window:
+                raise
+            half = size // 2
+            self._shrink(half)
+            self.logger.debug(f"Splitting log window {start}-{end}: {str(e)}")
+            return (self._fetch(params, start, start + half - 1)
+                    + self._fetch(params, start + half, end))
+
+        self._grow()
+        with self._lock:
+            self.stats['logs'] += len(logs)
+        return list(logs)
+
+    def _shrink(self, size: int) -> None:
+        with self._lock:
+            self.stats['splits'] += 1
+            self._successes = 0
+            self.window = max(self.min_window, min(self.window, size))
+
+    def _grow(self) -> None:
+        with self._lock:
+            self._successes += 1
+            if self._successes >= self.grow_after and self.window < self.max_window:
+                self.window = min(self.max_window, self.window * 2)
+                self._successes = 0
+
+    def get_stats(self) -> Dict:
+        """Get request and split counts and the current window size"""
+        with self._lock:
+            return dict(self.stats, window=self.window)
+
+
+class AsyncLogScanner(LogScanner):
+    """
+    LogScanner for AsyncWeb3.
+
+    Windows are fetched as concurrent tasks, at most max_workers at a time,
+    with the same splitting and window sizing as LogScanner. Only get_logs()
+    is available.
+    """
+
+    async def get_logs(self, params: Dict, from_block: int, to_block='latest') -> List:
+        """Fetch all logs of a block range, in block order"""
+        if to_block == 'latest':
+            to_block = await self.w3.eth.block_number
+        if from_block > to_block:
+            return []
+
+        windows = []
+        running = set()
+        next_block = from_block
+        try:
+            while running or next_block <= to_block:
+                while next_block <= to_block and len(running) < self.max_workers:
+                    end = min(to_block, next_block + self.window - 1)
+                    task = asyncio.ensure_future(self._fetch_async(params, next_block, end))
+                    windows.append(task)
+                    running.add(task)
+                    next_block = end + 1
+
+                done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+        finally:
+            for task in running:
+                task.cancel()
+        return [log for task in windows for log in task.result()]
+
+    async def _fetch_async(self, params: Dict, start: int, end: int) -> List:
+        """Fetch one window, halving it while the provider rejects it"""
+        request = dict(params, fromBlock=start, toBlock=end)
+        try:
+            with self._lock:
+                self.stats['requests'] += 1
+            logs = await self.w3.eth.get_logs(request)
+        except Exception as e:
+            size = end - start + 1
+            if not is_too_many_results(e) or size <= self.min_window:
+                raise
+            half = size // 2
+            self._shrink(half)
+            self.logger.debug(f"Splitting log window {start}-{end}: {str(e)}")
+            return (await self._fetch_async(params, start, start + half - 1)
+                    + await self._fetch_async(params, start + half, end))
+
+        self._grow()
+        with self._lock:
+            self.stats['logs'] += len(logs)
+        return list(logs)
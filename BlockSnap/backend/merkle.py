@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+
+from typing import Dict, List, Optional, Union
+
+from eth_utils import keccak
+
+EMPTY_ROOT = b'\x00' * 32
+
+
+def chunk_leaf(sequence_number: int, video_cid: str, metadata_cid: str) -> bytes:
+    """
+    Leaf hash of a video chunk, equal to the contract's
+    keccak256(bytes.concat(keccak256(abi.encode(sequenceNumber,
+    keccak256(bytes(videoCID)), keccak256(bytes(metadataCID))))))
+    """
+    encoded = (
+        sequence_number.to_bytes(32, 'big')
+        + keccak(video_cid.encode())
+        + keccak(metadata_cid.encode())
+    )
+    # Hashed twice so a leaf can never be mistaken for an inner node
+    return keccak(keccak(encoded))
+
+
+def hash_pair(a: bytes, b: bytes) -> bytes:
+    """Inner node hash over a sorted pair, as in OpenZeppelin's MerkleProof"""
+    return keccak(a + b) if a < b else keccak(b + a)
+
+
+def to_hex(value: bytes) -> str:
+    return '0x' + value.hex()
+
+
+def from_hex(value: Union[str, bytes]) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    return bytes.fromhex(value[2:] if value.startswith('0x') else value)
+
+
+def verify_proof(leaf: bytes, proof: List[Union[str, bytes]], root: Union[str, bytes]) -> bool:
+    """
+    Check a Merkle inclusion proof without any chain access
+    Args:
+        leaf: Leaf hash, see chunk_leaf()
+        proof: Sibling hashes from the leaf up to the root
+        root: Expected root
+    Returns:
+        Whether the proof leads from the leaf to the root
+    """
+    node = leaf
+    for sibling in proof:
+        node = hash_pair(node, from_hex(sibling))
+    return node == from_hex(root)
+
+
+def verify_chunk_proof(chunk: Dict, proof: List[Union[str, bytes]], root: Union[str, bytes]) -> bool:
+    """Check that a chunk (sequence_number, video_cid, metadata_cid) is included under root"""
+    leaf = chunk_leaf(int(chunk['sequence_number']), chunk['video_cid'], chunk['metadata_cid'])
+    return verify_proof(leaf, proof, root)
+
+
+def manifest_chunks(manifest: Dict, root: Union[str, bytes]) -> List[Dict]:
+    """
+    Chunks listed in a published proof manifest, checked against a committed root
+    Args:
+        manifest: Output of SessionMerkleTree.get_manifest(), as fetched from IPFS
+        root: Root committed on-chain alongside the manifest's CID
+    Returns:
+        The manifest's chunks whose proofs lead to the root
+    Raises:
+        ValueError: The manifest was built for a different root
+    """
+    if 'root' not in manifest:
+        raise ValueError("Manifest is unavailable or malformed")
+    if from_hex(manifest['root']) != from_hex(root):
+        raise ValueError(f"Manifest root {manifest['root']} does not match committed root")
+    return [
+        chunk for chunk in manifest['chunks']
+        if verify_chunk_proof(chunk, chunk['proof'], root)
+    ]
+
+
+def add_manifest_chunks(session: Dict, manifest: Dict) -> None:
+    """
+    List a Merkle-mode session's chunks from its committed proof manifest
+    Args:
+        session: Session from collect_video_sessions() with a committed manifest_cid
+        manifest: The manifest fetched from IPFS
+    Raises:
+        ValueError: The manifest does not match the session's committed root
+    """
+    session['chunks'] = [
+        dict(chunk, timestamp=session['root_block'], transaction_hash=session['root_transaction_hash'])
+        for chunk in manifest_chunks(manifest, session['root'])
+    ]
+
+
+class SessionMerkleTree:
+    """
+    Append-only Merkle tree over the chunks of a recording session.
+
+    Pairs are hashed in sorted order, so proofs carry no left/right flags and
+    can be checked with OpenZeppelin's MerkleProof on-chain. A node without a
+    sibling is carried up to the next level unchanged. The tree is rebuilt
+    lazily after appends.
+    """
+
+    def __init__(self):
+        self.chunks: List[Dict] = []
+        self._leaves: List[bytes] = []
+        self._positions: Dict[int, int] = {}
+        self._levels: Optional[List[List[bytes]]] = None
+
+    def __len__(self) -> int:
+        return len(self._leaves)
+
+    def add(self, chunk_data: Dict) -> int:
+        """
+        Append a chunk
+        Args:
+            chunk_data: Dict with sequence_number, video_cid and metadata_cid
+        Returns:
+            Position of the chunk's leaf
+        """
+        chunk = {
+            'sequence_number': int(chunk_data['sequence_number']),
+            'video_cid': chunk_data['video_cid'],
+            'metadata_cid': chunk_data['metadata_cid']
+        }
+        self.chunks.append(chunk)
+        self._leaves.append(chunk_leaf(chunk['sequence_number'], chunk['video_cid'], chunk['metadata_cid']))
+        self._positions[chunk['sequence_number']] = len(self._leaves) - 1
+        self._levels = None
+        return len(self._leaves) - 1
+
+    def _build(self) -> List[List[bytes]]:
+        if self._levels is None:
+            levels = [list(self._leaves)]
+            while len(levels[-1]) > 1:
+                level = levels[-1]
+                parents = [hash_pair(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+                if len(level) % 2:
+                    parents.append(level[-1])
+                levels.append(parents)
+            self._levels = levels
+        return self._levels
+
+    @property
+    def root(self) -> bytes:
+        """Current root; EMPTY_ROOT for a tree without chunks"""
+        if not self._leaves:
+            return EMPTY_ROOT
+        return self._build()[-1][0]
+
+    def proof(self, position: int) -> List[bytes]:
+        """Sibling hashes from the leaf at position up to the current root"""
+        proof = []
+        for level in self._build()[:-1]:
+            sibling = position ^ 1
+            if sibling < len(level):
+                proof.append(level[sibling])
+            position //= 2
+        return proof
+
+    def get_chunk_proof(self, sequence_number: int) -> Optional[Dict]:
+        """
+        Inclusion proof for a chunk against the current root
+        Returns: Chunk fields with leaf, proof, root and chunk_count as hex, or None
+        """
+        position = self._positions.get(sequence_number)
+        if position is None:
+            return None
+        return dict(
+            self.chunks[position],
+            leaf=to_hex(self._leaves[position]),
+            proof=[to_hex(node) for node in self.proof(position)],
+            root=to_hex(self.root),
+            chunk_count=len(self)
+        )
+
+    def get_manifest(self) -> Dict:
+        """Proofs for every chunk against the current root"""
+        return {
+            'root': to_hex(self.root),
+            'chunk_count': len(self),
+            'chunks': [self.get_chunk_proof(chunk['sequence_number']) for chunk in self.chunks]
+        }
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import threading
+import time
+import uuid
+from typing import BinaryIO, Callable, Iterator, List, Optional, Tuple, Union
+
+Source = Union[bytes, bytearray, memoryview, BinaryIO]
+
+# Size of the blocks read from each source while streaming
+DEFAULT_BLOCK_SIZE = 256 * 1024
+
+
+def _source_length(source: Source) -> Optional[int]:
+    """Remaining length of a source, or None if it cannot be determined"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return memoryview(source).nbytes
+    try:
+        return os.fstat(source.fileno()).st_size - source.tell()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        pass
+    try:
+        position = source.tell()
+        end = source.seek(0, io.SEEK_END)
+        source.seek(position)
+        return end - position
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+
+class MultipartStream:
+    """
+    multipart/form-data body produced block by block.
+
+    Iterating the stream yields the part headers and the content of each
+    source in fixed-size blocks, so memory use stays constant regardless of
+    payload size. Pass iter(stream) to requests for a chunked transfer, or the
+    stream itself (which has a length when every source is sized) to send
+    with a Content-Length header.
+    """
+
+    def __init__(self,
+                 parts: List[Tuple[str, str, Source]],
+                 boundary: Optional[str] = None,
+                 block_size: int = DEFAULT_BLOCK_SIZE,
+                 progress: Optional[Callable[[int, Optional[int]], None]] = None):
+        """
+        Args:
+            parts: (field name, filename, source) for each file part
+            boundary: Multipart boundary; random if omitted
+            block_size: Bytes read from a source per block
+            progress: Called as progress(bytes_sent, total_bytes) after each block;
+                total_bytes is None when the length is unknown
+        """
+        self.boundary = boundary or uuid.uuid4().hex
+        self.block_size = block_size
+        self.progress = progress
+        self._parts = [
+            (self._part_header(field, filename), source)
+            for field, filename, source in parts
+        ]
+        self._closing = f"--{self.boundary}--\r\n".encode()
+        self._lock = threading.Lock()
+        self._consumed = False
+
+        # Transfer statistics
+        self.bytes_sent = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+        lengths = [_source_length(source) for _, source in self._parts]
+        if any(length is None for length in lengths):
+            self.length: Optional[int] = None
+        else:
+            self.length = sum(
+                len(header) + length + 2
+                for (header, _), length in zip(self._parts, lengths)
+            ) + len(self._closing)
+
+    def _part_header(self, field: str, filename: str) -> bytes:
+        filename = filename.replace('"', '%22')
+        return (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            "Content-Type: application/octet-stream\r\n\r\n"
+        ).encode()
+
+    @property
+    def content_type(self) -> str:
+        """Value for the Content-Type request header"""
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self) -> int:
+        if self.length is None:
+            raise TypeError("Stream length is unknown; send it chunked")
+        return self.length
+
+    def __iter__(self) -> Iterator[bytes]:
+        with self._lock:
+            if self._consumed:
+                raise RuntimeError("Multipart stream can only be consumed once")
+            self._consumed = True
+        self.started_at = time.monotonic()
+
+        for header, source in self._parts:
+            yield self._sent(header)
+            for block in self._read_blocks(source):
+                yield self._sent(block)
+            yield self._sent(b"\r\n")
+        yield self._sent(self._closing)
+
+        self.finished_at = time.monotonic()
+
+    def _read_blocks(self, source: Source) -> Iterator[bytes]:
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            view = memoryview(source).cast('B')
+            for offset in range(0, len(view), self.block_size):
+                yield view[offset:offset + self.block_size]
+            return
+        while True:
+            block = source.read(self.block_size)
+            if not block:
+                break
+            yield block
+
+    def _sent(self, block) -> bytes:
+        self.bytes_sent += len(block)
+        if self.progress:
+            self.progress(self.bytes_sent, self.length)
+        return block
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds spent streaming the body"""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        """Average bytes per second"""
+        elapsed = self.elapsed
+        return self.bytes_sent / elapsed if elapsed > 0 else 0.0
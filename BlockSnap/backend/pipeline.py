@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# Backpressure policies
+BLOCK = 'block'
+DROP_OLDEST = 'drop_oldest'
+DOWNSCALE = 'downscale'
+POLICIES = (BLOCK, DROP_OLDEST, DOWNSCALE)
+
+
+class StageQueue(queue.Queue):
+    """
+    Bounded queue between two pipeline stages.
+
+    Behaves like queue.Queue for consumers. Producers get the configured
+    backpressure policy when the queue fills up:
+        block:       put() waits for the consumer (the default queue.Queue behaviour)
+        drop_oldest: the oldest queued item is discarded to make room
+        downscale:   once occupancy reaches downscale_threshold, items are passed
+                     through the downscale callable before being queued until the
+                     queue drains below half the threshold; when the queue is full
+                     the oldest item is dropped
+    """
+
+    # Marker put by close() to tell the consumer the producer has finished
+    CLOSED = object()
+
+    def __init__(self,
+                 name: str,
+                 maxsize: int,
+                 policy: str = BLOCK,
+                 downscale: Optional[Callable[[Any], Any]] = None,
+                 downscale_threshold: float = 0.5):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {policy}")
+        if policy == DOWNSCALE and downscale is None:
+            raise ValueError("The downscale policy requires a downscale callable")
+        if maxsize <= 0:
+            raise ValueError("Stage queues must be bounded")
+
+        super().__init__(maxsize)
+        self.name = name
+        self.policy = policy
+        self.downscale = downscale
+        self.downscale_threshold = downscale_threshold
+
+        # Downscaling switches on at the threshold and off at half of it, so
+        # a queue hovering around the threshold does not flip every item
+        self.downscaling = False
+
+        # Statistics
+        self._stats_lock = threading.Lock()
+        self.put_count = 0
+        self.dropped_count = 0
+        self.downscaled_count = 0
+        self.blocked_time = 0.0
+        self.peak_size = 0
+
+    def put(self, item, block: bool = True, timeout: Optional[float] = None) -> None:
+        """Queue an item, applying the backpressure policy when full"""
+        if self.policy == BLOCK:
+            started = time.monotonic()
+            super().put(item, block, timeout)
+            with self._stats_lock:
+                self.blocked_time += time.monotonic() - started
+                self.put_count += 1
+                self.peak_size = max(self.peak_size, self.qsize())
+            return
+
+        downscaled = False
+        if self.policy == DOWNSCALE:
+            size = self.qsize()
+            if size >= self.maxsize * self.downscale_threshold:
+                self.downscaling = True
+            elif size < self.maxsize * self.downscale_threshold / 2:
+                self.downscaling = False
+            if self.downscaling:
+                item = self.downscale(item)
+                downscaled = True
+
+        dropped = False
+        with self.not_full:
+            if self._qsize() >= self.maxsize:
+                self._get()
+                self.unfinished_tasks -= 1
+                dropped = True
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+            size = self._qsize()
+
+        with self._stats_lock:
+            self.put_count += 1
+            self.peak_size = max(self.peak_size, size)
+            if dropped:
+                self.dropped_count += 1
+            if downscaled:
+                self.downscaled_count += 1
+
+    def close(self) -> None:
+        """Signal the consumer that no more items will be produced"""
+        with self.not_full:
+            # Bypass maxsize so the marker can never be dropped or block
+            self._put(self.CLOSED)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+    def get_stats(self) -> Dict:
+        """Get occupancy and backpressure statistics"""
+        with self._stats_lock:
+            return {
+                'name': self.name,
+                'policy': self.policy,
+                'size': self.qsize(),
+                'maxsize': self.maxsize,
+                'occupancy': self.qsize() / self.maxsize,
+                'peak_size': self.peak_size,
+                'put_count': self.put_count,
+                'dropped_count': self.dropped_count,
+                'downscaled_count': self.downscaled_count,
+                'blocked_time': self.blocked_time
+            }
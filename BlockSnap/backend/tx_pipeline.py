@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+from web3.exceptions import TransactionNotFound
+
+# RPC errors meaning the locally tracked nonce is out of sync with the node
+NONCE_ERRORS = ('nonce too low', 'nonce too high', 'already known', 'invalid nonce')
+
+
+class _PendingTransaction:
+    """A nonce waiting for a receipt, with every hash broadcast for it"""
+
+    def __init__(self, tx: Dict, tx_hash, future: Future):
+        self.tx = tx
+        self.hashes: List = [tx_hash]
+        self.future = future
+        self.sent_at = time.monotonic()
+        self.bumps = 0
+
+
+class TransactionPipeline:
+    """
+    Non-blocking transaction submission for a single signer.
+
+    Nonces are assigned locally, so transactions can be sent back-to-back
+    without waiting for each other; the chain id is fetched once and the gas
+    price at most every gas_refresh_interval seconds. A single monitor thread
+    polls for receipts and resolves the future returned by submit(). A
+    transaction still unmined after stuck_timeout is re-broadcast with the
+    same nonce and a bumped gas price; the future resolves with the receipt
+    of whichever version gets mined.
+    """
+
+    def __init__(self,
+                 w3,
+                 account,
+                 gas_refresh_interval: float = 15.0,
+                 receipt_poll_interval: float = 1.0,
+                 stuck_timeout: float = 120.0,
+                 gas_bump: float = 1.125,
+                 max_bumps: int = 3):
+        """
+        Args:
+            w3: Web3 instance
+            account: LocalAccount that signs the transactions
+            gas_refresh_interval: Seconds a fetched gas price is reused
+            receipt_poll_interval: Seconds between receipt polls
+            stuck_timeout: Seconds before an unmined transaction is replaced
+            gas_bump: Gas price multiplier for replacements (nodes require >= 10%)
+            max_bumps: Replacements per nonce before waiting indefinitely
+        """
+        self.logger = logging.getLogger(__name__)
+        self.w3 = w3
+        self.account = account
+        self.gas_refresh_interval = gas_refresh_interval
+        self.receipt_poll_interval = receipt_poll_interval
+        self.stuck_timeout = stuck_timeout
+        self.gas_bump = gas_bump
+        self.max_bumps = max_bumps
+
+        self.chain_id = w3.eth.chain_id
+        self._gas_price: Optional[int] = None
+        self._gas_updated = 0.0
+        self._nonce: Optional[int] = None
+        self._submit_lock = threading.Lock()
+
+        self._pending: Dict[int, _PendingTransaction] = {}
+        self._pending_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self.monitor_thread: Optional[threading.Thread] = None
+
+        self.stats = {
+            'submitted': 0,
+            'confirmed': 0,
+            'replaced': 0,
+            'failed': 0
+        }
+
+    @property
+    def gas_price(self) -> int:
+        """Current gas price, refreshed at most every gas_refresh_interval seconds"""
+        now = time.monotonic()
+        if self._gas_price is None or now - self._gas_updated >= self.gas_refresh_interval:
+            self._gas_price = self.w3.eth.gas_price
+            self._gas_updated = now
+        return self._gas_price
+
+    def _next_nonce(self) -> int:
+        # Called with the submit lock held
+        if self._nonce is None:
+            self._nonce = self.w3.eth.get_transaction_count(self.account.address, 'pending')
+        nonce = self._nonce
+        self._nonce += 1
+        return nonce
+
+    def submit(self, contract_function, gas: Optional[int] = None) -> Future:
+        """
+        Sign and broadcast a contract call without waiting for it to be mined
+        Args:
+            contract_function: ContractFunction to transact, e.g. contract.functions.burn(1)
+            gas: Gas limit; estimated by the node when omitted
+        Returns:
+            Future resolving to the transaction receipt
+        """
+        with self._submit_lock:
+            params = {
+                'from': self.account.address,
+                'chainId': self.chain_id,
+                'gasPrice': self.gas_price,
+                'nonce': self._next_nonce()
+            }
+            if gas is not None:
+                params['gas'] = gas
+            try:
+                tx = contract_function.build_transaction(params)
+                tx_hash = self._broadcast(tx)
+            except Exception as e:
+                if any(fragment in str(e).lower() for fragment in NONCE_ERRORS):
+                    self.logger.warning(f"Nonce out of sync, resyncing from node: {str(e)}")
+                # The nonce was not used; let the next submission pick it up again
+                self._nonce = None
+                with self._pending_lock:
+                    self.stats['failed'] += 1
+                raise
+
+        future = Future()
+        with self._pending_lock:
+            self._pending[tx['nonce']] = _PendingTransaction(tx, tx_hash, future)
+            self.stats['submitted'] += 1
+            if self.monitor_thread is None:
+                self._stop_event.clear()
+                self.monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
+                self.monitor_thread.start()
+        self.logger.debug(f"Submitted transaction {self.w3.to_hex(tx_hash)} with nonce {tx['nonce']}")
+        return future
+
+    def send(self, contract_function, gas: Optional[int] = None, timeout: Optional[float] = None):
+        """
+        Submit a transaction and wait for its receipt
+        Args:
+            contract_function: ContractFunction to transact
+            gas: Gas limit; estimated by the node when omitted
+            timeout: Seconds to wait; defaults to long enough for the original
+                and every replacement to get stuck_timeout to be mined
+        Returns:
+            The transaction receipt
+        """
+        if timeout is None:
+            timeout = self.stuck_timeout * (self.max_bumps + 1) + self.receipt_poll_interval
+        return self.submit(contract_function, gas).result(timeout=timeout)
+
+    def _broadcast(self, tx: Dict):
+        signed_tx = self.account.sign_transaction(tx)
+        return self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
+
+    def _monitor_loop(self) -> None:
+        """Resolve pending transactions as their receipts appear"""
+        while not self._stop_event.is_set():
+            with self._pending_lock:
+                # Exit when idle; the next submission starts a new monitor
+                if not self._pending:
+                    self.monitor_thread = None
+                    return
+                pending = list(self._pending.items())
+            for nonce, tx in pending:
+                try:
+                    self._check(nonce, tx)
+                except Exception as e:
+                    self.logger.error(f"Error checking transaction with nonce {nonce}: {str(e)}")
+            self._stop_event.wait(self.receipt_poll_interval)
+
+    def _check(self, nonce: int, pending: _PendingTransaction) -> None:
+        # Any of the broadcast versions may be the one that got mined
+        for tx_hash in reversed(pending.hashes):
+            try:
+                receipt = self.w3.eth.get_transaction_receipt(tx_hash)
+            except TransactionNotFound:
+                continue
+            with self._pending_lock:
+                self._pending.pop(nonce, None)
+                self.stats['confirmed'] += 1
+            pending.future.set_result(receipt)
+            return
+
+        if time.monotonic() - pending.sent_at >= self.stuck_timeout and pending.bumps < self.max_bumps:
+            self._replace(pending)
+
+    def _replace(self, pending: _PendingTransaction) -> None:
+        """Re-broadcast a stuck transaction with a higher gas price"""
+        tx = dict(pending.tx)
+        tx['gasPrice'] = max(int(tx['gasPrice'] * self.gas_bump) + 1, self.gas_price)
+        try:
+            tx_hash = self._broadcast(tx)
+        except Exception as e:
+            # Typically the original was mined in the meantime
+            self.logger.warning(f"Failed to replace transaction with nonce {tx['nonce']}: {str(e)}")
+            pending.sent_at = time.monotonic()
+            return
+        pending.tx = tx
+        pending.hashes.append(tx_hash)
+        pending.sent_at = time.monotonic()
+        pending.bumps += 1
+        with self._pending_lock:
+            self.stats['replaced'] += 1
+        self.logger.info(
+            f"Replaced stuck transaction with nonce {tx['nonce']} "
+            f"(gas price {tx['gasPrice']}): {self.w3.to_hex(tx_hash)}"
+        )
+
+    def get_stats(self) -> Dict:
+        """Get submission statistics"""
+        with self._pending_lock:
+            return dict(self.stats, pending=len(self._pending), next_nonce=self._nonce)
+
+    def stop(self) -> None:
+        """Stop the receipt monitor; unresolved futures stay pending"""
+        self._stop_event.set()
+        thread = self.monitor_thread
+        if thread:
+            thread.join()
+        with self._pending_lock:
+            self.monitor_thread = None
+
+
+_pipelines: Dict[Tuple[int, str], TransactionPipeline] = {}
+_pipelines_lock = threading.Lock()
+
+
+def get_transaction_pipeline(w3, account, **kwargs) -> TransactionPipeline:
+    """
+    Process-wide pipeline for a signer on a chain.
+
+    Every handler signing with the same key shares one nonce counter, so a
+    mint and a chunk registration sent from different handlers at the same
+    time never get the same nonce. kwargs only apply to the first call.
+    """
+    key = (w3.eth.chain_id, account.address)
+    with _pipelines_lock:
+        pipeline = _pipelines.get(key)
+        if pipeline is None:
+            pipeline = TransactionPipeline(w3, account, **kwargs)
+            _pipelines[key] = pipeline
+        return pipeline
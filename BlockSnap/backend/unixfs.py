@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+
+import base64
+import hashlib
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+Source = Union[bytes, bytearray, memoryview, BinaryIO]
+
+DEFAULT_CHUNK_SIZE = 262144
+DEFAULT_MAX_LINKS = 174
+
+# Multicodec codes
+DAG_PB = 0x70
+RAW = 0x55
+SHA2_256 = 0x12
+
+# UnixFS node types
+UNIXFS_RAW = 0
+UNIXFS_DIRECTORY = 1
+UNIXFS_FILE = 2
+
+_BASE58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _field_varint(number: int, value: int) -> bytes:
+    return _varint(number << 3) + _varint(value)
+
+
+def _field_bytes(number: int, value: bytes) -> bytes:
+    return _varint((number << 3) | 2) + _varint(len(value)) + bytes(value)
+
+
+def _base58(data: bytes) -> str:
+    value = int.from_bytes(data, 'big')
+    encoded = ''
+    while value:
+        value, remainder = divmod(value, 58)
+        encoded = _BASE58_ALPHABET[remainder] + encoded
+    leading_zeros = len(data) - len(data.lstrip(b'\0'))
+    return '1' * leading_zeros + encoded
+
+
+def _multihash(block: bytes) -> bytes:
+    return bytes([SHA2_256, 32]) + hashlib.sha256(block).digest()
+
+
+class _Node:
+    """A block of the DAG as seen by its parent"""
+    __slots__ = ('cid', 'tsize', 'filesize')
+
+    def __init__(self, cid: bytes, tsize: int, filesize: int):
+        self.cid = cid            # Binary CID used in links
+        self.tsize = tsize        # Cumulative size of the block and its children
+        self.filesize = filesize  # File bytes covered by the node
+
+
+def cid_to_string(binary_cid: bytes) -> str:
+    """Text form of a binary CID: base58btc for CIDv0, base32 for CIDv1"""
+    if binary_cid[0] == SHA2_256 and len(binary_cid) == 34:
+        return _base58(binary_cid)
+    return 'b' + base64.b32encode(binary_cid).decode().lower().rstrip('=')
+
+
+def parse_chunker(chunker: Optional[str]) -> int:
+    """Chunk size for a Kubo chunker string; only fixed-size chunkers can be reproduced"""
+    if not chunker:
+        return DEFAULT_CHUNK_SIZE
+    if chunker.startswith('size-'):
+        return int(chunker[len('size-'):])
+    raise ValueError(f"Unsupported chunker for local CID computation: {chunker}")
+
+
+class UnixFSImporter:
+    """
+    Builds the CID of a file the way `ipfs add` does, without storing blocks.
+
+    Reproduces Kubo's default import: fixed-size chunking and a balanced DAG
+    of dag-pb/UnixFS nodes with at most 174 links per node, using UnixFS
+    leaves for CIDv0 and raw leaves for CIDv1.
+    """
+
+    def __init__(self,
+                 cid_version: int = 0,
+                 raw_leaves: Optional[bool] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 max_links: int = DEFAULT_MAX_LINKS):
+        self.cid_version = cid_version
+        # Kubo enables raw leaves by default for CIDv1 only
+        self.raw_leaves = (cid_version == 1) if raw_leaves is None else raw_leaves
+        self.chunk_size = chunk_size
+        self.max_links = max_links
+
+    def compute(self, source: Source) -> str:
+        """Compute the CID of the content of a source"""
+        return cid_to_string(self.file_node(source).cid)
+
+    def file_node(self, source: Source) -> _Node:
+        """Root node of the file DAG for a source"""
+        return self._layout(_Peekable(self._chunks(source)))
+
+    def directory_node(self, entries: List[Tuple[str, _Node]]) -> _Node:
+        """
+        Root node of a basic (unsharded) directory, as created by
+        `ipfs add --wrap-with-directory`
+        """
+        block = b''
+        # dag-pb links are sorted by name
+        for name, child in sorted(entries, key=lambda entry: entry[0].encode()):
+            link = (_field_bytes(1, child.cid) + _field_bytes(2, name.encode())
+                    + _field_varint(3, child.tsize))
+            block += _field_bytes(2, link)
+        block += _field_bytes(1, _field_varint(1, UNIXFS_DIRECTORY))
+
+        tsize = len(block) + sum(child.tsize for _, child in entries)
+        return _Node(self._cid(DAG_PB, block), tsize, 0)
+
+    def _chunks(self, source: Source) -> Iterator[bytes]:
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            view = memoryview(source).cast('B')
+            for offset in range(0, len(view), self.chunk_size):
+                yield bytes(view[offset:offset + self.chunk_size])
+            return
+        while True:
+            block = _read_full(source, self.chunk_size)
+            if not block:
+                break
+            yield block
+
+    def _layout(self, chunks: '_Peekable') -> _Node:
+        """Balanced layout, mirroring go-unixfs importer/balanced"""
+        if chunks.done():
+            return self._leaf(b'', UNIXFS_FILE)
+
+        # The first leaf is the root until a second chunk shows up
+        root = self._leaf(next(chunks), UNIXFS_FILE)
+        depth = 1
+        while not chunks.done():
+            root = self._fill([root], chunks, depth)
+            depth += 1
+        return root
+
+    def _fill(self, children: List[_Node], chunks: '_Peekable', depth: int) -> _Node:
+        while len(children) < self.max_links and not chunks.done():
+            if depth == 1:
+                children.append(self._leaf(next(chunks), UNIXFS_RAW))
+            else:
+                children.append(self._fill([], chunks, depth - 1))
+        return self._internal(children)
+
+    def _leaf(self, data: bytes, unixfs_type: int) -> _Node:
+        if self.raw_leaves:
+            return _Node(self._cid(RAW, data, force_v1=True), len(data), len(data))
+
+        unixfs = _field_varint(1, unixfs_type)
+        if data:
+            unixfs += _field_bytes(2, data)
+        unixfs += _field_varint(3, len(data))
+        block = _field_bytes(1, unixfs)
+        return _Node(self._cid(DAG_PB, block), len(block), len(data))
+
+    def _internal(self, children: List[_Node]) -> _Node:
+        filesize = sum(child.filesize for child in children)
+        unixfs = _field_varint(1, UNIXFS_FILE) + _field_varint(3, filesize)
+        for child in children:
+            unixfs += _field_varint(4, child.filesize)
+
+        # dag-pb puts Links (field 2) before Data (field 1)
+        block = b''
+        for child in children:
+            link = _field_bytes(1, child.cid) + _field_bytes(2, b'') + _field_varint(3, child.tsize)
+            block += _field_bytes(2, link)
+        block += _field_bytes(1, unixfs)
+
+        tsize = len(block) + sum(child.tsize for child in children)
+        return _Node(self._cid(DAG_PB, block), tsize, filesize)
+
+    def _cid(self, codec: int, block: bytes, force_v1: bool = False) -> bytes:
+        multihash = _multihash(block)
+        if self.cid_version == 0 and codec == DAG_PB and not force_v1:
+            return multihash
+        return _varint(1) + _varint(codec) + multihash
+
+
+class _Peekable:
+    """Iterator with a one-item lookahead"""
+
+    _EMPTY = object()
+
+    def __init__(self, iterator: Iterator[bytes]):
+        self._iterator = iterator
+        self._next = self._EMPTY
+
+    def done(self) -> bool:
+        if self._next is self._EMPTY:
+            self._next = next(self._iterator, None)
+        return self._next is None
+
+    def __next__(self) -> bytes:
+        if self.done():
+            raise StopIteration
+        item, self._next = self._next, self._EMPTY
+        return item
+
+
+def _read_full(source: BinaryIO, size: int) -> bytes:
+    """Read exactly size bytes unless the source ends first"""
+    data = source.read(size)
+    if not data or len(data) == size:
+        return data
+    parts = [data]
+    remaining = size - len(data)
+    while remaining:
+        more = source.read(remaining)
+        if not more:
+            break
+        parts.append(more)
+        remaining -= len(more)
+    return b''.join(parts)
+
+
+def compute_cid(source: Source,
+                cid_version: int = 0,
+                raw_leaves: Optional[bool] = None,
+                chunker: Optional[str] = None) -> str:
+    """
+    Compute the CID `ipfs add` would return for some content
+    Args:
+        source: Bytes, memoryview or an open binary file (read from its current position)
+        cid_version: CID version passed to the add
+        raw_leaves: raw-leaves passed to the add; None for the node default
+        chunker: Chunker passed to the add (only size-N is supported)
+    Returns:
+        CID string
+    """
+    importer = UnixFSImporter(cid_version, raw_leaves, parse_chunker(chunker))
+    return importer.compute(source)
+
+
+class CIDIndex:
+    """
+    Local CID -> status index.
+
+    Records what this process knows about content on the node (e.g. 'pinned')
+    so repeated uploads of identical bytes can be skipped. When a path is
+    given, updates are appended to a JSON-lines file and replayed on start.
+    """
+
+    PINNED = 'pinned'
+
+    def __init__(self, path: Optional[str] = None):
+        self.logger = logging.getLogger(__name__)
+        self.path = Path(path) if path else None
+        self._entries: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        if self.path is not None and self.path.exists():
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        if entry['status'] is None:
+                            self._entries.pop(entry['cid'], None)
+                        else:
+                            self._entries[entry['cid']] = entry['status']
+        except Exception as e:
+            self.logger.warning(f"Failed to load CID index {self.path}: {e}")
+
+    def get(self, cid: str) -> Optional[str]:
+        with self._lock:
+            return self._entries.get(cid)
+
+    def set(self, cid: str, status: str) -> None:
+        with self._lock:
+            if self._entries.get(cid) == status:
+                return
+            self._entries[cid] = status
+            self._append(cid, status)
+
+    def discard(self, cid: str) -> None:
+        with self._lock:
+            if self._entries.pop(cid, None) is not None:
+                self._append(cid, None)
+
+    def _append(self, cid: str, status: Optional[str]) -> None:
+        if self.path is None:
+            return
+        try:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps({'cid': cid, 'status': status}) + '\n')
+        except OSError as e:
+            self.logger.warning(f"Failed to persist CID index entry: {e}")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
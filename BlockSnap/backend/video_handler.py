@@ -1,31 +1,100 @@
 #!/usr/bin/env python3
 
 import cv2
+import io
+import mmap
 import time
 import threading
 import queue
 import logging
 import os
 import numpy as np
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional, Generator, Dict
+from typing import Optional, Generator, Dict, Tuple, BinaryIO, Iterator
 from pathlib import Path
+from .pipeline import StageQueue, BLOCK, DROP_OLDEST
+from .frame_pacing import FramePacer, FrameTimingStats
 
 class VideoChunk:
-    def __init__(self, start_time: float, data: bytes, sequence_number: int, metadata: Dict = None):
+    def __init__(self,
+                 start_time: float,
+                 data: Optional[bytes] = None,
+                 sequence_number: int = 0,
+                 metadata: Dict = None,
+                 path: Optional[str] = None,
+                 temporary: bool = False):
         """
         Initialize a video chunk
         Args:
             start_time: Start time of the chunk in seconds
-            data: Raw video data
+            data: Raw video data (bytes or memoryview); omit for file-backed chunks
             sequence_number: Sequence number of the chunk
             metadata: Additional metadata for the chunk
+            path: File holding the encoded chunk; the payload is read from
+                disk on demand instead of being held in memory
+            temporary: If True, release() deletes the backing file
         """
+        if data is None and path is None:
+            raise ValueError("A chunk needs either data or a backing file")
         self.start_time = start_time
-        self.data = data
+        self._data = data
+        self.path = Path(path) if path is not None else None
+        self.temporary = temporary
         self.sequence_number = sequence_number
         self._metadata = metadata or {}
         self.timestamp = datetime.fromtimestamp(start_time)
+
+    @property
+    def data(self) -> bytes:
+        """Chunk payload as bytes. File-backed chunks are read on every access; prefer open() or view()"""
+        if self._data is not None:
+            return bytes(self._data) if isinstance(self._data, memoryview) else self._data
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    @property
+    def is_file_backed(self) -> bool:
+        """Whether the payload lives on disk"""
+        return self._data is None
+
+    @property
+    def size(self) -> int:
+        """Payload size in bytes"""
+        if self._data is not None:
+            return len(self._data)
+        return self.path.stat().st_size
+
+    def open(self) -> BinaryIO:
+        """Open the payload as a binary file object for streaming reads"""
+        if self._data is not None:
+            return io.BytesIO(self._data)
+        return open(self.path, 'rb')
+
+    @contextmanager
+    def view(self) -> Iterator[memoryview]:
+        """Zero-copy read-only view of the payload, memory-mapped for file-backed chunks"""
+        if self._data is not None:
+            yield memoryview(self._data)
+            return
+        with open(self.path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield memoryview(b'')
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    yield view
+                finally:
+                    view.release()
+
+    def release(self) -> None:
+        """Delete the backing file of a temporary chunk"""
+        if self.temporary and self.path is not None:
+            try:
+                self.path.unlink(missing_ok=True)
+            except OSError:
+                pass
         
     def get_metadata(self) -> Dict:
         """Get chunk metadata"""
@@ -43,7 +112,12 @@ class DashcamRecorder:
                  resolution: tuple = (1280, 720),  
                  fps: int = 30,
                  temp_dir: str = "temp_chunks",
-                 test_mode: bool = True):  
+                 test_mode: bool = True,
+                 incremental_encoding: bool = True,
+                 frame_queue_size: int = 60,
+                 frame_queue_policy: str = DROP_OLDEST,
+                 chunk_queue_size: int = 30,
+                 chunk_queue_policy: str = BLOCK):  
         """
         Initialize the dashcam recorder
         
@@ -53,6 +127,16 @@ class DashcamRecorder:
             fps: Frames per second
             temp_dir: Directory to store temporary chunks
             test_mode: If True, generate synthetic video instead of using camera
+            incremental_encoding: If True, write frames to an open writer as they
+                arrive and rotate it at chunk boundaries instead of buffering
+                a whole chunk of raw frames in memory
+            frame_queue_size: Capacity of the capture -> encoder frame queue
+            frame_queue_policy: Backpressure policy when the encoder falls behind
+                ('drop_oldest', 'block' or 'downscale'; downscaled frames are
+                encoded at half resolution in chunks of their own)
+            chunk_queue_size: Capacity of the encoder -> upload chunk queue
+            chunk_queue_policy: Backpressure policy when uploads fall behind
+                ('drop_oldest' or 'block')
         """
         self.logger = logging.getLogger(__name__)
         self.chunk_duration = chunk_duration
@@ -60,6 +144,7 @@ class DashcamRecorder:
         self.fps = fps
         self.temp_dir = Path(temp_dir)
         self.test_mode = test_mode
+        self.incremental_encoding = incremental_encoding
         self.temp_dir.mkdir(exist_ok=True)
         
         # Initialize state
@@ -67,10 +152,31 @@ class DashcamRecorder:
         self.current_chunk = 0
         self.capture = None
         self.writer = None
-        self.chunk_queue = queue.Queue(maxsize=30)  
         self.record_thread = None
+        self.encode_thread = None
         self.chunk_thread = None
         
+        # Stage queues: capture -> encoder -> upload hand-off
+        self.frame_queue = StageQueue(
+            'frames',
+            frame_queue_size,
+            frame_queue_policy,
+            downscale=self._downscale_frame
+        )
+        self.chunk_queue = StageQueue('chunks', chunk_queue_size, chunk_queue_policy)
+        
+        # Chunks handed off but not yet uploaded; their files must survive cleanup
+        self.inflight_chunks = set()
+        self.inflight_lock = threading.Lock()
+        
+        # Monotonic frame scheduler for the capture stage
+        self.pacer = FramePacer(fps)
+        
+        # Finished writers are released off the encoder thread so that
+        # rotating to the next chunk never stalls encoding
+        self.finalize_queue = queue.Queue()
+        self.finalize_thread = None
+        
         # Preview frame
         self.latest_frame = None
         self.frame_lock = threading.Lock()
@@ -78,6 +184,7 @@ class DashcamRecorder:
         # Video configuration
         self.fourcc = cv2.VideoWriter_fourcc(*'mp4v')
         self.frame_size = (int(resolution[0]), int(resolution[1]))
+        self.reduced_frame_size = (self.frame_size[0] // 2, self.frame_size[1] // 2)
 
     def _generate_test_frame(self, frame_number: int) -> np.ndarray:
         """Generate a test frame with timestamp and moving elements"""
@@ -110,10 +217,7 @@ class DashcamRecorder:
                 self.logger.info("Starting in test mode with synthetic video")
                 self.is_recording = True
                 self.current_chunk = 0
-                self.record_thread = threading.Thread(target=self._record_loop)
-                self.chunk_thread = threading.Thread(target=self._chunk_management_loop)
-                self.record_thread.start()
-                self.chunk_thread.start()
+                self._start_threads()
                 return True
 
             # Try different camera indices
@@ -148,10 +252,7 @@ class DashcamRecorder:
             # Start recording thread
             self.is_recording = True
             self.current_chunk = 0
-            self.record_thread = threading.Thread(target=self._record_loop)
-            self.chunk_thread = threading.Thread(target=self._chunk_management_loop)
-            self.record_thread.start()
-            self.chunk_thread.start()
+            self._start_threads()
 
             return True
 
@@ -163,105 +264,288 @@ class DashcamRecorder:
             self.is_recording = False
             raise RuntimeError(f"Failed to start recording: {str(e)}")
 
+    def _start_threads(self) -> None:
+        """Start the capture, encoder, finalizer and chunk management threads"""
+        self.record_thread = threading.Thread(target=self._record_loop)
+        self.encode_thread = threading.Thread(target=self._encode_loop)
+        self.finalize_thread = threading.Thread(target=self._finalize_loop)
+        self.chunk_thread = threading.Thread(target=self._chunk_management_loop)
+        self.finalize_thread.start()
+        self.encode_thread.start()
+        self.record_thread.start()
+        self.chunk_thread.start()
+
     def stop_recording(self) -> None:
         """Stop the recording process"""
         self.is_recording = False
-        if self.record_thread:
-            self.record_thread.join()
-        if self.chunk_thread:
-            self.chunk_thread.join()
+        try:
+            if self.record_thread:
+                self.record_thread.join()
+            if self.encode_thread:
+                # Let the encoder drain the frames captured so far
+                self.frame_queue.close()
+                self.encode_thread.join()
+                self.encode_thread = None
+            if self.finalize_thread:
+                # Sentinel: all pending writers have been queued by now
+                self.finalize_queue.put(None)
+                self.finalize_thread.join()
+                self.finalize_thread = None
+            if self.chunk_thread:
+                self.chunk_thread.join()
+        finally:
+            # The last chunk is queued; tell a blocked consumer no more are coming
+            self.chunk_queue.close()
         self.cleanup()
         self.logger.info("Stopped recording")
 
     def _record_loop(self) -> None:
-        """Main recording loop"""
+        """Capture loop: read frames and hand them to the encoder stage"""
         try:
-            start_time = time.time()
-            frames = []
-            frame_count = 0
+            self.pacer.reset()
             
             while self.is_recording:
-                if self.test_mode:
-                    frame = self._generate_test_frame(frame_count)
-                    frame_count += 1
-                    ret = True
-                else:
-                    ret, frame = self.capture.read()
+                # Wait for the next frame deadline; capture and processing
+                # time is absorbed instead of being added on top of it
+                slot = self.pacer.wait()
+                ret, frame = self._read_frame(slot)
                 
                 if not ret:
                     self.logger.error("Failed to get frame")
                     continue
 
-                # Update preview frame
-                with self.frame_lock:
-                    self.latest_frame = frame.copy()
+                self._update_preview(frame)
+                self.frame_queue.put((slot, time.time(), time.monotonic(), frame))
+                
+        except Exception as e:
+            self.logger.error(f"Recording loop error: {e}")
+            self.is_recording = False
+
+    def _read_frame(self, frame_count: int) -> Tuple[bool, Optional[np.ndarray]]:
+        """Read the next frame from the camera or the synthetic source"""
+        if self.test_mode:
+            return True, self._generate_test_frame(frame_count)
+        return self.capture.read()
+
+    def _update_preview(self, frame: np.ndarray) -> None:
+        """Publish a frame for the preview stream"""
+        with self.frame_lock:
+            self.latest_frame = frame.copy()
+
+    def _downscale_frame(self, item: Tuple) -> Tuple:
+        """Halve a queued frame's resolution to relieve encoder backpressure"""
+        *timing, frame = item
+        return (*timing, cv2.resize(frame, self.reduced_frame_size, interpolation=cv2.INTER_AREA))
+
+    def _next_frame(self) -> Optional[Tuple[int, float, float, np.ndarray]]:
+        """Block until the capture stage produces a frame; None once it has closed"""
+        item = self.frame_queue.get()
+        if item is StageQueue.CLOSED:
+            return None
+        return item
+
+    def _encode_loop(self) -> None:
+        """Encoder worker"""
+        if self.incremental_encoding:
+            self._encode_loop_incremental()
+        else:
+            self._encode_loop_buffered()
+
+    def _encode_loop_incremental(self) -> None:
+        """Encoder worker that writes frames as they arrive"""
+        writer = None
+        try:
+            timing = FrameTimingStats(self.fps)
+            start_time = start_mono = None
+            chunk_path = chunk_size = None
+            
+            while True:
+                item = self._next_frame()
+                if item is None:
+                    break
+                slot, captured_at, captured_mono, frame = item
+                frame = self._fit_frame(frame)
+                frame_size = (frame.shape[1], frame.shape[0])
+                
+                # Each writer is opened at the size of its chunk's first frame;
+                # a change of size (downscaling starting or stopping) ends the chunk
+                if writer is None:
+                    writer, chunk_path = self._open_chunk_writer(self.current_chunk, frame_size)
+                    chunk_size = frame_size
+                    self.writer = writer
+                elif captured_mono - start_mono >= self.chunk_duration or frame_size != chunk_size:
+                    # The next writer is opened before the old one is handed
+                    # off, so no frames are lost
+                    next_writer, next_path = self._open_chunk_writer(self.current_chunk + 1, frame_size)
+                    self.finalize_queue.put(
+                        (writer, chunk_path, start_time, self.current_chunk, timing, chunk_size)
+                    )
+                    self.current_chunk += 1
+                    writer, chunk_path, chunk_size = next_writer, next_path, frame_size
+                    self.writer = writer
+                    timing = FrameTimingStats(self.fps)
+                    start_time = start_mono = None
+                
+                if start_mono is None:
+                    start_time, start_mono = captured_at, captured_mono
+                writer.write(frame)
+                timing.add_frame(slot, captured_mono)
+            
+            # Flush the partial chunk that was open when recording stopped
+            if writer is not None:
+                self.finalize_queue.put(
+                    (writer, chunk_path, start_time, self.current_chunk, timing, chunk_size)
+                )
+                self.current_chunk += 1
+            self.writer = None
+                
+        except Exception as e:
+            self.logger.error(f"Encoder loop error: {e}")
+            if writer is not None:
+                writer.release()
+            self.writer = None
+            self.is_recording = False
+            self._drain_frames()
 
+    def _encode_loop_buffered(self) -> None:
+        """Encoder worker that buffers a whole chunk of frames before encoding"""
+        try:
+            timing = FrameTimingStats(self.fps)
+            start_time = start_mono = None
+            frames = []
+            
+            while True:
+                item = self._next_frame()
+                if item is None:
+                    break
+                slot, captured_at, captured_mono, frame = item
+                
+                frame = self._fit_frame(frame)
+                
+                # Frames of a chunk share one size; a change of size ends the chunk
+                if frames and frame.shape != frames[0].shape:
+                    self._encode_buffered_chunk(frames, start_time, timing)
+                    frames = []
+                    timing = FrameTimingStats(self.fps)
+                    start_time = start_mono = None
+                
+                if start_mono is None:
+                    start_time, start_mono = captured_at, captured_mono
                 frames.append(frame)
+                timing.add_frame(slot, captured_mono)
                 
                 # Check if it's time to create a new chunk
-                elapsed = time.time() - start_time
-                if elapsed >= self.chunk_duration:
-                    if frames:
-                        try:
-                            # Create chunk file
-                            chunk_path = self.temp_dir / f"chunk_{self.current_chunk}.mp4"
-                            writer = cv2.VideoWriter(
-                                str(chunk_path),
-                                self.fourcc,
-                                self.fps,
-                                self.frame_size
-                            )
-                            
-                            # Write frames to chunk
-                            for f in frames:
-                                writer.write(f)
-                            writer.release()
-                            
-                            # Create chunk object
-                            with open(chunk_path, 'rb') as f:
-                                chunk_data = f.read()
-                            
-                            chunk = VideoChunk(
-                                start_time=start_time,
-                                data=chunk_data,
-                                sequence_number=self.current_chunk,
-                                metadata={
-                                    'frame_count': len(frames),
-                                    'fps': self.fps,
-                                    'resolution': self.resolution,
-                                    'test_mode': self.test_mode
-                                }
-                            )
-                            
-                            # Add to queue
-                            self.chunk_queue.put(chunk)
-                            self.current_chunk += 1
-                            
-                        except Exception as e:
-                            self.logger.error(f"Error creating chunk: {e}")
-                            
+                if captured_mono - start_mono >= self.chunk_duration:
+                    self._encode_buffered_chunk(frames, start_time, timing)
+                    
                     # Reset for next chunk
                     frames = []
-                    start_time = time.time()
-                
-                # Control frame rate
-                time.sleep(1/self.fps)
+                    timing = FrameTimingStats(self.fps)
+                    start_time = start_mono = None
+                    
+            if frames:
+                self._encode_buffered_chunk(frames, start_time, timing)
                 
         except Exception as e:
-            self.logger.error(f"Recording loop error: {e}")
+            self.logger.error(f"Encoder loop error: {e}")
             self.is_recording = False
+            self._drain_frames()
+
+    def _encode_buffered_chunk(self, frames: list, start_time: float, timing: FrameTimingStats) -> None:
+        """Encode a list of buffered frames into the next chunk"""
+        try:
+            chunk_path = self._save_chunk(frames, start_time)
+            if chunk_path is None:
+                raise RuntimeError("Failed to save chunk")
+            frame_size = (frames[0].shape[1], frames[0].shape[0])
+            self._enqueue_chunk(Path(chunk_path), start_time, self.current_chunk, timing, frame_size)
+            self.current_chunk += 1
+            
+        except Exception as e:
+            self.logger.error(f"Error creating chunk: {e}")
+
+    def _drain_frames(self) -> None:
+        """Discard queued frames after an encoder failure so capture never blocks"""
+        while True:
+            item = self.frame_queue.get()
+            if item is StageQueue.CLOSED:
+                break
+
+    def _fit_frame(self, frame: np.ndarray) -> np.ndarray:
+        """Resize a frame to the configured frame size unless it is already at it or downscaled"""
+        if (frame.shape[1], frame.shape[0]) not in (self.frame_size, self.reduced_frame_size):
+            return cv2.resize(frame, self.frame_size)
+        return frame
+
+    def _open_chunk_writer(self, sequence_number: int,
+                           frame_size: Tuple[int, int]) -> Tuple[cv2.VideoWriter, Path]:
+        """Open a video writer for the given chunk at the given (width, height)"""
+        chunk_path = self.temp_dir / f"chunk_{sequence_number}.mp4"
+        writer = cv2.VideoWriter(
+            str(chunk_path),
+            self.fourcc,
+            self.fps,
+            frame_size
+        )
+        if not writer.isOpened():
+            raise RuntimeError("Failed to initialize video writer")
+        return writer, chunk_path
+
+    def _finalize_loop(self) -> None:
+        """Release finished writers and publish their chunks"""
+        while True:
+            item = self.finalize_queue.get()
+            if item is None:
+                break
+                
+            writer, chunk_path, start_time, sequence_number, timing, frame_size = item
+            try:
+                writer.release()
+                self._enqueue_chunk(chunk_path, start_time, sequence_number, timing, frame_size)
+            except Exception as e:
+                self.logger.error(f"Error finalizing chunk {sequence_number}: {e}")
+
+    def _enqueue_chunk(self, chunk_path: Path, start_time: float, sequence_number: int,
+                       timing: FrameTimingStats, frame_size: Tuple[int, int]) -> None:
+        """Create a file-backed chunk from an encoded file and queue it"""
+        # 'fps' is the measured rate; the container is written at target_fps
+        summary = timing.summary()
+        chunk = VideoChunk(
+            start_time=start_time,
+            path=chunk_path,
+            sequence_number=sequence_number,
+            metadata={
+                'frame_count': timing.frame_count,
+                'fps': summary['effective_fps'],
+                'target_fps': self.fps,
+                'dropped_frames': summary['dropped_frames'],
+                'duration': summary['duration'],
+                'jitter_ms': summary['jitter_ms'],
+                'resolution': frame_size,
+                'test_mode': self.test_mode
+            }
+        )
+        
+        with self.inflight_lock:
+            self.inflight_chunks.add(sequence_number)
+        self.chunk_queue.put(chunk)
+
+    def mark_chunk_done(self, sequence_number: int) -> None:
+        """Allow cleanup of a chunk file once its upload has been handled"""
+        with self.inflight_lock:
+            self.inflight_chunks.discard(sequence_number)
 
     def _save_chunk(self, frames: list, start_time: float) -> Optional[str]:
         """Save frames as a video chunk"""
         try:
-            chunk_path = self.temp_dir / f"chunk_{self.current_chunk}_{int(start_time)}.mp4"
+            chunk_path = self.temp_dir / f"chunk_{self.current_chunk}.mp4"
             
             # Create writer with proper codec
             writer = cv2.VideoWriter(
                 str(chunk_path),
                 self.fourcc,
                 self.fps,
-                self.frame_size,
+                (frames[0].shape[1], frames[0].shape[0]),
                 True  
             )
             
@@ -292,7 +576,7 @@ class DashcamRecorder:
 
     def _chunk_management_loop(self) -> None:
         """Manage chunks and cleanup old files"""
-        while self.is_recording or not self.chunk_queue.empty():
+        while self.is_recording:
             try:
                 # Cleanup old chunks
                 self._cleanup_old_chunks()
@@ -305,11 +589,12 @@ class DashcamRecorder:
         try:
             current_time = time.time()
             for chunk_file in self.temp_dir.glob("chunk_*.mp4"):
-                # Only delete files older than 5 minutes and not in the queue
+                # Only delete files older than 5 minutes that are not still being uploaded
                 if current_time - chunk_file.stat().st_mtime > 300:
                     chunk_number = int(chunk_file.stem.split('_')[1])
-                    if not any(chunk.sequence_number == chunk_number 
-                             for chunk in list(self.chunk_queue.queue)):
+                    with self.inflight_lock:
+                        inflight = chunk_number in self.inflight_chunks
+                    if not inflight:
                         chunk_file.unlink()
         except Exception as e:
             self.logger.error(f"Error cleaning up chunks: {str(e)}")
@@ -381,12 +666,25 @@ class DashcamRecorder:
         
         return frame_with_overlay
 
-    def get_next_chunk(self) -> Optional[VideoChunk]:
-        """Get the next available video chunk"""
+    def get_next_chunk(self, timeout: Optional[float] = None, block: bool = False) -> Optional[VideoChunk]:
+        """
+        Get the next available video chunk
+        Args:
+            timeout: Seconds to wait for a chunk; None returns immediately
+            block: Wait until a chunk arrives or recording stops, ignoring timeout
+        Returns:
+            The chunk, or None when none is available or recording has stopped
+        """
         try:
-            return self.chunk_queue.get_nowait()
+            if block:
+                chunk = self.chunk_queue.get()
+            elif timeout is None:
+                chunk = self.chunk_queue.get_nowait()
+            else:
+                chunk = self.chunk_queue.get(timeout=timeout)
         except queue.Empty:
             return None
+        return None if chunk is StageQueue.CLOSED else chunk
 
     def get_preview_frame(self) -> Optional[np.ndarray]:
         """Get the latest preview frame with timestamp overlay"""
@@ -411,5 +709,17 @@ class DashcamRecorder:
             "queue_size": self.chunk_queue.qsize(),
             "resolution": self.resolution,
             "fps": self.fps,
-            "chunk_duration": self.chunk_duration
+            "chunk_duration": self.chunk_duration,
+            "pipeline": self.get_pipeline_stats(),
+            "frame_pacing": self.pacer.get_stats()
+        }
+
+    def get_pipeline_stats(self) -> Dict:
+        """Get per-stage queue occupancy"""
+        return {
+            "capture": self.frame_queue.get_stats(),
+            "encode": {
+                **self.chunk_queue.get_stats(),
+                "pending_finalize": self.finalize_queue.qsize()
+            }
         }
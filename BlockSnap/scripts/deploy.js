@@ -2,6 +2,9 @@ const hre = require("hardhat");
 const fs = require("fs");
 
 async function main() {
+  // Rebuild the artifact from source so the deployed bytecode and saved ABI match
+  await hre.run("compile");
+
   console.log("Deploying BlockSnap NFT contract...");
 
   // Get the contract factory
@@ -4,6 +4,7 @@ pragma solidity ^0.8.20;
 import "@openzeppelin/contracts/token/ERC721/ERC721.sol";
 import "@openzeppelin/contracts/token/ERC721/extensions/ERC721URIStorage.sol";
 import "@openzeppelin/contracts/access/Ownable.sol";
+import "@openzeppelin/contracts/utils/cryptography/MerkleProof.sol";
 
 contract BlockSnapNFT is ERC721URIStorage, Ownable {
     uint256 private _nextTokenId;
@@ -20,16 +21,27 @@ contract BlockSnapNFT is ERC721URIStorage, Ownable {
     // Mapping from token ID to IPFS CID
     mapping(uint256 => string) private _imageCIDs;
     
+    // Mapping from keccak256 of an image CID to its live token ID + 1 (0 when none)
+    mapping(bytes32 => uint256) private _cidTokens;
+    
     // Video session mappings
     mapping(uint256 => address) private _sessionOwners;
     mapping(uint256 => VideoChunk[]) private _sessionChunks;
     mapping(uint256 => bool) private _activeSessions;
     
+    // Merkle roots over the chunks of sessions that do not store them individually
+    mapping(uint256 => bytes32) private _sessionRoots;
+    mapping(uint256 => uint256) private _sessionRootChunkCounts;
+    
+    // IPFS CID of the proof manifest published with a session's latest root
+    mapping(uint256 => string) private _sessionManifests;
+    
     // Events
     event PhotoMinted(uint256 indexed tokenId, address indexed owner, string ipfsCID, string metadataURI);
     event VideoSessionStarted(uint256 indexed sessionId, address indexed owner);
     event VideoChunkAdded(uint256 indexed sessionId, uint256 sequenceNumber, string videoCID);
     event VideoSessionEnded(uint256 indexed sessionId, uint256 totalChunks);
+    event SessionRootCommitted(uint256 indexed sessionId, bytes32 root, uint256 chunkCount, string manifestCID);
     
     constructor() ERC721("BlockSnap", "BSNAP") Ownable(msg.sender) {}
     
@@ -48,11 +60,16 @@ contract BlockSnapNFT is ERC721URIStorage, Ownable {
         require(bytes(imageCID).length > 0, "Image CID cannot be empty");
         require(bytes(metadataURI).length > 0, "Metadata URI cannot be empty");
         
+        // A CID has at most one live token, so verifyPhoto has one owner to report
+        bytes32 cidHash = keccak256(bytes(imageCID));
+        require(_cidTokens[cidHash] == 0, "Photo already minted");
+        
         uint256 tokenId = _nextTokenId++;
         
         _safeMint(to, tokenId);
         _setTokenURI(tokenId, metadataURI);
         _imageCIDs[tokenId] = imageCID;
+        _cidTokens[cidHash] = tokenId + 1;
         
         emit PhotoMinted(tokenId, to, imageCID, metadataURI);
         
@@ -76,12 +93,25 @@ contract BlockSnapNFT is ERC721URIStorage, Ownable {
      * @return address The owner of the photo (zero address if not found)
      */
     function verifyPhoto(string memory imageCID) public view returns (bool, address) {
-        for (uint256 i = 0; i < _nextTokenId; i++) {
-            if (keccak256(bytes(_imageCIDs[i])) == keccak256(bytes(imageCID))) {
-                return (true, ownerOf(i));
-            }
+        (bool exists, uint256 tokenId) = getTokenIdByCID(imageCID);
+        if (!exists) {
+            return (false, address(0));
+        }
+        return (true, ownerOf(tokenId));
+    }
+    
+    /**
+     * @dev Look up the token minted for an image CID
+     * @param imageCID The IPFS CID of the photo
+     * @return bool Whether a live token exists for the CID
+     * @return uint256 The token ID (zero if not found)
+     */
+    function getTokenIdByCID(string memory imageCID) public view returns (bool, uint256) {
+        uint256 entry = _cidTokens[keccak256(bytes(imageCID))];
+        if (entry == 0) {
+            return (false, 0);
         }
-        return (false, address(0));
+        return (true, entry - 1);
     }
     
     /**
@@ -112,6 +142,41 @@ contract BlockSnapNFT is ERC721URIStorage, Ownable {
     ) public {
         require(_activeSessions[sessionId], "Session is not active");
         require(_sessionOwners[sessionId] == msg.sender, "Not session owner");
+        
+        _addChunk(sessionId, sequenceNumber, videoCID, metadataCID);
+    }
+    
+    /**
+     * @dev Add several video chunks to an active session in one transaction
+     * @param sessionId The ID of the session
+     * @param sequenceNumbers The sequence numbers of the chunks
+     * @param videoCIDs The IPFS CIDs of the video chunks
+     * @param metadataCIDs The IPFS CIDs of the chunk metadata
+     */
+    function addVideoChunks(
+        uint256 sessionId,
+        uint256[] calldata sequenceNumbers,
+        string[] calldata videoCIDs,
+        string[] calldata metadataCIDs
+    ) public {
+        require(_activeSessions[sessionId], "Session is not active");
+        require(_sessionOwners[sessionId] == msg.sender, "Not session owner");
+        require(
+            videoCIDs.length == sequenceNumbers.length && metadataCIDs.length == sequenceNumbers.length,
+            "Array lengths do not match"
+        );
+        
+        for (uint256 i = 0; i < sequenceNumbers.length; i++) {
+            _addChunk(sessionId, sequenceNumbers[i], videoCIDs[i], metadataCIDs[i]);
+        }
+    }
+    
+    function _addChunk(
+        uint256 sessionId,
+        uint256 sequenceNumber,
+        string memory videoCID,
+        string memory metadataCID
+    ) private {
         require(bytes(videoCID).length > 0, "Video CID cannot be empty");
         
         VideoChunk memory chunk = VideoChunk({
@@ -135,7 +200,74 @@ contract BlockSnapNFT is ERC721URIStorage, Ownable {
         require(_sessionOwners[sessionId] == msg.sender, "Not session owner");
         
         _activeSessions[sessionId] = false;
-        emit VideoSessionEnded(sessionId, _sessionChunks[sessionId].length);
+        emit VideoSessionEnded(
+            sessionId,
+            _sessionChunks[sessionId].length + _sessionRootChunkCounts[sessionId]
+        );
+    }
+    
+    /**
+     * @dev Commit the Merkle root over all chunks recorded so far in a session.
+     * Each commit replaces the previous root, so a session costs the same
+     * storage however long it records. Leaves are
+     * keccak256(bytes.concat(keccak256(abi.encode(sequenceNumber,
+     * keccak256(bytes(videoCID)), keccak256(bytes(metadataCID)))))) and
+     * pairs are hashed in sorted order.
+     * @param sessionId The ID of the session
+     * @param root The Merkle root over the session's chunks
+     * @param chunkCount The number of chunks under the root
+     * @param manifestCID IPFS CID of the chunks and their proofs under this
+     * root, or empty if they are not published yet
+     */
+    function commitSessionRoot(
+        uint256 sessionId,
+        bytes32 root,
+        uint256 chunkCount,
+        string calldata manifestCID
+    ) public {
+        require(_activeSessions[sessionId], "Session is not active");
+        require(_sessionOwners[sessionId] == msg.sender, "Not session owner");
+        require(chunkCount >= _sessionRootChunkCounts[sessionId], "Chunk count cannot decrease");
+        
+        _sessionRoots[sessionId] = root;
+        _sessionRootChunkCounts[sessionId] = chunkCount;
+        _sessionManifests[sessionId] = manifestCID;
+        emit SessionRootCommitted(sessionId, root, chunkCount, manifestCID);
+    }
+    
+    /**
+     * @dev Get the latest committed Merkle root of a session
+     * @param sessionId The ID of the session
+     * @return bytes32 The root (zero if none was committed)
+     * @return uint256 The number of chunks under the root
+     * @return string The IPFS CID of the root's proof manifest (empty if none)
+     */
+    function getSessionRoot(uint256 sessionId) public view returns (bytes32, uint256, string memory) {
+        return (_sessionRoots[sessionId], _sessionRootChunkCounts[sessionId], _sessionManifests[sessionId]);
+    }
+    
+    /**
+     * @dev Verify that a chunk is included under a session's committed root
+     * @param sessionId The ID of the session
+     * @param sequenceNumber The sequence number of the chunk
+     * @param videoCID The IPFS CID of the video chunk
+     * @param metadataCID The IPFS CID of the chunk metadata
+     * @param proof Sibling hashes from the chunk's leaf up to the root
+     * @return bool Whether the chunk is part of the session
+     */
+    function verifySessionChunk(
+        uint256 sessionId,
+        uint256 sequenceNumber,
+        string calldata videoCID,
+        string calldata metadataCID,
+        bytes32[] calldata proof
+    ) public view returns (bool) {
+        bytes32 leaf = keccak256(bytes.concat(keccak256(abi.encode(
+            sequenceNumber,
+            keccak256(bytes(videoCID)),
+            keccak256(bytes(metadataCID))
+        ))));
+        return MerkleProof.verifyCalldata(proof, _sessionRoots[sessionId], leaf);
     }
     
     /**
@@ -162,6 +294,9 @@ contract BlockSnapNFT is ERC721URIStorage, Ownable {
     
     function burn(uint256 tokenId) public {
         require(ownerOf(tokenId) == msg.sender, "Not token owner");
+        
+        // The CID can be minted again once its token is burned
+        delete _cidTokens[keccak256(bytes(_imageCIDs[tokenId]))];
         super._burn(tokenId);
     }
 }
\ No newline at end of file
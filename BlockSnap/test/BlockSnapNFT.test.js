@@ -0,0 +1,179 @@
+const { expect } = require("chai");
+const { ethers } = require("hardhat");
+const { loadFixture } = require("@nomicfoundation/hardhat-toolbox/network-helpers");
+
+// Written by backend/merkle.py; tests/test_merkle.py checks it is current
+const sessionProofs = require("./fixtures/session_proofs.json");
+
+describe("BlockSnapNFT", function () {
+  async function deployFixture() {
+    const [owner, alice, bob] = await ethers.getSigners();
+    const BlockSnapNFT = await ethers.getContractFactory("BlockSnapNFT");
+    const nft = await BlockSnapNFT.deploy();
+    await nft.waitForDeployment();
+    return { nft, owner, alice, bob };
+  }
+
+  describe("photo CIDs", function () {
+    it("rejects a CID that already has a live token", async function () {
+      const { nft, alice, bob } = await loadFixture(deployFixture);
+      await nft.mintPhoto(alice.address, "QmImage", "ipfs://QmMetaA");
+
+      await expect(
+        nft.mintPhoto(bob.address, "QmImage", "ipfs://QmMetaB")
+      ).to.be.revertedWith("Photo already minted");
+
+      expect([...(await nft.verifyPhoto("QmImage"))]).to.deep.equal([true, alice.address]);
+      expect([...(await nft.getTokenIdByCID("QmImage"))]).to.deep.equal([true, 0n]);
+    });
+
+    it("lets a CID be minted again once its token is burned", async function () {
+      const { nft, alice, bob } = await loadFixture(deployFixture);
+      await nft.mintPhoto(alice.address, "QmImage", "ipfs://QmMetaA");
+
+      await expect(nft.connect(bob).burn(0)).to.be.revertedWith("Not token owner");
+      await nft.connect(alice).burn(0);
+      expect([...(await nft.verifyPhoto("QmImage"))]).to.deep.equal([false, ethers.ZeroAddress]);
+
+      await nft.mintPhoto(bob.address, "QmImage", "ipfs://QmMetaB");
+      expect([...(await nft.verifyPhoto("QmImage"))]).to.deep.equal([true, bob.address]);
+      expect([...(await nft.getTokenIdByCID("QmImage"))]).to.deep.equal([true, 1n]);
+    });
+  });
+
+  describe("addVideoChunks", function () {
+    async function sessionFixture() {
+      const fixture = await deployFixture();
+      await fixture.nft.connect(fixture.alice).startVideoSession();
+      return { ...fixture, sessionId: 0 };
+    }
+
+    it("adds every chunk of the batch in order", async function () {
+      const { nft, alice, sessionId } = await loadFixture(sessionFixture);
+
+      await expect(
+        nft.connect(alice).addVideoChunks(sessionId, [0, 1, 2], ["QmV0", "QmV1", "QmV2"], ["QmM0", "QmM1", "QmM2"])
+      )
+        .to.emit(nft, "VideoChunkAdded").withArgs(sessionId, 0, "QmV0")
+        .and.to.emit(nft, "VideoChunkAdded").withArgs(sessionId, 2, "QmV2");
+
+      const chunks = await nft.getSessionChunks(sessionId);
+      expect(chunks.map((chunk) => chunk.videoCID)).to.deep.equal(["QmV0", "QmV1", "QmV2"]);
+      expect(chunks.map((chunk) => chunk.metadataCID)).to.deep.equal(["QmM0", "QmM1", "QmM2"]);
+      expect(chunks.map((chunk) => chunk.sequenceNumber)).to.deep.equal([0n, 1n, 2n]);
+    });
+
+    it("rejects arrays of different lengths", async function () {
+      const { nft, alice, sessionId } = await loadFixture(sessionFixture);
+
+      await expect(
+        nft.connect(alice).addVideoChunks(sessionId, [0, 1], ["QmV0"], ["QmM0", "QmM1"])
+      ).to.be.revertedWith("Array lengths do not match");
+      await expect(
+        nft.connect(alice).addVideoChunks(sessionId, [0, 1], ["QmV0", "QmV1"], ["QmM0"])
+      ).to.be.revertedWith("Array lengths do not match");
+      expect(await nft.getSessionChunks(sessionId)).to.have.length(0);
+    });
+
+    it("rejects callers other than the session owner", async function () {
+      const { nft, bob, sessionId } = await loadFixture(sessionFixture);
+
+      await expect(
+        nft.connect(bob).addVideoChunks(sessionId, [0], ["QmV0"], ["QmM0"])
+      ).to.be.revertedWith("Not session owner");
+    });
+
+    it("rejects sessions that are not active", async function () {
+      const { nft, alice, sessionId } = await loadFixture(sessionFixture);
+
+      await expect(
+        nft.connect(alice).addVideoChunks(sessionId + 1, [0], ["QmV0"], ["QmM0"])
+      ).to.be.revertedWith("Session is not active");
+
+      await nft.connect(alice).endVideoSession(sessionId);
+      await expect(
+        nft.connect(alice).addVideoChunks(sessionId, [0], ["QmV0"], ["QmM0"])
+      ).to.be.revertedWith("Session is not active");
+    });
+  });
+
+  describe("session roots", function () {
+    async function committedFixture() {
+      const fixture = await deployFixture();
+      const { nft, alice } = fixture;
+      await nft.connect(alice).startVideoSession();
+      await nft.connect(alice).commitSessionRoot(0, sessionProofs.root, sessionProofs.chunk_count, "QmManifest");
+      return { ...fixture, sessionId: 0 };
+    }
+
+    it("hashes leaves like backend/merkle.py", function () {
+      const coder = ethers.AbiCoder.defaultAbiCoder();
+      for (const chunk of sessionProofs.chunks) {
+        const encoded = coder.encode(
+          ["uint256", "bytes32", "bytes32"],
+          [chunk.sequence_number, ethers.id(chunk.video_cid), ethers.id(chunk.metadata_cid)]
+        );
+        expect(ethers.keccak256(ethers.keccak256(encoded))).to.equal(chunk.leaf);
+      }
+    });
+
+    it("verifies proofs generated off-chain", async function () {
+      const { nft, sessionId } = await loadFixture(committedFixture);
+
+      expect([...(await nft.getSessionRoot(sessionId))]).to.deep.equal(
+        [sessionProofs.root, BigInt(sessionProofs.chunk_count), "QmManifest"]
+      );
+      for (const chunk of sessionProofs.chunks) {
+        expect(await nft.verifySessionChunk(
+          sessionId, chunk.sequence_number, chunk.video_cid, chunk.metadata_cid, chunk.proof
+        )).to.equal(true);
+      }
+    });
+
+    it("rejects tampered chunks and proofs", async function () {
+      const { nft, sessionId } = await loadFixture(committedFixture);
+      const chunk = sessionProofs.chunks[3];
+
+      expect(await nft.verifySessionChunk(
+        sessionId, chunk.sequence_number, "QmForged", chunk.metadata_cid, chunk.proof
+      )).to.equal(false);
+      expect(await nft.verifySessionChunk(
+        sessionId, chunk.sequence_number + 1, chunk.video_cid, chunk.metadata_cid, chunk.proof
+      )).to.equal(false);
+      expect(await nft.verifySessionChunk(
+        sessionId, chunk.sequence_number, chunk.video_cid, chunk.metadata_cid, chunk.proof.slice(1)
+      )).to.equal(false);
+      expect(await nft.verifySessionChunk(
+        sessionId + 1, chunk.sequence_number, chunk.video_cid, chunk.metadata_cid, chunk.proof
+      )).to.equal(false);
+    });
+
+    it("only lets the session owner commit a growing root", async function () {
+      const { nft, alice, bob, sessionId } = await loadFixture(committedFixture);
+
+      await expect(
+        nft.connect(bob).commitSessionRoot(sessionId, sessionProofs.root, sessionProofs.chunk_count, "")
+      ).to.be.revertedWith("Not session owner");
+      await expect(
+        nft.connect(alice).commitSessionRoot(sessionId, sessionProofs.chunks[0].leaf, 1, "")
+      ).to.be.revertedWith("Chunk count cannot decrease");
+
+      await nft.connect(alice).endVideoSession(sessionId);
+      await expect(
+        nft.connect(alice).commitSessionRoot(sessionId, sessionProofs.root, sessionProofs.chunk_count, "")
+      ).to.be.revertedWith("Session is not active");
+    });
+
+    it("anchors the proof manifest of the latest root", async function () {
+      const { nft, alice, sessionId } = await loadFixture(committedFixture);
+
+      // A final commit over the same chunks only adds the manifest
+      await expect(
+        nft.connect(alice).commitSessionRoot(sessionId, sessionProofs.root, sessionProofs.chunk_count, "QmFinal")
+      )
+        .to.emit(nft, "SessionRootCommitted")
+        .withArgs(sessionId, sessionProofs.root, sessionProofs.chunk_count, "QmFinal");
+      expect((await nft.getSessionRoot(sessionId))[2]).to.equal("QmFinal");
+    });
+  });
+});
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from backend.async_app import CHAIN, DASHCAM, INDEXER, IPFS, VERIFY_CACHE, cors_middleware, routes
+from backend.content_cache import TTLCache
+from backend.merkle import SessionMerkleTree
+
+WALLET = '0x' + 'ab' * 20
+
+class FakeIPFS:
+    def __init__(self, stored=(), metadata=None, available=None):
+        self.stored = set(stored)
+        self.metadata = metadata or {}
+        self.available = available or {}
+        self.verify_calls = 0
+
+    async def verify_content(self, cid):
+        self.verify_calls += 1
+        return cid in self.stored
+
+    async def get_json(self, uri):
+        return self.metadata[uri]
+
+    async def check_availability(self, cids, deadline):
+        # CIDs missing from available are still being probed
+        return {cid: self.available[cid] for cid in cids if cid in self.available}
+
+    def get_ipfs_url(self, cid):
+        return f"https://gateway.test/ipfs/{cid}"
+
+class FakeChain:
+    supports_session_roots = True
+
+    def __init__(self, owners=None, sessions=None, roots=None):
+        self.owners = owners or {}
+        self.sessions = sessions or []
+        self.roots = roots or {}
+
+    async def verify_photo(self, image_cid):
+        owner = self.owners.get(image_cid)
+        return owner is not None, owner
+
+    async def get_video_sessions(self, wallet_address):
+        return [dict(session, chunks=list(session['chunks'])) for session in self.sessions]
+
+    async def get_session_root(self, session_id):
+        return self.roots[session_id]
+
+class FakeDashcam:
+    # Not recording, so proofs come from the chain
+    session_tree = None
+    tree_session_id = None
+
+def merkle_session(chunk_count=3):
+    """A finished Merkle-mode session: its chain state and published manifest"""
+    tree = SessionMerkleTree()
+    for i in range(chunk_count):
+        tree.add({'sequence_number': i, 'video_cid': f'QmV{i}', 'metadata_cid': f'QmM{i}'})
+    session = {
+        'session_id': 9,
+        'owner': WALLET,
+        'chunks': [],
+        'root': '0x' + tree.root.hex(),
+        'manifest_cid': 'QmManifest',
+        'root_block': 77,
+        'root_transaction_hash': '0x' + 'ee' * 32
+    }
+    committed = {'root': session['root'], 'chunk_count': chunk_count, 'manifest_cid': 'QmManifest'}
+    return session, committed, tree.get_manifest()
+
+class FakeIndexer:
+    indexed_block = 42
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+
+    def get_tokens_by_owner(self, owner):
+        return [token for token in self.tokens if token['owner'] == owner]
+
+def get(components, *paths):
+    """GET each path from one app serving the routes with the given components"""
+    async def run():
+        app = web.Application(middlewares=[cors_middleware])
+        app.add_routes(routes)
+        app[VERIFY_CACHE] = TTLCache(ttl=30, negative_ttl=5)
+        for key, component in components.items():
+            app[key] = component
+
+        responses = []
+        async with TestClient(TestServer(app)) as client:
+            for path in paths:
+                response = await client.get(path)
+                responses.append((response.status, await response.json()))
+        return responses
+
+    return asyncio.run(run())
+
+class TestAsyncApp:
+    def test_verify(self):
+        """Test that IPFS and chain results are combined and cached"""
+        ipfs = FakeIPFS(stored={'QmPhoto'})
+        components = {IPFS: ipfs, CHAIN: FakeChain(owners={'QmPhoto': WALLET})}
+
+        (status, body), (_, cached), (_, missing) = get(
+            components, '/verify/QmPhoto', '/verify/QmPhoto', '/verify/QmMissing'
+        )
+        assert status == 200
+        assert body == {
+            'exists_on_ipfs': True,
+            'exists_on_blockchain': True,
+            'owner': WALLET,
+            'ipfs_url': 'https://gateway.test/ipfs/QmPhoto'
+        }
+        assert cached == body
+        # Answered from the cache the second time
+        assert ipfs.verify_calls == 2
+        assert not missing['exists_on_ipfs'] and not missing['exists_on_blockchain']
+        assert missing['owner'] is None and missing['ipfs_url'] is None
+
+    def test_nfts(self):
+        """Test that indexed tokens are listed with their IPFS metadata"""
+        tokens = [
+            {'token_id': 1, 'owner': WALLET, 'image_cid': 'QmA', 'metadata_uri': 'ipfs://QmMetaA', 'mint_tx': '0x01'},
+            {'token_id': 2, 'owner': WALLET, 'image_cid': 'QmB', 'metadata_uri': '', 'mint_tx': '0x02'},
+            {'token_id': 3, 'owner': '0x' + 'cd' * 20, 'image_cid': 'QmC', 'metadata_uri': '', 'mint_tx': '0x03'}
+        ]
+        components = {
+            IPFS: FakeIPFS(metadata={'ipfs://QmMetaA': {'name': 'Sunset'}}),
+            INDEXER: FakeIndexer(tokens)
+        }
+
+        (status, body), = get(components, f'/nfts/{WALLET}')
+        assert status == 200
+        assert body['indexed_block'] == 42
+        assert [nft['tokenId'] for nft in body['nfts']] == [1, 2]
+        assert body['nfts'][0]['name'] == 'Sunset'
+        assert body['nfts'][1]['name'] == 'BlockSnap #2'
+        assert body['nfts'][1]['image'] == 'https://gateway.test/ipfs/QmB'
+
+    def test_video_sessions(self):
+        """Test that chunks are sorted and report their availability"""
+        sessions = [{
+            'session_id': 7,
+            'owner': WALLET,
+            'chunks': [
+                {'sequence_number': 2, 'video_cid': 'QmSlow', 'timestamp': 3},
+                {'sequence_number': 0, 'video_cid': 'QmReady', 'timestamp': 1},
+                {'sequence_number': 1, 'video_cid': 'QmGone', 'timestamp': 2}
+            ]
+        }]
+        components = {
+            IPFS: FakeIPFS(available={'QmReady': True, 'QmGone': False}),
+            CHAIN: FakeChain(sessions=sessions)
+        }
+
+        (status, body), = get(components, f'/video-sessions/{WALLET}')
+        assert status == 200
+        chunks = body['sessions'][0]['chunks']
+        assert [chunk['sequence_number'] for chunk in chunks] == [0, 1, 2]
+        assert [chunk['status'] for chunk in chunks] == ['ready', 'unavailable', 'pending']
+        assert chunks[0]['video_url'] == 'https://gateway.test/ipfs/QmReady'
+        assert 'video_url' not in chunks[1] and 'video_url' not in chunks[2]
+
+    def test_merkle_session_chunks_come_from_the_manifest(self):
+        """Test that a Merkle-mode session lists the chunks of its committed manifest"""
+        session, committed, manifest = merkle_session()
+        components = {
+            IPFS: FakeIPFS(metadata={'QmManifest': manifest}, available={'QmV0': True}),
+            CHAIN: FakeChain(sessions=[session])
+        }
+
+        (status, body), = get(components, f'/video-sessions/{WALLET}')
+        assert status == 200
+        chunks = body['sessions'][0]['chunks']
+        assert [chunk['video_cid'] for chunk in chunks] == ['QmV0', 'QmV1', 'QmV2']
+        assert all(chunk['timestamp'] == 77 for chunk in chunks)
+        assert chunks[0]['status'] == 'ready'
+
+    def test_proof_of_a_finished_session(self):
+        """Test that proofs are served from the committed manifest after recording"""
+        session, committed, manifest = merkle_session()
+        components = {
+            IPFS: FakeIPFS(metadata={'QmManifest': manifest}),
+            CHAIN: FakeChain(roots={9: committed}),
+            DASHCAM: FakeDashcam()
+        }
+
+        (status, proof), (missing, _) = get(
+            components, '/video-sessions/9/proof/1', '/video-sessions/9/proof/5'
+        )
+        assert status == 200
+        assert proof['video_cid'] == 'QmV1'
+        assert proof['root'] == committed['root']
+        assert proof['session_id'] == 9 and proof['committed_chunk_count'] == 3
+        assert missing == 404
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+import threading
+import time
+
+from backend.batch_processor import BatchProcessor
+
+class FakeChunk:
+    def __init__(self, sequence_number):
+        self.sequence_number = sequence_number
+        self.size = 100
+        self.released = False
+
+    def release(self):
+        self.released = True
+
+class SlowFirstIPFS:
+    """Uploads the first batch slowly so later batches finish before it"""
+
+    def __init__(self):
+        self.use_pinata = False
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.concurrent = 0
+        self.peak_concurrent = 0
+
+    def add_video_chunks(self, chunks, replay=False):
+        with self.lock:
+            self.calls += 1
+            first = self.calls == 1
+            self.concurrent += 1
+            self.peak_concurrent = max(self.peak_concurrent, self.concurrent)
+        time.sleep(0.3 if first else 0.05)
+        with self.lock:
+            self.concurrent -= 1
+        if any(chunk.sequence_number == 5 for chunk in chunks):
+            raise ConnectionError("upload failed")
+        return [
+            {'video_cid': f'QmV{c.sequence_number}', 'metadata_cid': f'QmM{c.sequence_number}',
+             'sequence_number': c.sequence_number}
+            for c in chunks
+        ]
+
+    def verify_content(self, cid, use_cache=True, public=True):
+        # The post-upload check must reach the local node's gateway only
+        assert not use_cache and not public
+        return True
+
+def drain(processor, count, timeout=5):
+    results = []
+    deadline = time.time() + timeout
+    while len(results) < count and time.time() < deadline:
+        results.extend(processor.get_latest_results())
+        time.sleep(0.01)
+    return results
+
+class TestBatchProcessor:
+    def test_results_delivered_in_queue_order(self):
+        """Test that concurrent batches are delivered in the order chunks were queued"""
+        ipfs = SlowFirstIPFS()
+        processor = BatchProcessor(ipfs, max_batch_size=1, num_workers=4)
+        chunks = [FakeChunk(i) for i in range(8)]
+        for chunk in chunks:
+            processor.input_queue.put(chunk)
+        processor.start()
+        try:
+            results = drain(processor, len(chunks))
+        finally:
+            processor.stop()
+
+        assert [r['sequence_number'] for r in results] == list(range(8))
+        assert [r['success'] for r in results] == [i != 5 for i in range(8)]
+        assert ipfs.peak_concurrent > 1
+        assert all(chunk.released for chunk in chunks)
+
+        stats = processor.get_stats()
+        assert stats['processed_count'] == 7
+        assert stats['failed_count'] == 1
+        assert sum(w['chunks'] for w in stats['workers']) == 7
+        assert sum(w['bytes'] for w in stats['workers']) == 700
+        assert stats['reorder_buffer_size'] == 0
+
+    def test_stop_processes_remaining_chunks(self):
+        """Test that chunks still queued at stop are uploaded and delivered"""
+        processor = BatchProcessor(SlowFirstIPFS(), max_batch_size=3, num_workers=2)
+        for i in range(7):
+            processor.input_queue.put(FakeChunk(i))
+        processor.stop()
+
+        # The batch holding chunk 5 fails every retry and is still delivered in order
+        results = processor.get_latest_results()
+        assert [r['sequence_number'] for r in results] == list(range(7))
+        failed = [r['sequence_number'] for r in results if not r['success']]
+        assert 5 in failed and len(failed) <= 3
+
+    def test_chunk_is_uploaded_without_waiting_for_a_full_batch(self):
+        """Test that an idle worker picks up a chunk as soon as it is added"""
+        ipfs = SlowFirstIPFS()
+        ipfs.calls = 1  # No slow first upload
+        processor = BatchProcessor(ipfs, max_batch_size=10, num_workers=2)
+        processor.start()
+        workers = list(processor.workers)
+        try:
+            started = time.time()
+            processor.add_chunk(FakeChunk(0))
+            result = processor.result_queue.get(timeout=5)
+            assert time.time() - started < 0.5
+            assert result['sequence_number'] == 0
+        finally:
+            processor.stop()
+        assert not any(worker.is_alive() for worker in workers)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+import logging
+from types import SimpleNamespace
+
+from eth_abi import encode
+from hexbytes import HexBytes
+from web3 import Web3
+
+from backend.blockchain_handler import (
+    BlockchainHandler, CHUNK_ADDED_TOPIC, find_deploy_block, load_contract_abi
+)
+
+CONTRACT_ADDRESS = '0x5FbDB2315678afecb367f032d93F642f64180aa3'
+
+class FakeEth:
+    def __init__(self, deployed_at, head):
+        self.deployed_at = deployed_at
+        self.block_number = head
+        self.calls = 0
+
+    def get_code(self, address, block_identifier):
+        self.calls += 1
+        return b'\x60\x80' if block_identifier >= self.deployed_at else b''
+
+class FakeWeb3:
+    def __init__(self, deployed_at, head):
+        self.eth = FakeEth(deployed_at, head)
+
+def chunk_log(session_id, sequence_number, video_cid, address=CONTRACT_ADDRESS):
+    return {
+        'address': address,
+        'topics': [HexBytes(CHUNK_ADDED_TOPIC), HexBytes(session_id.to_bytes(32, 'big'))],
+        'data': HexBytes(encode(['uint256', 'string'], [sequence_number, video_cid])),
+        'blockNumber': 10,
+        'transactionHash': HexBytes(b'\x01' * 32),
+        'transactionIndex': 0,
+        'blockHash': HexBytes(b'\x02' * 32),
+        'logIndex': 0
+    }
+
+class FakeIndexer:
+    def __init__(self, tokens, indexed_block):
+        self.tokens = tokens
+        self.indexed_block = indexed_block
+
+    def get_token_by_cid(self, image_cid):
+        return self.tokens.get(image_cid)
+
+class FakeContract:
+    """Deployed contract without getTokenIdByCID; verifyPhoto reads chain state"""
+
+    def __init__(self, owners):
+        self.owners = owners
+        self.verify_calls = 0
+        self.functions = SimpleNamespace(verifyPhoto=self.verify_photo)
+
+    def verify_photo(self, image_cid):
+        def call():
+            self.verify_calls += 1
+            owner = self.owners.get(image_cid)
+            return owner is not None, owner or '0x' + '00' * 20
+        return SimpleNamespace(call=call)
+
+def indexed_handler(indexer, owners, head):
+    handler = BlockchainHandler.__new__(BlockchainHandler)
+    handler.logger = logging.getLogger(__name__)
+    handler.w3 = Web3()
+    handler.w3.eth = SimpleNamespace(block_number=head)
+    handler.supports_cid_lookup = False
+    handler.token_index = indexer
+    handler.contract = FakeContract(owners)
+    return handler
+
+class TestBlockchainHandler:
+    def test_find_deploy_block(self):
+        """Test that the deployment block is found in a logarithmic number of calls"""
+        w3 = FakeWeb3(deployed_at=123457, head=1000000)
+        assert find_deploy_block(w3, CONTRACT_ADDRESS) == 123457
+        assert w3.eth.calls <= 22
+
+    def test_receipt_has_chunk(self):
+        """Test that a chunk is verified from its registration receipt's logs"""
+        handler = BlockchainHandler.__new__(BlockchainHandler)
+        handler.logger = logging.getLogger(__name__)
+        handler.contract = Web3().eth.contract(address=CONTRACT_ADDRESS, abi=load_contract_abi())
+
+        receipt = {'logs': [chunk_log(7, 0, 'QmA'), chunk_log(7, 1, 'QmB')]}
+        assert handler.receipt_has_chunk(receipt, 7, {'sequence_number': 1, 'video_cid': 'QmB'})
+        assert not handler.receipt_has_chunk(receipt, 7, {'sequence_number': 2, 'video_cid': 'QmC'})
+        assert not handler.receipt_has_chunk(receipt, 8, {'sequence_number': 0, 'video_cid': 'QmA'})
+
+        # Events from other contracts are ignored
+        other = {'logs': [chunk_log(7, 0, 'QmA', address='0x' + '11' * 20)]}
+        assert not handler.receipt_has_chunk(other, 7, {'sequence_number': 0, 'video_cid': 'QmA'})
+
+    def test_verify_photo_with_lagging_index(self):
+        """Test that an index miss is checked on-chain until the index reaches the head"""
+        owner = Web3.to_checksum_address('0x' + 'ab' * 20)
+        indexer = FakeIndexer({'QmOld': {'owner': owner}}, indexed_block=90)
+        handler = indexed_handler(indexer, {'QmOld': owner, 'QmNew': owner}, head=100)
+
+        assert handler.verify_photo('QmOld') == (True, owner)
+        assert handler.contract.verify_calls == 0
+
+        # Minted after the indexed block
+        assert handler.verify_photo('QmNew') == (True, owner)
+        assert handler.verify_photo('QmMissing') == (False, None)
+        assert handler.contract.verify_calls == 2
+
+        # Once caught up, the index answers misses on its own
+        indexer.indexed_block = 100
+        assert handler.verify_photo('QmMissing') == (False, None)
+        assert handler.contract.verify_calls == 2
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+import pytest
+from eth_utils.abi import collapse_if_tuple
+from web3 import Web3
+from web3.providers.base import BaseProvider
+
+from backend.blockchain_handler import load_contract_abi
+from backend.call_batch import MULTICALL3_ADDRESS, CallBatcher
+
+CONTRACT_ADDRESS = Web3.to_checksum_address('0x' + '12' * 20)
+OWNER = '0x' + 'ab' * 20
+
+class FakeNode(BaseProvider):
+    """Answers eth_call from canned return data; optionally hosts Multicall3"""
+
+    def __init__(self, multicall=False):
+        super().__init__()
+        self.multicall = multicall
+        self.returns = {}
+        self.calls = []
+
+    def answer(self, fn, *values):
+        types = [collapse_if_tuple(o) for o in fn.abi['outputs']]
+        data = Web3().eth.contract(abi=fn.contract_abi).encodeABI(fn_name=fn.fn_name, args=fn.args)
+        self.returns[data] = Web3().codec.encode(types, values)
+
+    def execute(self, target, data):
+        """Return (success, return data) for one call"""
+        if data in self.returns:
+            return True, self.returns[data]
+        return False, b''
+
+    def make_request(self, method, params):
+        if method == 'eth_getCode':
+            code = '0x6080' if self.multicall and params[0] == MULTICALL3_ADDRESS else '0x'
+            return {'jsonrpc': '2.0', 'id': 0, 'result': code}
+        if method == 'eth_chainId':
+            return {'jsonrpc': '2.0', 'id': 0, 'result': '0x539'}
+
+        target, data = params[0]['to'], params[0]['data']
+        self.calls.append(target)
+        if target == MULTICALL3_ADDRESS:
+            calls = Web3().codec.decode(['(address,bool,bytes)[]'], bytes.fromhex(data[10:]))[0]
+            results = [self.execute(t, '0x' + d.hex()) for t, _, d in calls]
+            encoded = Web3().codec.encode(['(bool,bytes)[]'], [results])
+            return {'jsonrpc': '2.0', 'id': 0, 'result': '0x' + encoded.hex()}
+
+        success, result = self.execute(target, data)
+        if not success:
+            return {'jsonrpc': '2.0', 'id': 0, 'error': {'code': 3, 'message': 'execution reverted'}}
+        return {'jsonrpc': '2.0', 'id': 0, 'result': '0x' + result.hex()}
+
+class FakeResponse:
+    def __init__(self, json_data):
+        self._json = json_data
+
+    def json(self):
+        return self._json
+
+    def raise_for_status(self):
+        pass
+
+class FakeSessionPool:
+    """JSON-RPC endpoint that answers batches in reverse order"""
+
+    def __init__(self, node, supports_batch=True):
+        self.node = node
+        self.supports_batch = supports_batch
+        self.batches = []
+
+    def post(self, role, url, **kwargs):
+        payload = kwargs['json']
+        self.batches.append(payload)
+        if not self.supports_batch:
+            return FakeResponse({'jsonrpc': '2.0', 'id': None, 'error': 'batch requests not supported'})
+        replies = []
+        for request in payload:
+            reply = self.node.make_request(request['method'], request['params'])
+            replies.append(dict(reply, id=request['id']))
+        return FakeResponse(list(reversed(replies)))
+
+def make_batcher(multicall=False, supports_batch=True):
+    node = FakeNode(multicall)
+    w3 = Web3(node, middlewares=[])
+    contract = w3.eth.contract(address=CONTRACT_ADDRESS, abi=load_contract_abi())
+    pool = FakeSessionPool(node, supports_batch)
+    batcher = CallBatcher(w3, rpc_url='http://node.test', session_pool=pool)
+
+    # One call per return shape: address, tuple of outputs, array of structs
+    calls = [
+        contract.functions.ownerOf(1),
+        contract.functions.verifyPhoto('QmPhoto'),
+        contract.functions.getSessionChunks(7)
+    ]
+    node.answer(calls[0], OWNER)
+    node.answer(calls[1], True, OWNER)
+    node.answer(calls[2], [(7, 0, 'QmV0', 'QmM0', 100), (7, 1, 'QmV1', 'QmM1', 160)])
+    return batcher, node, pool, contract, calls
+
+class TestCallBatcher:
+    def test_multicall_results_match_direct_calls(self):
+        """Test that a Multicall3 aggregate decodes like ContractFunction.call()"""
+        batcher, node, pool, _, calls = make_batcher(multicall=True)
+
+        results = batcher.call(calls)
+        assert node.calls == [MULTICALL3_ADDRESS]
+        assert pool.batches == []
+        assert results == [fn.call() for fn in calls]
+        assert results[0] == Web3.to_checksum_address(OWNER)
+        assert results[2][1] == (7, 1, 'QmV1', 'QmM1', 160)
+
+    def test_rpc_batch_replies_are_matched_by_id(self):
+        """Test that out-of-order JSON-RPC batch replies come back in call order"""
+        batcher, node, pool, _, calls = make_batcher()
+
+        results = batcher.call(calls)
+        assert len(pool.batches) == 1
+        assert node.calls == [CONTRACT_ADDRESS] * 3
+        assert results == [fn.call() for fn in calls]
+
+    @pytest.mark.parametrize('multicall', [True, False])
+    def test_allow_failure(self, multicall):
+        """Test that reverted calls become None only when failures are allowed"""
+        batcher, _, _, contract, calls = make_batcher(multicall=multicall)
+        calls.insert(1, contract.functions.ownerOf(404))
+
+        results = batcher.call(calls, allow_failure=True)
+        assert results[1] is None
+        assert results[0] == Web3.to_checksum_address(OWNER)
+        assert results[2] == [True, Web3.to_checksum_address(OWNER)]
+
+        with pytest.raises(ValueError):
+            batcher.call(calls)
+
+    def test_sequential_fallback(self):
+        """Test that a provider rejecting batches is called one request at a time"""
+        batcher, node, pool, contract, calls = make_batcher(supports_batch=False)
+
+        results = batcher.call(calls)
+        assert results == [fn.call() for fn in calls]
+        assert len(pool.batches) == 1
+
+        # Batches are not retried once the provider has rejected one
+        assert batcher.call([contract.functions.ownerOf(1)]) == [results[0]]
+        assert len(pool.batches) == 1
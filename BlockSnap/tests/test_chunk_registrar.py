@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+from concurrent.futures import Future
+
+import pytest
+
+from backend.chunk_registrar import ChunkRegistrar
+
+class FakeHandler:
+    """Records submitted batches and confirms them immediately"""
+
+    def __init__(self, error=None):
+        self.batches = []
+        self.error = error
+
+    def submit_video_chunks(self, session_id, chunks):
+        if self.error:
+            raise self.error
+        self.batches.append((session_id, [chunk['sequence_number'] for chunk in chunks]))
+        receipts = []
+        for _ in chunks:
+            receipt = Future()
+            receipt.set_result({'status': 1, 'batch': len(self.batches)})
+            receipts.append(receipt)
+        return receipts
+
+def chunk(sequence_number):
+    return {'sequence_number': sequence_number, 'video_cid': 'Qm', 'metadata_cid': 'Qm'}
+
+class TestChunkRegistrar:
+    def test_full_batch_is_sent_as_one_transaction(self):
+        """Test that chunks are grouped per session up to the batch size"""
+        handler = FakeHandler()
+        registrar = ChunkRegistrar(handler, max_batch_size=3, max_delay=60)
+        registrar.start()
+
+        futures = [registrar.add(1, chunk(i)) for i in range(3)]
+        receipts = [future.result(timeout=2) for future in futures]
+        registrar.stop()
+
+        assert handler.batches == [(1, [0, 1, 2])]
+        assert {receipt['batch'] for receipt in receipts} == {1}
+        assert registrar.get_stats()['average_batch_size'] == 3
+
+    def test_partial_batch_is_sent_after_delay(self):
+        """Test that a batch that does not fill up is flushed after max_delay"""
+        handler = FakeHandler()
+        registrar = ChunkRegistrar(handler, max_batch_size=10, max_delay=0.05)
+        registrar.start()
+
+        first = registrar.add(1, chunk(0))
+        second = registrar.add(2, chunk(0))
+        first.result(timeout=2)
+        second.result(timeout=2)
+        registrar.stop()
+
+        assert sorted(handler.batches) == [(1, [0]), (2, [0])]
+
+    def test_stop_flushes_and_errors_reach_every_chunk(self):
+        """Test that stop() sends waiting chunks and a failed send fails their futures"""
+        registrar = ChunkRegistrar(FakeHandler(error=ValueError("reverted")), max_batch_size=10, max_delay=60)
+        registrar.start()
+
+        futures = [registrar.add(1, chunk(i)) for i in range(2)]
+        registrar.stop()
+
+        for future in futures:
+            with pytest.raises(ValueError):
+                future.result(timeout=2)
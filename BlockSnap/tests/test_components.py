@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from backend import components, event_indexer
+from backend.components import ComponentRegistry, ComponentUnavailable
+
+class TestComponentRegistry:
+    def test_built_once_on_first_use(self):
+        """Test that concurrent first calls share one instance"""
+        registry = ComponentRegistry()
+        built = []
+
+        def factory():
+            time.sleep(0.05)
+            built.append(object())
+            return built[-1]
+
+        registry.register('ipfs', factory)
+        assert registry.peek('ipfs') is None
+        assert registry.get_status()['ipfs']['state'] == 'not_started'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(registry.get('ipfs'))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(built) == 1
+        assert all(result is built[0] for result in results)
+        assert registry.get_status()['ipfs']['state'] == 'ready'
+        assert 'ipfs' in registry.get_startup_report()['components']
+
+    def test_failure_degrades_and_retries(self):
+        """Test that a failed backend is reported, not retried until the interval passes"""
+        registry = ComponentRegistry(retry_interval=0.1)
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise ConnectionError("node down")
+            return 'handler'
+
+        registry.register('blockchain', flaky)
+        registry.register('dashcam', lambda: ('dashcam', registry.get('blockchain')))
+
+        with pytest.raises(ComponentUnavailable):
+            registry.get('dashcam')
+        with pytest.raises(ComponentUnavailable):
+            registry.get('blockchain')
+        assert len(attempts) == 1
+        status = registry.get_status()
+        assert status['blockchain']['state'] == 'unavailable'
+        assert 'node down' in status['blockchain']['error']
+
+        time.sleep(0.15)
+        assert registry.get('dashcam') == ('dashcam', 'handler')
+        assert registry.get_status()['blockchain']['error'] is None
+
+    def test_retry_interval_read_on_first_use(self, monkeypatch):
+        """Test that a retry interval set after import (e.g. from .env) is honoured"""
+        registry = ComponentRegistry()
+        registry.register('ipfs', lambda: 'ipfs')
+        monkeypatch.setenv('COMPONENT_RETRY_INTERVAL', '7')
+
+        registry.get('ipfs')
+        assert registry.components['ipfs'].retry_interval == 7.0
+
+    def test_close_runs_cleanup(self):
+        """Test that only built components are cleaned up"""
+        registry = ComponentRegistry()
+        closed = []
+        registry.register('ipfs', lambda: 'ipfs', cleanup=closed.append)
+        registry.register('indexer', lambda: 'indexer', cleanup=closed.append)
+
+        registry.get('ipfs')
+        registry.close()
+        assert closed == ['ipfs']
+        assert registry.peek('ipfs') is None
+
+    def test_provided_instance_is_shared(self):
+        """Test that an injected handler is what dependent components receive"""
+        registry = ComponentRegistry()
+        registry.register('ipfs', lambda: pytest.fail("factory should not run"))
+        registry.register('dashcam', lambda: {'ipfs': registry.get('ipfs')})
+
+        handler = object()
+        registry.provide('ipfs', handler)
+        assert registry.get('dashcam')['ipfs'] is handler
+        assert registry.get_status()['ipfs']['state'] == 'ready'
+
+class FakeIndexer:
+    def __init__(self, blockchain_handler, **kwargs):
+        self.kwargs = kwargs
+
+    def start(self):
+        pass
+
+class TestIndexerComponent:
+    @pytest.fixture
+    def build_indexer(self, monkeypatch):
+        monkeypatch.setattr(event_indexer, 'NFTIndexer', FakeIndexer)
+        monkeypatch.delenv('NFT_INDEX_START_BLOCK', raising=False)
+        components.registry.provide('blockchain', SimpleNamespace(deploy_block=1234, token_index=None))
+        yield components._nft_indexer
+        components.registry.components['blockchain'].close()
+
+    def test_starts_at_the_deploy_block(self, build_indexer):
+        """Test that the indexer starts at the contract deployment block by default"""
+        assert build_indexer().kwargs['start_block'] == 1234
+
+    def test_start_block_override(self, build_indexer, monkeypatch):
+        """Test that NFT_INDEX_START_BLOCK takes precedence over the deploy block"""
+        monkeypatch.setenv('NFT_INDEX_START_BLOCK', '99')
+        assert build_indexer().kwargs['start_block'] == 99
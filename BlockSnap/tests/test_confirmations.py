@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+
+from types import SimpleNamespace
+
+from backend.confirmations import ConfirmationTracker
+
+class FakeEth:
+    """Chain without filter support whose head is advanced by the test"""
+
+    def __init__(self):
+        self.block_number = 10
+
+    def filter(self, params):
+        raise ValueError("filters not supported")
+
+class TestConfirmationTracker:
+    def test_one_watcher_serves_all_waiters(self):
+        """Test that waiters resolve once the head reaches their block"""
+        eth = FakeEth()
+        tracker = ConfirmationTracker(SimpleNamespace(eth=eth), poll_interval=0.01)
+
+        first = tracker.wait_for_block(11)
+        second = tracker.wait_for_block(12)
+        watcher = tracker.watch_thread
+        assert not first.done()
+
+        eth.block_number = 11
+        assert first.result(timeout=2) == 11
+        assert not second.done()
+        assert tracker.watch_thread is watcher
+
+        eth.block_number = 13
+        assert tracker.wait_for_confirmations({'blockNumber': 11}, 2, timeout=2) == 13
+        assert second.result(timeout=2) == 13
+        tracker.stop()
+
+    def test_reached_block_resolves_immediately(self):
+        """Test that waiting for a block at or below the known head does not block"""
+        tracker = ConfirmationTracker(SimpleNamespace(eth=FakeEth()), poll_interval=0.01)
+        tracker.wait_for_block(10).result(timeout=2)
+
+        assert tracker.wait_for_block(5).done()
+        tracker.stop()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+import time
+
+from backend.content_cache import ContentCache, TTLCache
+
+class TestContentCache:
+    def test_memory_lru(self):
+        """Test that the least recently used entry is evicted first"""
+        cache = ContentCache(memory_limit=10)
+        cache.put('QmA', b'aaaa')
+        cache.put('QmB', b'bbbb')
+        assert cache.get('QmA') == b'aaaa'
+        cache.put('QmC', b'cccc')
+
+        assert cache.get('QmB') is None
+        assert cache.get('QmA') == b'aaaa'
+        assert cache.get('QmC') == b'cccc'
+
+        stats = cache.get_stats()
+        assert stats['memory_hits'] == 3
+        assert stats['misses'] == 1
+        assert stats['evictions'] == 1
+
+    def test_disk_persistence(self, tmp_path):
+        """Test that compressed entries are served from disk after a restart"""
+        content = b'{"name": "BlockSnap #1"}' * 100
+        ContentCache(str(tmp_path)).put('QmA/metadata.json', content)
+
+        cache = ContentCache(str(tmp_path))
+        assert 'QmA/metadata.json' in cache
+        assert cache.get('QmA/metadata.json') == content
+        assert cache.get_stats()['disk_hits'] == 1
+        assert cache.get_stats()['disk_bytes'] < len(content)
+
+    def test_disk_limit(self, tmp_path):
+        """Test that disk entries are evicted once the limit is reached"""
+        cache = ContentCache(str(tmp_path), memory_limit=0, disk_limit=25, compress=False)
+        cache.put('QmA', b'a' * 10)
+        cache.put('QmB', b'b' * 10)
+        cache.put('QmC', b'c' * 10)
+
+        assert cache.get('QmA') is None
+        assert cache.get('QmC') == b'c' * 10
+        assert len(list(tmp_path.iterdir())) == 2
+
+    def test_path_keys_do_not_collide(self, tmp_path):
+        """Test that keys differing only in '/' versus '_' are stored separately"""
+        ContentCache(str(tmp_path), memory_limit=0).put('QmA/x_y', b'first')
+        ContentCache(str(tmp_path), memory_limit=0).put('QmA_x/y', b'second')
+
+        cache = ContentCache(str(tmp_path))
+        assert cache.get('QmA/x_y') == b'first'
+        assert cache.get('QmA_x/y') == b'second'
+        assert cache.get_stats()['disk_entries'] == 2
+
+    def test_disk_io_runs_outside_the_lock(self, tmp_path, monkeypatch):
+        """Test that reading and writing entries does not hold the cache lock"""
+        cache = ContentCache(str(tmp_path), memory_limit=0)
+        read_disk, write_disk = cache._read_disk, cache._write_disk
+        held = []
+
+        def checked_read(name):
+            held.append(cache._lock.locked())
+            return read_disk(name)
+
+        def checked_write(name, data):
+            held.append(cache._lock.locked())
+            return write_disk(name, data)
+        monkeypatch.setattr(cache, '_read_disk', checked_read)
+        monkeypatch.setattr(cache, '_write_disk', checked_write)
+
+        cache.put('QmA', b'content')
+        assert cache.get('QmA') == b'content'
+        assert held == [False, False]
+
+    def test_unreadable_entry_is_removed(self, tmp_path):
+        """Test that a corrupt disk entry is a miss and its file is deleted"""
+        cache = ContentCache(str(tmp_path), memory_limit=0)
+        cache.put('QmA', b'a' * 100)
+        (tmp_path / 'QmA').write_bytes(b'\1not zlib')
+
+        assert cache.get('QmA') is None
+        assert 'QmA' not in cache
+        assert not (tmp_path / 'QmA').exists()
+
+class TestTTLCache:
+    def test_negative_entries_expire_first(self):
+        """Test that negative results expire after negative_ttl and positive after ttl"""
+        cache = TTLCache(ttl=10, negative_ttl=0.05)
+        cache.put('QmA', True)
+        cache.put('QmB', False, negative=True)
+        assert cache.get('QmB') is False
+
+        time.sleep(0.1)
+        assert cache.get('QmB') is None
+        assert cache.get('QmA') is True
+        assert cache.get_stats()['entries'] == 1
+
+    def test_lru_limit(self):
+        """Test that the least recently used entry is dropped beyond max_entries"""
+        cache = TTLCache(ttl=10, max_entries=2)
+        cache.put('QmA', 1)
+        cache.put('QmB', 2)
+        cache.get('QmA')
+        cache.put('QmC', 3)
+
+        assert cache.get('QmB') is None
+        assert cache.get('QmA') == 1
+        assert cache.get('QmC') == 3
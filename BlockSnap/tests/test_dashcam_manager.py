@@ -1,13 +1,16 @@
 #!/usr/bin/env python3
 
 import pytest
+import json
 import time
+from concurrent.futures import Future
 from unittest.mock import Mock, patch, MagicMock
-from queue import Queue
 from datetime import datetime
 
 from backend.dashcam_manager import DashcamManager
 from backend.video_handler import VideoChunk
+from backend.pipeline import StageQueue
+from backend.merkle import SessionMerkleTree
 from backend.ipfs_handler import IPFSHandler
 from backend.blockchain_handler import BlockchainHandler
 from backend.batch_processor import BatchProcessor
@@ -22,9 +25,11 @@ def mock_components():
         
         # Configure recorder mock
         recorder_instance = mock_recorder.return_value
-        recorder_instance.chunk_queue = Queue()
+        recorder_instance.chunk_queue = StageQueue('chunks', 30)
         recorder_instance.is_recording = False
         recorder_instance.start_recording.return_value = True
+        # No chunks: the hand-off thread sees a closed queue and exits
+        recorder_instance.get_next_chunk.return_value = None
         recorder_instance.get_status.return_value = {
             'is_recording': False,
             'current_chunk': 0,
@@ -54,7 +59,10 @@ def mock_components():
 @pytest.fixture
 def manager(mock_components):
     """Create DashcamManager instance with mock components"""
-    return DashcamManager()
+    manager = DashcamManager()
+    yield manager
+    # Stop the threads a test left running so pytest can exit
+    manager.cleanup()
 
 def create_mock_chunk(sequence_number: int = 0) -> Mock:
     """Create a mock video chunk"""
@@ -166,6 +174,22 @@ class TestDashcamManager:
         assert manager.session_id is None
         mock_components['recorder'].cleanup.assert_called_once()
 
+    def test_cleanup_stops_blocked_handoff(self, manager, mock_components):
+        """Test that cleanup releases a hand-off thread waiting for chunks"""
+        chunk_queue = mock_components['recorder'].chunk_queue
+
+        def get_next_chunk(timeout=None, block=False):
+            chunk = chunk_queue.get()
+            return None if chunk is StageQueue.CLOSED else chunk
+
+        mock_components['recorder'].get_next_chunk.side_effect = get_next_chunk
+        manager.start_recording()
+        handoff_thread = manager.handoff_thread
+        assert handoff_thread.is_alive()
+
+        manager.cleanup()
+        assert not handoff_thread.is_alive()
+
     def test_error_handling(self, manager, mock_components):
         """Test error handling in various scenarios"""
         # Test blockchain error
@@ -187,6 +211,20 @@ class TestDashcamManager:
         # Verify error didn't crash the upload loop
         assert mock_components['processor'].stop.called
 
+    def test_get_latest_chunk(self, manager, mock_components):
+        """Test that the latest chunk is the last successful upload of the session"""
+        assert manager.get_latest_chunk() is None
+        
+        for i in range(2):
+            manager._handle_result({
+                'success': True,
+                'sequence_number': i,
+                'result': {'sequence_number': i, 'video_cid': f'QmV{i}', 'metadata_cid': f'QmM{i}'}
+            })
+        manager._handle_result({'success': False, 'sequence_number': 2, 'error': 'upload failed'})
+        
+        assert manager.get_latest_chunk() == {'sequence_number': 1, 'video_cid': 'QmV1', 'metadata_cid': 'QmM1'}
+
     @pytest.mark.parametrize("chunk_count", [1, 5, 10])
     def test_multiple_chunks(self, manager, mock_components, chunk_count):
         """Test processing multiple chunks"""
@@ -209,3 +247,36 @@ class TestDashcamManager:
         # Verify all chunks were processed
         assert mock_components['processor'].add_chunk.call_count == chunk_count
         assert mock_components['blockchain'].add_video_chunk.call_count == chunk_count
+
+    def test_final_root_anchors_the_proof_manifest(self, manager, mock_components):
+        """Test that the final root commit carries the published manifest's CID"""
+        done = Future()
+        done.set_result({'status': 1})
+        blockchain = mock_components['blockchain']
+        blockchain.commit_session_root.return_value = done
+        manager.ipfs.add_bytes.return_value = 'QmManifest'
+
+        manager.session_id = 3
+        manager.session_tree = SessionMerkleTree()
+        manager.tree_session_id = 3
+        manager.committed_chunk_count = 0
+        manager.pending_roots = []
+        for i in range(2):
+            manager.session_tree.add({'sequence_number': i, 'video_cid': f'QmV{i}', 'metadata_cid': f'QmM{i}'})
+
+        manager._finalize_tree(timeout=1)
+        blockchain.commit_session_root.assert_called_once_with(
+            3, manager.session_tree.root, 2, 'QmManifest'
+        )
+
+        # After the session the proof comes from the committed manifest
+        manager.session_tree = None
+        manifest = json.loads(manager.ipfs.add_bytes.call_args[0][0])
+        blockchain.supports_session_roots = True
+        blockchain.get_session_root.return_value = {
+            'root': manifest['root'], 'chunk_count': 2, 'manifest_cid': 'QmManifest'
+        }
+        manager.ipfs.get_json.return_value = manifest
+        proof = manager.get_chunk_proof(3, 1)
+        assert proof['video_cid'] == 'QmV1' and proof['committed_chunk_count'] == 2
+        manager.ipfs.get_json.assert_called_once_with('QmManifest')
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+import hashlib
+from types import SimpleNamespace
+
+from backend.event_indexer import NFTIndexer
+
+class FakeChain:
+    """Minimal web3 stand-in: logs carry their decoded args"""
+
+    def __init__(self):
+        self.logs = []
+        self.hashes = {}
+        self.block_number = 0
+        self.eth = self
+
+    def keccak(self, text):
+        return hashlib.sha256(text.encode()).digest()
+
+    def get_logs(self, params):
+        return [log for log in self.logs
+                if params['fromBlock'] <= log['blockNumber'] <= params['toBlock']]
+
+    def get_block(self, number):
+        return {'hash': self.hashes.get(number, f'0x{number:064x}')}
+
+    def emit(self, block, topic, **args):
+        self.logs.append({
+            'blockNumber': block,
+            'logIndex': len(self.logs),
+            'blockHash': self.get_block(block)['hash'],
+            'transactionHash': f'0xtx{len(self.logs)}',
+            'topics': [self.keccak(topic)],
+            'args': args
+        })
+        self.block_number = max(self.block_number, block)
+
+def make_indexer(chain, tmp_path):
+    decoder = SimpleNamespace(process_log=lambda log: {'args': log['args']})
+    contract = SimpleNamespace(
+        address='0xcontract',
+        events=SimpleNamespace(PhotoMinted=lambda: decoder, Transfer=lambda: decoder)
+    )
+    handler = SimpleNamespace(w3=chain, contract=contract)
+    return NFTIndexer(handler, db_path=str(tmp_path / 'index.db'), confirmations=0, window_size=2)
+
+MINTED = "PhotoMinted(uint256,address,string,string)"
+TRANSFER = "Transfer(address,address,uint256)"
+
+class TestNFTIndexer:
+    def test_mint_and_transfer(self, tmp_path):
+        """Test that owners follow Transfer events"""
+        chain = FakeChain()
+        chain.emit(1, TRANSFER, tokenId=0, to='0xAlice')
+        chain.emit(1, MINTED, tokenId=0, owner='0xAlice', ipfsCID='QmImage', metadataURI='ipfs://QmMeta')
+        chain.emit(3, TRANSFER, tokenId=0, to='0xBob')
+
+        indexer = make_indexer(chain, tmp_path)
+        assert indexer.sync() == 3
+
+        assert indexer.get_tokens_by_owner('0xalice') == []
+        tokens = indexer.get_tokens_by_owner('0xBOB')
+        assert len(tokens) == 1
+        assert tokens[0]['image_cid'] == 'QmImage'
+        assert tokens[0]['mint_tx'] == '0xtx1'
+
+    def test_reorg_rollback(self, tmp_path):
+        """Test that events from orphaned blocks are rolled back"""
+        chain = FakeChain()
+        chain.emit(1, MINTED, tokenId=0, owner='0xAlice', ipfsCID='QmImage', metadataURI='ipfs://QmMeta')
+        chain.emit(2, TRANSFER, tokenId=0, to='0xBob')
+        indexer = make_indexer(chain, tmp_path)
+        indexer.sync()
+        assert indexer.get_token(0)['owner'] == '0xbob'
+
+        # Block 2 is replaced by a block without the transfer
+        chain.logs = chain.logs[:1]
+        chain.hashes[2] = '0xreplaced'
+        indexer.sync()
+
+        assert indexer.reorg_count == 1
+        assert indexer.get_token(0)['owner'] == '0xalice'
+        assert indexer.get_token(0)['image_cid'] == 'QmImage'
+
+    def test_lookup_by_cid_skips_burned_tokens(self, tmp_path):
+        """Test that CID lookups return the first live token"""
+        chain = FakeChain()
+        chain.emit(1, MINTED, tokenId=0, owner='0xAlice', ipfsCID='QmImage', metadataURI='ipfs://QmA')
+        chain.emit(2, MINTED, tokenId=1, owner='0xBob', ipfsCID='QmImage', metadataURI='ipfs://QmB')
+        indexer = make_indexer(chain, tmp_path)
+        indexer.sync()
+        assert indexer.get_token_by_cid('QmImage')['token_id'] == 0
+        assert indexer.get_token_by_cid('QmOther') is None
+
+        chain.emit(3, TRANSFER, tokenId=0, to='0x' + '0' * 40)
+        indexer.sync()
+        assert indexer.get_token_by_cid('QmImage')['owner'] == '0xbob'
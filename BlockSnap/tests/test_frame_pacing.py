@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+
+import pytest
+
+from backend.frame_pacing import FramePacer, FrameTimingStats
+
+class FakeClock:
+    """Monotonic clock that only advances when told to"""
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+class TestFramePacer:
+    def test_processing_time_does_not_drift(self, clock):
+        """Test that work done between frames is absorbed by the deadline"""
+        pacer = FramePacer(10, clock=clock, sleep=clock.sleep)
+        
+        slots = []
+        for _ in range(5):
+            slots.append(pacer.wait())
+            clock.now += 0.04  # Capture and processing time
+        
+        assert slots == [0, 1, 2, 3, 4]
+        assert clock.sleeps == pytest.approx([0.06] * 4)
+        assert pacer.dropped_frames == 0
+
+    def test_missed_deadlines_are_dropped(self, clock):
+        """Test that a stall skips the missed slots instead of bursting"""
+        pacer = FramePacer(10, clock=clock, sleep=clock.sleep)
+        
+        assert pacer.wait() == 0
+        clock.now += 0.35  # Stall for three and a half frames
+        assert pacer.wait() == 3
+        assert pacer.dropped_frames == 2
+        
+        # Back on the original grid
+        assert pacer.wait() == 4
+        assert clock.now == pytest.approx(100.4)
+
+class TestFrameTimingStats:
+    def test_summary(self):
+        """Test effective fps, drop accounting and jitter"""
+        timing = FrameTimingStats(10)
+        for slot, t in [(0, 0.0), (1, 0.1), (2, 0.2), (4, 0.4), (5, 0.52)]:
+            timing.add_frame(slot, t)
+        
+        summary = timing.summary()
+        assert timing.frame_count == 5
+        assert summary['dropped_frames'] == 1
+        assert summary['effective_fps'] == pytest.approx(4 / 0.52, abs=1e-3)
+        assert summary['jitter_ms']['p50'] == pytest.approx(0, abs=1e-6)
+        assert summary['jitter_ms']['max'] == pytest.approx(100)
@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+
+from backend.http_session import SessionPool, API, RPC
+
+class TestSessionPool:
+    def test_pool_sizes_are_read_at_construction(self, monkeypatch):
+        """Test that pool sizes set after import are honoured"""
+        monkeypatch.setenv('IPFS_API_POOL_SIZE', '4')
+        pool = SessionPool(role_config={RPC: (2, (1, 1), 0)})
+
+        assert pool.role_config[API][0] == 4
+        assert pool.role_config[RPC] == (2, (1, 1), 0)
+        adapter = pool.session(API).get_adapter('http://127.0.0.1:5001')
+        assert adapter._pool_maxsize == 4
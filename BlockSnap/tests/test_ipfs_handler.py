@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+
+import json
+import threading
+import time
+
+import pytest
+import requests
+
+from backend.ipfs_handler import IPFSHandler
+from backend.unixfs import CIDIndex
+from backend.video_handler import VideoChunk
+
+class FakeResponse:
+    def __init__(self, status_code=200, json_data=None, text=''):
+        self.status_code = status_code
+        self._json = json_data or {}
+        self.text = text
+
+    def json(self):
+        return self._json
+
+    def raise_for_status(self):
+        pass
+
+def parse_multipart(content_type, data):
+    """(filename, content) of each part of a multipart body"""
+    boundary = content_type.split('boundary=')[1].encode()
+    body = b''.join(data)
+    files = []
+    for part in body.split(b'--' + boundary)[1:-1]:
+        headers, content = part.split(b'\r\n\r\n', 1)
+        filename = headers.split(b'filename="')[1].split(b'"')[0].decode()
+        files.append((filename, content[:-2]))
+    return files
+
+class FakeSessionPool:
+    """Local node and gateways; records every request"""
+
+    def __init__(self, retrievable=(), pinned=()):
+        self.retrievable = set(retrievable)
+        self.pinned = set(pinned)
+        self.requests = []
+        self.uploads = []
+
+    def post(self, role, url, **kwargs):
+        params = kwargs.get('params')
+        self.requests.append(('POST', url, params))
+        if url.endswith('/pin/ls'):
+            if params['arg'] not in self.pinned:
+                return FakeResponse(500)
+            return FakeResponse(json_data={'Keys': {params['arg']: {'Type': params['type']}}})
+        if url.endswith('/pin/add'):
+            return FakeResponse(json_data={'Pins': [value for key, value in params if key == 'arg']})
+        if url.endswith('/pinByHash'):
+            return FakeResponse(json_data={'IpfsHash': kwargs['json']['hashToPin']})
+        if 'data' in kwargs:
+            files = parse_multipart(kwargs['headers']['Content-Type'], kwargs['data'])
+            self.uploads.append((url, files))
+            if url.endswith('/pinFileToIPFS'):
+                return FakeResponse(json_data={'IpfsHash': f'QmPinata{len(self.uploads)}'})
+            # The node streams one entry per file, then the wrapping directory
+            entries = [{'Name': name, 'Hash': f'Qm-{name}'} for name, _ in files]
+            if params.get('wrap-with-directory') == 'true':
+                entries.append({'Name': '', 'Hash': 'QmDirectory'})
+            return FakeResponse(
+                json_data={'Hash': 'QmUploaded'},
+                text='\n'.join(json.dumps(entry) for entry in entries)
+            )
+        return FakeResponse()
+
+    def close(self):
+        raise AssertionError("the handler does not own the session pool")
+
+    def head(self, role, url, **kwargs):
+        self.requests.append(('HEAD', url, None))
+        return FakeResponse(200 if url.rsplit('/', 1)[-1] in self.retrievable else 404)
+
+@pytest.fixture
+def make_handler(monkeypatch):
+    monkeypatch.setenv('USE_PINATA', 'false')
+    monkeypatch.setenv('IPFS_CACHE_DIR', '')
+    monkeypatch.delenv('IPFS_CID_INDEX', raising=False)
+
+    def make(retrievable=(), pinned=(), pinata=False):
+        monkeypatch.setenv('USE_PINATA', 'true' if pinata else 'false')
+        pool = FakeSessionPool(retrievable, pinned)
+        handler = IPFSHandler(session_pool=pool)
+        pool.requests.clear()
+        return handler, pool
+
+    return make
+
+class TestVerifyContent:
+    def test_pinned_index_entry_is_not_trusted(self, make_handler):
+        """Test that content recorded as added is still checked on the gateways"""
+        handler, pool = make_handler()
+        handler.cid_index.set('QmAdded', CIDIndex.PINNED)
+
+        assert not handler.verify_content('QmAdded')
+        assert sum(1 for method, _, _ in pool.requests if method == 'HEAD') == 2
+
+    def test_cached_content_skips_the_gateways(self, make_handler):
+        """Test that the content cache answers unless a gateway check is required"""
+        handler, pool = make_handler(retrievable={'QmRead'})
+        handler.content_cache.put('QmRead', b'data')
+
+        assert handler.verify_content('QmRead')
+        assert pool.requests == []
+
+        assert handler.verify_content('QmRead', use_cache=False)
+        assert any(method == 'HEAD' for method, _, _ in pool.requests)
+
+    def test_local_check_skips_the_public_gateway(self, make_handler):
+        """Test that a local-only check asks just the local gateway"""
+        handler, pool = make_handler(retrievable={'QmAdded'})
+
+        assert handler.verify_content('QmAdded', use_cache=False, public=False)
+        assert [url for _, url, _ in pool.requests] == [f"{handler.ipfs_gateway}/ipfs/QmAdded"]
+
+    def test_gateway_errors_count_as_unavailable(self, make_handler):
+        """Test that any request failure on a gateway is a negative answer"""
+        handler, pool = make_handler()
+
+        def head(role, url, **kwargs):
+            raise requests.exceptions.TooManyRedirects(url)
+        pool.head = head
+
+        assert not handler.verify_content('QmLooping')
+        assert not handler.verify_content('QmLooping', public=False)
+
+class TestCheckAvailability:
+    def test_slow_checks_are_pending_at_the_deadline(self, make_handler):
+        """Test that checks still running at the deadline are None, then cached once they finish"""
+        handler, pool = make_handler(retrievable={'QmFast', 'QmSlow'})
+        release = threading.Event()
+        head = pool.head
+
+        def slow_head(role, url, **kwargs):
+            if url.endswith('/QmSlow'):
+                release.wait(5)
+            return head(role, url, **kwargs)
+        pool.head = slow_head
+
+        results = handler.check_availability(['QmFast', 'QmSlow', 'QmMissing', ''], deadline=0.2)
+        assert results == {'QmFast': True, 'QmSlow': None, 'QmMissing': False, '': False}
+
+        release.set()
+        for _ in range(50):
+            if handler.availability_cache.get('QmSlow') is not None:
+                break
+            time.sleep(0.02)
+        requests_made = len(pool.requests)
+        results = handler.check_availability(['QmFast', 'QmSlow', 'QmMissing'], deadline=0.2)
+        assert results == {'QmFast': True, 'QmSlow': True, 'QmMissing': False}
+        # Positive and negative answers are both served from the cache
+        assert len(pool.requests) == requests_made
+
+class TestAddAndPin:
+    def test_add_stream_pins_in_the_add_request(self, make_handler, monkeypatch):
+        """Test that one add request carries the pin and import options"""
+        monkeypatch.setenv('IPFS_CID_VERSION', '1')
+        monkeypatch.setenv('IPFS_RAW_LEAVES', 'True')
+        handler, pool = make_handler()
+
+        cid = handler.add_stream(b'clip', 'clip.mp4')
+        (method, url, params), = pool.requests
+        assert url == f"{handler.ipfs_host}/api/v0/add"
+        assert params == {'pin': 'true', 'cid-version': 1, 'chunker': 'size-262144', 'raw-leaves': 'true'}
+        assert handler.cid_index.get(cid) == CIDIndex.PINNED
+
+    def test_unpinned_add(self, make_handler):
+        """Test that pin=False adds without pinning or recording the CID as pinned"""
+        handler, pool = make_handler()
+
+        cid = handler.add_stream(b'clip', 'clip.mp4', pin=False)
+        assert pool.requests[0][2]['pin'] == 'false'
+        assert 'raw-leaves' not in pool.requests[0][2]
+        assert handler.cid_index.get(cid) is None
+
+    def test_pin_many_sends_one_request(self, make_handler):
+        """Test that several CIDs are pinned with a single pin/add request"""
+        handler, pool = make_handler()
+
+        assert handler.pin_many(['ipfs://QmA', '', 'QmB']) == ['QmA', 'QmB']
+        assert pool.requests == [
+            ('POST', f"{handler.ipfs_host}/api/v0/pin/add", [('arg', 'QmA'), ('arg', 'QmB')])
+        ]
+        assert handler.pin_many([]) == []
+        assert len(pool.requests) == 1
+
+    def test_pin_many_on_pinata(self, make_handler):
+        """Test that Pinata, which has no bulk endpoint, gets one pin per CID"""
+        handler, pool = make_handler(pinata=True)
+
+        assert handler.pin_many(['QmA', 'QmB']) == ['QmA', 'QmB']
+        assert [url for _, url, _ in pool.requests] == ['https://api.pinata.cloud/pinning/pinByHash'] * 2
+
+class TestSkipKnown:
+    def test_first_upload_does_not_ask_the_node(self, make_handler):
+        """Test that a first upload only consults the local CID index"""
+        handler, pool = make_handler()
+        cid = handler.compute_cid(b'chunk')
+        pool.pinned.add(cid)
+
+        handler.add_stream(b'chunk')
+        assert [url.rsplit('/', 1)[-1] for _, url, _ in pool.requests] == ['add']
+
+        # Recorded in the index, so the same content is now skipped for free
+        pool.requests.clear()
+        handler.cid_index.set(cid, CIDIndex.PINNED)
+        assert handler.add_stream(b'chunk') == cid
+        assert pool.requests == []
+
+    def test_replay_checks_recursive_pins(self, make_handler):
+        """Test that a replayed upload asks the node and skips pinned content"""
+        handler, pool = make_handler()
+        cid = handler.compute_cid(b'chunk')
+        pool.pinned.add(cid)
+
+        assert handler.add_stream(b'chunk', replay=True) == cid
+        assert pool.requests == [('POST', f"{handler.ipfs_host}/api/v0/pin/ls", {'arg': cid, 'type': 'recursive'})]
+        assert handler.get_upload_stats()['skipped_uploads'] == 1
+
+class TestAddFiles:
+    def test_wrapped_directory_entry_is_not_a_file(self, make_handler):
+        """Test that the nameless entry of a wrapped add is the directory CID"""
+        handler, pool = make_handler()
+        upload = handler.add_files([('clip.mp4', b'video'), ('clip.json', b'{}')])
+
+        assert pool.requests[0][2]['wrap-with-directory'] == 'true'
+        assert upload == {
+            'files': {'clip.mp4': 'Qm-clip.mp4', 'clip.json': 'Qm-clip.json'},
+            'directory_cid': 'QmDirectory'
+        }
+        assert handler.cid_index.get('QmDirectory') == CIDIndex.PINNED
+
+    def test_unwrapped_add_has_no_directory(self, make_handler):
+        """Test that files added without a directory report no directory CID"""
+        handler, pool = make_handler()
+        upload = handler.add_files([('clip.mp4', b'video')], wrap_with_directory=False)
+
+        assert pool.requests[0][2]['wrap-with-directory'] == 'false'
+        assert upload == {'files': {'clip.mp4': 'Qm-clip.mp4'}, 'directory_cid': None}
+
+    def test_missing_file_entry_fails(self, make_handler, monkeypatch):
+        """Test that a response without an entry for every file is an error"""
+        handler, pool = make_handler()
+        response = FakeResponse(text='{"Name": "clip.mp4", "Hash": "QmClip"}\n\n{"Name": "", "Hash": "QmDir"}')
+        monkeypatch.setattr(pool, 'post', lambda role, url, **kwargs: response)
+
+        with pytest.raises(ValueError):
+            handler.add_files([('clip.mp4', b'video'), ('clip.json', b'{}')])
+
+def chunk(sequence_number):
+    return VideoChunk(start_time=1700000000 + sequence_number, data=b'video %d' % sequence_number,
+                      sequence_number=sequence_number)
+
+class TestVideoChunks:
+    def test_metadata_links_the_video_in_the_batch_directory(self, make_handler):
+        """Test that chunk metadata carries the precomputed CID of its video"""
+        handler, pool = make_handler()
+        results = handler.add_video_chunks([chunk(0), chunk(1)])
+
+        (url, files), = pool.uploads
+        assert [name for name, _ in files] == [
+            'chunk_0.mp4', 'chunk_0_metadata.json', 'chunk_1.mp4', 'chunk_1_metadata.json'
+        ]
+        metadata = json.loads(files[1][1])
+        assert metadata['ipfs_cid'] == handler.compute_cid(b'video 0')
+        assert metadata['video_path'] == 'chunk_0.mp4'
+        assert results[1]['video_cid'] == 'Qm-chunk_1.mp4'
+        assert all(result['directory_cid'] == 'QmDirectory' for result in results)
+
+    def test_each_file_is_hashed_once(self, make_handler, monkeypatch):
+        """Test that the CID computed for a video is reused for the batch upload"""
+        handler, pool = make_handler()
+        hashed = []
+        file_node = handler.importer.file_node
+
+        def counting_file_node(source):
+            hashed.append(source)
+            return file_node(source)
+        monkeypatch.setattr(handler.importer, 'file_node', counting_file_node)
+
+        handler.add_video_chunks([chunk(0), chunk(1)])
+        # One DAG per video plus one per metadata file
+        assert len(hashed) == 4
+
+    def test_pinata_metadata_links_the_uploaded_video(self, make_handler):
+        """Test that on Pinata each video is uploaded first and its CID embedded"""
+        handler, pool = make_handler(pinata=True)
+        results = handler.add_video_chunks([chunk(0)])
+
+        assert [files[0][0] for _, files in pool.uploads] == ['chunk_0.mp4', 'chunk_0_metadata.json']
+        metadata = json.loads(pool.uploads[1][1][0][1])
+        assert metadata['ipfs_cid'] == 'QmPinata1'
+        assert results == [{
+            'video_cid': 'QmPinata1',
+            'metadata_cid': 'QmPinata2',
+            'directory_cid': None,
+            'sequence_number': 0,
+            'timestamp': chunk(0).timestamp.isoformat()
+        }]
+
+class TestCleanup:
+    def test_shared_session_pool_stays_open(self, make_handler):
+        """Test that cleanup leaves the session pool to its owner"""
+        handler, pool = make_handler()
+        handler.cleanup()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from backend.log_scanner import AsyncLogScanner, LogScanner
+
+class FakeEth:
+    """Serves one log per block and rejects ranges holding more than max_results"""
+
+    def __init__(self, block_number, max_results):
+        self.block_number = block_number
+        self.max_results = max_results
+        self.requests = []
+
+    def get_logs(self, params):
+        self.requests.append((params['fromBlock'], params['toBlock']))
+        count = params['toBlock'] - params['fromBlock'] + 1
+        if count > self.max_results:
+            raise ValueError(f"query returned more than {self.max_results} results")
+        return [{'blockNumber': n} for n in range(params['fromBlock'], params['toBlock'] + 1)]
+
+class AsyncFakeEth(FakeEth):
+    """FakeEth with the coroutine interface of AsyncWeb3"""
+
+    @property
+    def block_number(self):
+        async def head():
+            return self._head
+        return head()
+
+    @block_number.setter
+    def block_number(self, value):
+        self._head = value
+
+    async def get_logs(self, params):
+        await asyncio.sleep(0)
+        return FakeEth.get_logs(self, params)
+
+class TestLogScanner:
+    def test_splits_and_preserves_order(self):
+        """Test that rejected windows are split and logs stay in block order"""
+        eth = FakeEth(block_number=99, max_results=10)
+        scanner = LogScanner(SimpleNamespace(eth=eth), max_window=64, max_workers=3)
+
+        logs = scanner.get_logs({'address': '0xcontract'}, 0)
+
+        assert [log['blockNumber'] for log in logs] == list(range(100))
+        stats = scanner.get_stats()
+        assert stats['splits'] > 0
+        assert stats['window'] <= 10
+
+    def test_window_grows_back(self):
+        """Test that the window size recovers after successful requests"""
+        eth = FakeEth(block_number=999, max_results=1000)
+        scanner = LogScanner(SimpleNamespace(eth=eth), max_window=100, max_workers=1, grow_after=2)
+        scanner.window = 10
+
+        scanner.get_logs({}, 0, 999)
+        assert scanner.window == 100
+
+    def test_other_errors_propagate(self):
+        """Test that unrelated RPC errors are not retried"""
+        def get_logs(params):
+            raise ConnectionError("RPC unavailable")
+
+        eth = SimpleNamespace(block_number=10, get_logs=get_logs)
+        scanner = LogScanner(SimpleNamespace(eth=eth))
+
+        with pytest.raises(ConnectionError):
+            scanner.get_logs({}, 0)
+
+    def test_async_scanner_splits_and_preserves_order(self):
+        """Test that the async scanner splits windows like the threaded one"""
+        eth = AsyncFakeEth(block_number=99, max_results=10)
+        scanner = AsyncLogScanner(SimpleNamespace(eth=eth), max_window=64, max_workers=3)
+
+        logs = asyncio.run(scanner.get_logs({'address': '0xcontract'}, 0))
+
+        assert [log['blockNumber'] for log in logs] == list(range(100))
+        assert scanner.get_stats()['splits'] > 0
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+import json
+from pathlib import Path
+
+import pytest
+
+from backend.merkle import (
+    EMPTY_ROOT, SessionMerkleTree, chunk_leaf, manifest_chunks, verify_chunk_proof, verify_proof
+)
+
+# Proofs the hardhat tests verify on-chain with the contract's verifySessionChunk
+PROOF_FIXTURE = Path(__file__).parent.parent / 'test' / 'fixtures' / 'session_proofs.json'
+
+def chunk(sequence_number):
+    return {
+        'sequence_number': sequence_number,
+        'video_cid': f'QmVideo{sequence_number}',
+        'metadata_cid': f'QmMeta{sequence_number}'
+    }
+
+class TestSessionMerkleTree:
+    def test_every_chunk_has_a_valid_proof(self):
+        """Test proofs for all positions of balanced and unbalanced trees"""
+        for size in range(1, 10):
+            tree = SessionMerkleTree()
+            for i in range(size):
+                tree.add(chunk(i))
+            for i in range(size):
+                proof = tree.get_chunk_proof(i)
+                assert proof['chunk_count'] == size
+                assert verify_chunk_proof(proof, proof['proof'], tree.root)
+
+    def test_tampered_chunk_is_rejected(self):
+        """Test that a proof does not verify a different chunk or root"""
+        tree = SessionMerkleTree()
+        for i in range(5):
+            tree.add(chunk(i))
+        proof = tree.get_chunk_proof(3)
+
+        forged = dict(proof, video_cid='QmForged')
+        assert not verify_chunk_proof(forged, proof['proof'], proof['root'])
+
+        tree.add(chunk(5))
+        assert not verify_chunk_proof(proof, proof['proof'], tree.root)
+
+    def test_single_chunk_and_empty_tree(self):
+        """Test the degenerate trees"""
+        tree = SessionMerkleTree()
+        assert tree.root == EMPTY_ROOT
+        assert tree.get_chunk_proof(0) is None
+
+        tree.add(chunk(7))
+        assert tree.root == chunk_leaf(7, 'QmVideo7', 'QmMeta7')
+        assert verify_proof(tree.root, [], tree.root)
+        assert [c['sequence_number'] for c in tree.get_manifest()['chunks']] == [7]
+
+    def test_contract_fixture_is_current(self):
+        """Test that the proofs checked by the contract tests are what this module generates"""
+        tree = SessionMerkleTree()
+        for i in range(5):
+            tree.add(chunk(i))
+        with open(PROOF_FIXTURE) as f:
+            assert json.load(f) == tree.get_manifest()
+
+    def test_manifest_chunks(self):
+        """Test that a fetched manifest only yields chunks under the committed root"""
+        tree = SessionMerkleTree()
+        for i in range(5):
+            tree.add(chunk(i))
+        manifest = json.loads(json.dumps(tree.get_manifest()))
+        manifest['chunks'][2]['video_cid'] = 'QmForged'
+
+        chunks = manifest_chunks(manifest, tree.root)
+        assert [c['sequence_number'] for c in chunks] == [0, 1, 3, 4]
+
+        with pytest.raises(ValueError):
+            manifest_chunks(manifest, chunk_leaf(0, 'QmVideo0', 'QmMeta0'))
+        with pytest.raises(ValueError):
+            manifest_chunks({}, tree.root)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+import io
+
+import pytest
+
+from backend.multipart import MultipartStream
+
+class TestMultipartStream:
+    def test_body_layout(self):
+        """Test the encoded multipart body"""
+        stream = MultipartStream([('file', 'chunk_0.mp4', b'abcdef')], boundary='xyz', block_size=4)
+        body = b''.join(bytes(block) for block in stream)
+        
+        assert body == (
+            b'--xyz\r\n'
+            b'Content-Disposition: form-data; name="file"; filename="chunk_0.mp4"\r\n'
+            b'Content-Type: application/octet-stream\r\n\r\n'
+            b'abcdef\r\n'
+            b'--xyz--\r\n'
+        )
+        assert len(stream) == len(body)
+        assert stream.bytes_sent == len(body)
+        assert stream.content_type == 'multipart/form-data; boundary=xyz'
+
+    def test_streams_file_in_blocks(self, tmp_path):
+        """Test that file sources are read block by block with progress reports"""
+        path = tmp_path / 'chunk.mp4'
+        path.write_bytes(b'x' * 10)
+        progress = []
+        
+        with open(path, 'rb') as f:
+            stream = MultipartStream(
+                [('file', 'chunk.mp4', f)],
+                block_size=4,
+                progress=lambda sent, total: progress.append((sent, total))
+            )
+            blocks = list(stream)
+        
+        assert [len(b) for b in blocks[1:4]] == [4, 4, 2]
+        assert progress[-1] == (len(stream), len(stream))
+
+    def test_unsized_source(self):
+        """Test that unsized sources can only be sent chunked"""
+        class Unsized:
+            def __init__(self):
+                self.buffer = io.BytesIO(b'data')
+            def read(self, size):
+                return self.buffer.read(size)
+        
+        stream = MultipartStream([('file', 'f', Unsized())])
+        assert stream.length is None
+        with pytest.raises(TypeError):
+            len(stream)
+        assert b'data' in b''.join(bytes(b) for b in stream)
+
+    def test_single_use(self):
+        """Test that a consumed stream cannot be replayed"""
+        stream = MultipartStream([('file', 'f', b'data')])
+        list(stream)
+        with pytest.raises(RuntimeError):
+            list(stream)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+
+import pytest
+
+from backend.pipeline import StageQueue, BLOCK, DROP_OLDEST, DOWNSCALE
+
+class TestStageQueue:
+    def test_drop_oldest_keeps_newest_items(self):
+        """Test that a full drop_oldest queue discards the oldest item"""
+        q = StageQueue('frames', 2, DROP_OLDEST)
+        for i in range(4):
+            q.put(i)
+        
+        assert [q.get_nowait(), q.get_nowait()] == [2, 3]
+        stats = q.get_stats()
+        assert stats['dropped_count'] == 2
+        assert stats['put_count'] == 4
+        assert stats['peak_size'] == 2
+
+    def test_downscale_applies_above_threshold(self):
+        """Test that items are downscaled once the queue is half full"""
+        q = StageQueue('frames', 4, DOWNSCALE, downscale=lambda x: x // 10, downscale_threshold=0.5)
+        for value in (10, 20, 30, 40):
+            q.put(value)
+        
+        assert list(q.queue) == [10, 20, 3, 4]
+        assert q.get_stats()['downscaled_count'] == 2
+
+    def test_downscale_stops_once_drained(self):
+        """Test that downscaling continues until the queue drains below half the threshold"""
+        q = StageQueue('frames', 4, DOWNSCALE, downscale=lambda x: x // 10, downscale_threshold=0.5)
+        for value in (10, 20, 30):
+            q.put(value)
+        q.get_nowait()
+        q.put(40)
+        assert list(q.queue) == [20, 3, 4]
+        
+        for _ in range(3):
+            q.get_nowait()
+        q.put(50)
+        assert list(q.queue) == [50]
+        assert not q.downscaling
+
+    def test_close_bypasses_capacity(self):
+        """Test that the close marker is queued even when the queue is full"""
+        q = StageQueue('frames', 1, BLOCK)
+        q.put('frame')
+        q.close()
+        
+        assert q.get_nowait() == 'frame'
+        assert q.get_nowait() is StageQueue.CLOSED
+
+    def test_invalid_configuration(self):
+        """Test policy validation"""
+        with pytest.raises(ValueError):
+            StageQueue('frames', 1, 'unknown')
+        with pytest.raises(ValueError):
+            StageQueue('frames', 1, DOWNSCALE)
+        with pytest.raises(ValueError):
+            StageQueue('frames', 0, BLOCK)
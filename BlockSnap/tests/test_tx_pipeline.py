@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from web3.exceptions import TransactionNotFound
+
+from backend.tx_pipeline import TransactionPipeline
+
+class FakeEth:
+    """Node that mines only the transactions a test tells it to"""
+
+    def __init__(self, nonce=0):
+        self.chain_id = 1337
+        self.gas_price = 100
+        self.nonce = nonce
+        self.nonce_queries = 0
+        self.sent = []
+        self.mined = {}
+        self.send_error = None
+        self.lock = threading.Lock()
+
+    def get_transaction_count(self, address, block_identifier):
+        self.nonce_queries += 1
+        return self.nonce
+
+    def send_raw_transaction(self, tx):
+        if self.send_error:
+            error, self.send_error = self.send_error, None
+            raise error
+        tx_hash = f"0x{tx['nonce']:02x}{tx['gasPrice']:x}"
+        with self.lock:
+            self.sent.append((tx_hash, tx))
+        return tx_hash
+
+    def mine(self, tx_hash):
+        with self.lock:
+            self.mined[tx_hash] = {'transactionHash': tx_hash, 'status': 1}
+
+    def get_transaction_receipt(self, tx_hash):
+        with self.lock:
+            if tx_hash not in self.mined:
+                raise TransactionNotFound(f"{tx_hash} not found")
+            return self.mined[tx_hash]
+
+class FakeWeb3:
+    def __init__(self, nonce=0):
+        self.eth = FakeEth(nonce)
+
+    @staticmethod
+    def to_hex(value):
+        return value
+
+class FakeAccount:
+    address = '0x' + 'ab' * 20
+
+    @staticmethod
+    def sign_transaction(tx):
+        return SimpleNamespace(rawTransaction=dict(tx))
+
+class FakeFunction:
+    @staticmethod
+    def build_transaction(params):
+        return dict(params, to='0x' + 'cd' * 20, data='0x')
+
+def make_pipeline(w3, **kwargs):
+    kwargs.setdefault('receipt_poll_interval', 0.01)
+    return TransactionPipeline(w3, FakeAccount(), **kwargs)
+
+def wait_until(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.01)
+
+class TestTransactionPipeline:
+    def test_nonces_are_assigned_locally(self):
+        """Test that back-to-back submissions get consecutive nonces from one query"""
+        w3 = FakeWeb3(nonce=7)
+        pipeline = make_pipeline(w3)
+
+        futures = [pipeline.submit(FakeFunction()) for _ in range(3)]
+        assert [tx['nonce'] for _, tx in w3.eth.sent] == [7, 8, 9]
+        assert w3.eth.nonce_queries == 1
+
+        # Receipts resolve independently of submission order
+        for tx_hash, _ in reversed(w3.eth.sent):
+            w3.eth.mine(tx_hash)
+        receipts = [future.result(timeout=2) for future in futures]
+        assert [receipt['transactionHash'] for receipt in receipts] == [tx_hash for tx_hash, _ in w3.eth.sent]
+        pipeline.stop()
+
+        stats = pipeline.get_stats()
+        assert stats['submitted'] == 3 and stats['confirmed'] == 3
+        assert stats['pending'] == 0 and stats['next_nonce'] == 10
+
+    def test_nonce_is_resynced_after_a_failed_send(self):
+        """Test that a rejected transaction makes the next one ask the node again"""
+        w3 = FakeWeb3(nonce=0)
+        pipeline = make_pipeline(w3)
+        pipeline.submit(FakeFunction())
+
+        # Another process used nonces 1 and 2 meanwhile
+        w3.eth.nonce = 3
+        w3.eth.send_error = ValueError("nonce too low")
+        with pytest.raises(ValueError):
+            pipeline.submit(FakeFunction())
+        assert pipeline.get_stats()['failed'] == 1
+
+        pipeline.submit(FakeFunction())
+        assert [tx['nonce'] for _, tx in w3.eth.sent] == [0, 3]
+        assert w3.eth.nonce_queries == 2
+        pipeline.stop()
+
+    def test_stuck_transaction_is_replaced(self):
+        """Test that an unmined transaction is re-sent with the same nonce and more gas"""
+        w3 = FakeWeb3()
+        pipeline = make_pipeline(w3, stuck_timeout=0.05, max_bumps=2)
+        future = pipeline.submit(FakeFunction())
+
+        wait_until(lambda: len(w3.eth.sent) == 3)
+        time.sleep(0.15)
+        # No more than max_bumps replacements
+        assert len(w3.eth.sent) == 3
+        assert {tx['nonce'] for _, tx in w3.eth.sent} == {0}
+        prices = [tx['gasPrice'] for _, tx in w3.eth.sent]
+        assert prices[0] < prices[1] < prices[2]
+
+        # The original can still be the one that gets mined
+        original_hash = w3.eth.sent[0][0]
+        w3.eth.mine(original_hash)
+        assert future.result(timeout=2)['transactionHash'] == original_hash
+        assert pipeline.get_stats()['replaced'] == 2
+        pipeline.stop()
+
+    def test_monitor_runs_only_while_transactions_are_pending(self):
+        """Test that the monitor thread exits when idle and restarts on demand"""
+        w3 = FakeWeb3()
+        pipeline = make_pipeline(w3)
+        assert pipeline.monitor_thread is None
+
+        pipeline.submit(FakeFunction())
+        monitor = pipeline.monitor_thread
+        assert monitor.is_alive()
+        w3.eth.mine(w3.eth.sent[0][0])
+        monitor.join(timeout=2)
+        assert not monitor.is_alive()
+        assert pipeline.monitor_thread is None
+
+        future = pipeline.submit(FakeFunction())
+        assert pipeline.monitor_thread.is_alive()
+        pipeline.stop()
+        assert pipeline.monitor_thread is None
+        assert not future.done()
+
+    def test_send_waits_longer_than_a_replacement(self):
+        """Test that send() gives stuck transactions time to be replaced and mined"""
+        w3 = FakeWeb3()
+        pipeline = make_pipeline(w3, stuck_timeout=0.05, max_bumps=1)
+
+        def mine_replacement():
+            wait_until(lambda: len(w3.eth.sent) == 2)
+            w3.eth.mine(w3.eth.sent[1][0])
+
+        miner = threading.Thread(target=mine_replacement)
+        miner.start()
+        receipt = pipeline.send(FakeFunction())
+        miner.join()
+        assert receipt['transactionHash'] == w3.eth.sent[1][0]
+        pipeline.stop()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+
+import io
+
+import pytest
+
+from backend.unixfs import CIDIndex, UnixFSImporter, cid_to_string, compute_cid
+
+class TestComputeCID:
+    @pytest.mark.parametrize('content, kwargs, expected', [
+        (b'', {}, 'QmbFMke1KXqnYyBBWxB74N4c5SBnJMVAiMNRcGu6x1AwQH'),
+        (b'hello world\n', {}, 'QmT78zSuBmuS4z925WZfrqQ1qHaJ56DQaTfyMUF7F8ff5o'),
+        (b'', {'cid_version': 1}, 'bafkreihdwdcefgh4dqkjv67uzcmw7ojee6xedzdetojuzjevtenxquvyku'),
+    ])
+    def test_known_cids(self, content, kwargs, expected):
+        """Test CIDs against values returned by `ipfs add`"""
+        assert compute_cid(content, **kwargs) == expected
+
+    def test_file_matches_bytes(self):
+        """Test that multi-chunk files and bytes give the same CID"""
+        content = bytes(range(256)) * 4000
+        source = io.BytesIO(content)
+
+        assert compute_cid(source, chunker='size-1024') == compute_cid(content, chunker='size-1024')
+        assert compute_cid(content, chunker='size-1024') != compute_cid(content)
+
+    def test_balanced_layout_depth(self):
+        """Test that the DAG grows a level once a node is full"""
+        importer = UnixFSImporter(chunk_size=1, max_links=2)
+        root = importer.file_node(b'abcde')
+
+        assert root.filesize == 5
+        assert cid_to_string(root.cid).startswith('Qm')
+
+    def test_empty_directory(self):
+        """Test the directory node used for wrapped adds"""
+        node = UnixFSImporter().directory_node([])
+        assert cid_to_string(node.cid) == 'QmUNLLsPACCz1vLxQVkXqqLX5R1X345qqfHbsf67hvA3Nn'
+
+    def test_unsupported_chunker(self):
+        """Test that content-defined chunkers are rejected"""
+        with pytest.raises(ValueError):
+            compute_cid(b'data', chunker='rabin')
+
+class TestCIDIndex:
+    def test_persistence(self, tmp_path):
+        """Test that index updates survive a reload"""
+        path = tmp_path / 'cids.jsonl'
+        index = CIDIndex(str(path))
+        index.set('QmA', CIDIndex.PINNED)
+        index.set('QmB', CIDIndex.PINNED)
+        index.discard('QmA')
+
+        reloaded = CIDIndex(str(path))
+        assert reloaded.get('QmA') is None
+        assert reloaded.get('QmB') == CIDIndex.PINNED
+        assert len(reloaded) == 1
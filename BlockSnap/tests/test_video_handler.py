@@ -75,6 +75,69 @@ class TestDashcamRecorder(unittest.TestCase):
         self.assertIsNone(self.recorder.capture)
         self.assertIsNone(self.recorder.writer)
 
+    def test_incremental_chunk_rotation(self):
+        """Test that the writer rotates at chunk boundaries without dropping the tail"""
+        recorder = DashcamRecorder(
+            chunk_duration=1,
+            resolution=(320, 240),
+            fps=10,
+            temp_dir=self.test_dir
+        )
+        recorder.start_recording()
+        time.sleep(2.5)
+        recorder.stop_recording()
+        
+        chunks = []
+        while True:
+            chunk = recorder.get_next_chunk()
+            if chunk is None:
+                break
+            chunks.append(chunk)
+        
+        # Two full chunks plus the partial chunk flushed on stop
+        self.assertGreaterEqual(len(chunks), 3)
+        self.assertEqual(
+            [c.sequence_number for c in chunks],
+            list(range(len(chunks)))
+        )
+        for chunk in chunks:
+            self.assertTrue(len(chunk.data) > 0)
+            self.assertGreater(chunk.get_metadata()['frame_count'], 0)
+        self.assertIsNone(recorder.writer)
+
+    def test_downscaled_frames_get_their_own_chunk(self):
+        """Test that downscaled frames are encoded at half size in a chunk of their own"""
+        recorder = DashcamRecorder(
+            chunk_duration=60,
+            resolution=(320, 240),
+            fps=10,
+            temp_dir=self.test_dir,
+            frame_queue_size=20,
+            frame_queue_policy='downscale'
+        )
+        frames = [recorder._generate_test_frame(i) for i in range(7)]
+        for i, frame in enumerate(frames):
+            item = (i, time.time(), time.monotonic(), frame)
+            recorder.frame_queue.put(recorder._downscale_frame(item) if 2 <= i < 5 else item)
+        recorder.frame_queue.close()
+        
+        recorder._encode_loop()
+        recorder.finalize_queue.put(None)
+        recorder._finalize_loop()
+        
+        chunks = []
+        while True:
+            chunk = recorder.get_next_chunk()
+            if chunk is None:
+                break
+            chunks.append(chunk)
+        self.assertEqual(
+            [(c.get_metadata()['resolution'], c.get_metadata()['frame_count']) for c in chunks],
+            [((320, 240), 2), ((160, 120), 3), ((320, 240), 2)]
+        )
+        for chunk in chunks:
+            self.assertTrue(len(chunk.data) > 0)
+
     def test_get_status(self):
         """Test status reporting"""
         status = self.recorder.get_status()
@@ -85,5 +148,40 @@ class TestDashcamRecorder(unittest.TestCase):
         self.assertIn('fps', status)
         self.assertIn('chunk_duration', status)
 
+class TestVideoChunk(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path("test_chunk_payloads")
+        self.test_dir.mkdir(exist_ok=True)
+        self.chunk_path = self.test_dir / "chunk_0.mp4"
+        self.chunk_path.write_bytes(b"encoded video payload")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_file_backed_payload(self):
+        """Test that file-backed chunks stream from disk"""
+        chunk = VideoChunk(start_time=time.time(), path=self.chunk_path, sequence_number=0)
+        
+        self.assertTrue(chunk.is_file_backed)
+        self.assertEqual(chunk.size, 21)
+        with chunk.open() as f:
+            self.assertEqual(f.read(), b"encoded video payload")
+        with chunk.view() as view:
+            self.assertEqual(bytes(view[:7]), b"encoded")
+        self.assertEqual(chunk.data, b"encoded video payload")
+
+    def test_release_only_deletes_temporary_files(self):
+        """Test that release() keeps recorder chunks for recovery"""
+        VideoChunk(start_time=time.time(), path=self.chunk_path).release()
+        self.assertTrue(self.chunk_path.exists())
+        
+        VideoChunk(start_time=time.time(), path=self.chunk_path, temporary=True).release()
+        self.assertFalse(self.chunk_path.exists())
+
+    def test_requires_payload(self):
+        """Test that a chunk needs data or a file"""
+        with self.assertRaises(ValueError):
+            VideoChunk(start_time=time.time(), sequence_number=0)
+
 if __name__ == '__main__':
     unittest.main()